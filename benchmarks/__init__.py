@@ -0,0 +1 @@
+"""Performance benchmarks for PipeStep (run with ``python -m benchmarks``)."""
@@ -0,0 +1,68 @@
+"""Run the benchmark suite: ``python -m benchmarks [options]``."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+from benchmarks import harness
+from benchmarks import (  # noqa: F401  (registers benchmarks)
+    bench_parser, bench_engine, bench_remote, bench_tui, bench_workspace,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="PipeStep benchmark suite")
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=None, help="Override the rounds per benchmark")
+    parser.add_argument("--output", default="", help="Write results JSON to this path")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Update the baseline with these results (only the selected entries with -k)")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Median ratio above which a benchmark counts as a regression (default: 1.25)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any regression is found")
+    args = parser.parse_args()
+
+    selected = [b for b in harness.REGISTRY if args.filter in b.name]
+    print(f"Running {len(selected)} benchmarks")
+    results = harness.run(selected, rounds=args.rounds)
+    data = harness.to_json(results)
+
+    if args.output:
+        harness.write_json(args.output, data)
+        print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        if args.filter and os.path.exists(args.baseline):
+            # Partial run: only replace the entries that were measured
+            merged = harness.load_json(args.baseline)
+            merged["results"].update(data["results"])
+            data = {**data, "results": merged["results"]}
+        harness.write_json(args.baseline, data)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    baseline = harness.load_json(args.baseline)
+    regressions = harness.compare(data, baseline, args.threshold)
+    if baseline.get("machine") != data["machine"] or baseline.get("python") != data["python"]:
+        print(f"\nNote: baseline was recorded on {baseline.get('machine')} / Python {baseline.get('python')}")
+    if not regressions:
+        print(f"\nNo regressions beyond {args.threshold:.2f}x baseline.")
+        return
+    print(f"\nRegressions beyond {args.threshold:.2f}x baseline:")
+    for name, ratio in regressions:
+        print(f"  {name:<48} {ratio:.2f}x")
+    if args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Engine benchmarks: per-step exec overhead and container inspection latency."""
+
+from __future__ import annotations
+
+import contextlib
+import tempfile
+
+from benchmarks.harness import benchmark
+from pipestep.backends import get_backend
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step
+
+NOOP = Step(name="noop", command=":")
+
+
+@contextlib.contextmanager
+def _engine(backend: str):
+    job = Job(name="bench", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[NOOP])
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = PipelineEngine(job=job, workdir=workdir, backend=get_backend(backend))
+        try:
+            engine.setup()
+            yield engine
+        finally:
+            engine.cleanup()
+
+
+def _register(backend: str, requires: str) -> None:
+    @benchmark(f"engine.run_step[{backend},noop]", rounds=20, requires=requires)
+    @contextlib.contextmanager
+    def _run_step_noop():
+        with _engine(backend) as engine:
+            yield lambda: engine.run_step(NOOP)
+
+    @benchmark(f"engine.get_env[{backend}]", rounds=20, requires=requires)
+    @contextlib.contextmanager
+    def _get_env():
+        with _engine(backend) as engine:
+            yield engine.get_env
+
+    @benchmark(f"engine.get_files[{backend},/usr/bin]", rounds=20, requires=requires)
+    @contextlib.contextmanager
+    def _get_files():
+        with _engine(backend) as engine:
+            yield lambda: engine.get_files("/usr/bin")
+
+
+_register("docker", requires="docker")
+_register("local", requires="")
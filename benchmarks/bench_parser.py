@@ -0,0 +1,36 @@
+"""Parser benchmarks: workflow parsing at scale and env coercion."""
+
+from __future__ import annotations
+
+import contextlib
+import os
+
+from benchmarks.harness import benchmark
+from benchmarks.workloads import synthetic_workflow, write_workflow
+from pipestep.parser import parse_workflow, _str_dict
+
+
+def _register_parse(steps: int, env_size: int) -> None:
+    rounds = 3 if steps >= 1000 else 10
+
+    @benchmark(f"parser.parse_workflow[steps={steps},env={env_size}]", rounds=rounds)
+    @contextlib.contextmanager
+    def _bench():
+        path = write_workflow(synthetic_workflow(steps, env_size=env_size))
+        try:
+            yield lambda: parse_workflow(path)
+        finally:
+            os.unlink(path)
+
+
+for _steps in (1, 100, 1000, 5000):
+    _register_parse(_steps, env_size=5)
+_register_parse(1000, env_size=50)
+
+
+@benchmark("parser._str_dict[keys=1000]", rounds=20)
+@contextlib.contextmanager
+def _str_dict_mixed():
+    values = [None, True, False, 1, 2.5, "text"]
+    d = {f"KEY_{i}": values[i % len(values)] for i in range(1000)}
+    yield lambda: _str_dict(d)
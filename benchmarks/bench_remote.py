@@ -0,0 +1,125 @@
+"""Remote-daemon benchmarks: per-step overhead over a high-latency link.
+
+A local TCP proxy in front of the Docker socket stands in for a remote
+build box: it delays every forwarded chunk by half the round-trip time,
+and each new connection by a full RTT (the handshake).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import docker
+
+from benchmarks.harness import benchmark
+from pipestep.backends import DockerBackend
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step
+
+NOOP = Step(name="noop", command=":")
+
+
+class DelayProxy:
+    """Forwards TCP connections to a unix socket with injected latency."""
+
+    def __init__(self, rtt: float, target: str) -> None:
+        self.rtt = rtt
+        self.target = target
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(64)
+        self.port = self._server.getsockname()[1]
+        self._closed = False
+
+    @property
+    def url(self) -> str:
+        return f"tcp://127.0.0.1:{self.port}"
+
+    def start(self) -> "DelayProxy":
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._closed = True
+        self._server.close()
+
+    def _accept(self) -> None:
+        while not self._closed:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._connect, args=(client,), daemon=True).start()
+
+    def _connect(self, client: socket.socket) -> None:
+        time.sleep(self.rtt)  # connection setup costs a round trip
+        upstream = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        upstream.connect(self.target)
+        threading.Thread(target=self._pump, args=(client, upstream), daemon=True).start()
+        self._pump(upstream, client)
+
+    def _pump(self, src: socket.socket, dst: socket.socket) -> None:
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                time.sleep(self.rtt / 2)
+                dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            for s in (src, dst):
+                with contextlib.suppress(OSError):
+                    s.shutdown(socket.SHUT_RDWR)
+
+
+def _docker_socket() -> str:
+    host = os.environ.get("DOCKER_HOST", "")
+    return host[len("unix://"):] if host.startswith("unix://") else "/var/run/docker.sock"
+
+
+@contextlib.contextmanager
+def _remote_engine(rtt: float):
+    proxy = DelayProxy(rtt, _docker_socket()).start()
+    job = Job(name="bench-remote", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[NOOP])
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = PipelineEngine(job=job, workdir=workdir, backend=DockerBackend(base_url=proxy.url))
+        try:
+            engine.setup()
+            yield engine, proxy
+        finally:
+            engine.cleanup()
+            proxy.stop()
+
+
+def _register(rtt_ms: int) -> None:
+    rtt = rtt_ms / 1000
+
+    @benchmark(f"remote.run_step[rtt={rtt_ms}ms,pooled]", rounds=10, requires="docker")
+    @contextlib.contextmanager
+    def _pooled():
+        with _remote_engine(rtt) as (engine, _):
+            yield lambda: engine.run_step(NOOP)
+
+    @benchmark(f"remote.run_step[rtt={rtt_ms}ms,new-connection]", rounds=10, requires="docker")
+    @contextlib.contextmanager
+    def _unpooled():
+        # What every step would cost if it opened its own connection
+        with _remote_engine(rtt) as (engine, proxy):
+            def _step():
+                client = docker.DockerClient(base_url=proxy.url)
+                try:
+                    client.containers.get(engine.container_id).exec_run(":", demux=True)
+                finally:
+                    client.close()
+            yield _step
+
+
+for _rtt_ms in (20, 80):
+    _register(_rtt_ms)
@@ -0,0 +1,48 @@
+"""TUI benchmarks: RichLog throughput when a step produces large output."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+
+from benchmarks.harness import benchmark
+from pipestep.models import Job, Step, StepResult, Workflow
+from pipestep.tui import PipeStepApp
+
+
+class _BenchApp(PipeStepApp):
+    """PipeStepApp without container setup, so only rendering is measured."""
+
+    def _setup_engine(self) -> None:
+        pass
+
+
+def _render_output(lines: int) -> float:
+    step = Step(name="Big output", command="seq 1 N")
+    job = Job(name="bench", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[step])
+    workflow = Workflow(name="bench", trigger="on: push", jobs=[job])
+    stdout = "".join(f"line {i}: the quick brown fox jumps over the lazy dog\n" for i in range(lines))
+    result = StepResult(exit_code=0, stdout=stdout, stderr="")
+
+    async def _drive() -> float:
+        app = _BenchApp(workflow=workflow, job=job)
+        async with app.run_test(size=(160, 48)) as pilot:
+            await pilot.pause()
+            start = time.perf_counter()
+            app._on_step_complete(step, 0, result)
+            await pilot.pause()
+            return time.perf_counter() - start
+
+    return asyncio.run(_drive())
+
+
+def _register_richlog(lines: int) -> None:
+    @benchmark(f"tui.step_output[lines={lines}]", rounds=3)
+    @contextlib.contextmanager
+    def _bench():
+        yield lambda: _render_output(lines)
+
+
+for _lines in (1_000, 10_000):
+    _register_richlog(_lines)
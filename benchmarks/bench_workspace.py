@@ -0,0 +1,31 @@
+"""Workspace benchmarks: cost of isolating the workdir with a snapshot."""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+
+from benchmarks.harness import benchmark
+from pipestep.workspace import prepare_workspace
+
+
+def _register_snapshot(files: int) -> None:
+    @benchmark(f"workspace.snapshot[files={files}]", rounds=5)
+    @contextlib.contextmanager
+    def _bench():
+        with tempfile.TemporaryDirectory() as src:
+            for i in range(files):
+                sub = os.path.join(src, f"dir{i % 20}")
+                os.makedirs(sub, exist_ok=True)
+                with open(os.path.join(sub, f"file{i}.txt"), "w") as f:
+                    f.write("x" * 4096)
+
+            def _snapshot():
+                prepare_workspace(src, "snapshot").release()
+
+            yield _snapshot
+
+
+for _files in (100, 2000):
+    _register_snapshot(_files)
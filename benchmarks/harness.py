@@ -0,0 +1,155 @@
+"""Minimal timing harness: registration, measurement, and baseline comparison."""
+
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import sys
+import time
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from pipestep import __version__
+
+
+@dataclass
+class Benchmark:
+    """A registered benchmark: a context manager that yields the callable to time."""
+
+    name: str
+    setup: Callable[[], AbstractContextManager]
+    rounds: int = 5
+    requires: str = ""
+
+
+@dataclass
+class BenchResult:
+    """Timings (in seconds) collected for one benchmark."""
+
+    name: str
+    timings: list[float] = field(default_factory=list)
+    skipped: str = ""
+
+    def summary(self) -> dict:
+        if self.skipped:
+            return {"skipped": self.skipped}
+        return {
+            "rounds": len(self.timings),
+            "min": min(self.timings),
+            "median": statistics.median(self.timings),
+            "mean": statistics.fmean(self.timings),
+            "max": max(self.timings),
+        }
+
+
+REGISTRY: list[Benchmark] = []
+
+
+def benchmark(name: str, rounds: int = 5, requires: str = "") -> Callable:
+    """Register a context-manager factory as a benchmark.
+
+    The context manager performs setup, yields a zero-argument callable
+    whose runtime is measured, and tears down on exit. A callable that
+    returns a float reports its own duration instead, for benchmarks that
+    cannot separate per-call setup (e.g. starting a Textual app).
+    ``requires`` names an availability check (see ``AVAILABILITY``) that
+    must pass first.
+    """
+    def _register(setup: Callable[[], AbstractContextManager]) -> Callable:
+        REGISTRY.append(Benchmark(name=name, setup=setup, rounds=rounds, requires=requires))
+        return setup
+    return _register
+
+
+def _docker_available() -> str:
+    try:
+        import docker
+        docker.from_env().ping()
+    except Exception:
+        return "Docker daemon not reachable"
+    return ""
+
+
+# Each check returns an empty string when available, or a skip reason.
+AVAILABILITY: dict[str, Callable[[], str]] = {
+    "docker": _docker_available,
+}
+
+
+def run(benchmarks: list[Benchmark], rounds: Optional[int] = None, echo=print) -> list[BenchResult]:
+    """Run benchmarks, returning one result per benchmark."""
+    checked: dict[str, str] = {}
+    results = []
+    for bench in benchmarks:
+        result = BenchResult(name=bench.name)
+        if bench.requires:
+            if bench.requires not in checked:
+                checked[bench.requires] = AVAILABILITY[bench.requires]()
+            result.skipped = checked[bench.requires]
+        if not result.skipped:
+            with bench.setup() as fn:
+                fn()  # warm-up
+                for _ in range(rounds or bench.rounds):
+                    start = time.perf_counter()
+                    measured = fn()
+                    elapsed = time.perf_counter() - start
+                    result.timings.append(measured if isinstance(measured, float) else elapsed)
+        echo(_format_line(result))
+        results.append(result)
+    return results
+
+
+def _format_line(result: BenchResult) -> str:
+    if result.skipped:
+        return f"  {result.name:<48} skipped ({result.skipped.splitlines()[0]})"
+    s = result.summary()
+    return f"  {result.name:<48} median {_fmt_seconds(s['median'])}  min {_fmt_seconds(s['min'])}"
+
+
+def _fmt_seconds(value: float) -> str:
+    if value < 1e-3:
+        return f"{value * 1e6:8.1f}us"
+    if value < 1:
+        return f"{value * 1e3:8.2f}ms"
+    return f"{value:8.3f}s "
+
+
+def to_json(results: list[BenchResult]) -> dict:
+    """Serialize results with enough environment info to judge comparability."""
+    return {
+        "pipestep": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": {r.name: r.summary() for r in results},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[tuple[str, float]]:
+    """Return (name, ratio) for benchmarks whose median regressed past threshold.
+
+    The ratio is current median / baseline median; benchmarks skipped or
+    missing on either side are ignored.
+    """
+    regressions = []
+    for name, cur in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "median" not in base or "median" not in cur or base["median"] <= 0:
+            continue
+        ratio = cur["median"] / base["median"]
+        if ratio > threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def load_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path: str, data: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
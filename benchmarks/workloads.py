@@ -0,0 +1,54 @@
+"""Synthetic workflow generators shared by the benchmarks."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+import yaml
+
+
+def synthetic_workflow(steps: int, env_size: int = 0, jobs: int = 1) -> dict:
+    """Build a workflow mapping with ``jobs`` jobs of ``steps`` steps each.
+
+    ``env_size`` keys are set at workflow, job, and step level so env
+    merging cost scales with it. Every fifth step is an action reference.
+    """
+    def _env(prefix: str) -> dict:
+        return {f"{prefix}_{i}": f"value-{i}" for i in range(env_size)}
+
+    raw_jobs = {}
+    for j in range(jobs):
+        job_steps = []
+        for i in range(steps):
+            if i % 5 == 0:
+                job_steps.append({
+                    "name": f"Action {i}",
+                    "uses": "actions/setup-node@v4",
+                    "with": {"node-version": 20},
+                })
+            else:
+                job_steps.append({
+                    "name": f"Step {i}",
+                    "run": f"echo step {i}\nmake target-{i}",
+                    "env": _env(f"STEP{i}"),
+                })
+        raw_jobs[f"job-{j}"] = {
+            "runs-on": "ubuntu-latest",
+            "env": _env("JOB"),
+            "steps": job_steps,
+        }
+    return {
+        "name": f"Synthetic {steps} steps",
+        "on": {"push": {"branches": ["main"]}},
+        "env": _env("WORKFLOW"),
+        "jobs": raw_jobs,
+    }
+
+
+def write_workflow(raw: dict) -> str:
+    """Dump a workflow mapping to a temporary YAML file and return its path."""
+    fd, path = tempfile.mkstemp(suffix=".yml", prefix="pipestep-bench-")
+    with os.fdopen(fd, "w") as f:
+        yaml.safe_dump(raw, f, sort_keys=False)
+    return path
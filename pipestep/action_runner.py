@@ -0,0 +1,83 @@
+"""Run JavaScript and container actions from the local mirror, offline.
+
+A ``node*`` action runs its ``main`` script (after ``pre``, if any) in the
+job container, with Node from a runtime volume the backend fills once from
+a sidecar image (see ``Backend.provide_runtime``). A container action —
+``uses: docker://image`` or an action whose ``runs.image`` is
+``docker://...`` — runs in a one-off container of that image with the
+workspace mounted. Inputs reach both as ``INPUT_*`` variables, as on
+GitHub's runners. ``post`` scripts are not run.
+"""
+
+from __future__ import annotations
+
+import shlex
+from typing import TYPE_CHECKING, Callable
+
+from pipestep.backends import NODE_RUNTIMES, runtime_variable
+from pipestep.models import Step, layered_env
+
+if TYPE_CHECKING:
+    from pipestep.local_actions import ActionDefinition, ResolvedAction
+
+
+def input_env(inputs: dict) -> dict:
+    """``INPUT_<NAME>`` variables for action inputs."""
+    return {f"INPUT_{name.replace(' ', '_').upper()}": str(value) for name, value in inputs.items()}
+
+
+def node_step(step: Step, definition: ActionDefinition, resolved: ResolvedAction, inputs: dict) -> Step:
+    """The step that runs a JavaScript action."""
+    runtime = definition.using
+    if runtime not in NODE_RUNTIMES:
+        raise ValueError(f"{step.action_ref}: unsupported runtime '{runtime}'. Known: {', '.join(NODE_RUNTIMES)}")
+    main = definition.runs.get("main")
+    if not main:
+        raise ValueError(f"{step.action_ref}: a {runtime} action needs 'runs.main'")
+    scripts = [definition.runs["pre"], main] if definition.runs.get("pre") else [main]
+    node = f'"${{{runtime_variable(runtime)}:-node}}"'
+    return Step(
+        name=step.name,
+        command=" && ".join(f"{node} {shlex.quote(f'{resolved.path}/{script}')}" for script in scripts),
+        env=layered_env(step.env, {**input_env(inputs), "GITHUB_ACTION_PATH": resolved.path}),
+        condition=step.condition,
+        timeout_minutes=step.timeout_minutes,
+        action_path=resolved.path,
+        action_source="" if resolved.in_workspace else resolved.source,
+        runtime=runtime,
+    )
+
+
+def container_action_step(
+    step: Step, definition: ActionDefinition, inputs: dict, substitute: Callable[[object], str],
+) -> Step:
+    """The step that runs an action with ``runs.using: docker``."""
+    image = str(definition.runs.get("image", ""))
+    if not image.startswith("docker://"):
+        raise ValueError(
+            f"{step.action_ref}: container actions built from a Dockerfile aren't supported; "
+            "use one whose image is docker://..."
+        )
+    env = {str(k): substitute(v) for k, v in (definition.runs.get("env") or {}).items()}
+    return Step(
+        name=step.name,
+        command=shlex.join(substitute(arg) for arg in definition.runs.get("args") or []),
+        env=layered_env(step.env, {**input_env(inputs), **env}),
+        condition=step.condition,
+        timeout_minutes=step.timeout_minutes,
+        image=image.removeprefix("docker://"),
+        entrypoint=substitute(definition.runs.get("entrypoint") or ""),
+    )
+
+
+def docker_uses_step(step: Step) -> Step:
+    """The step for ``uses: docker://image``, whose ``with`` may set ``args`` and ``entrypoint``."""
+    return Step(
+        name=step.name,
+        command=step.action_with.get("args", ""),
+        env=layered_env(step.env),
+        condition=step.condition,
+        timeout_minutes=step.timeout_minutes,
+        image=step.action_ref.removeprefix("docker://"),
+        entrypoint=step.action_with.get("entrypoint", ""),
+    )
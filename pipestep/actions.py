@@ -1,7 +1,21 @@
-"""Best-effort local equivalents for common GitHub Actions."""
+"""Best-effort local equivalents for common GitHub Actions.
 
+Equivalents live in an :class:`ActionRegistry`. Besides the built-ins
+below, installed packages can register their own through the
+``pipestep.actions`` entry point group, e.g. in ``pyproject.toml``::
+
+    [project.entry-points."pipestep.actions"]
+    myorg = "myorg_pipestep:register"
+
+where ``register(registry)`` calls ``registry.register("myorg/deploy", handler)``.
+"""
+
+import fnmatch
+import importlib.metadata
 import re
-from typing import Callable, List, Optional, Tuple
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 def _checkout_equiv(inputs: dict) -> tuple[str, str]:
@@ -79,18 +93,104 @@ def _noop_equiv(desc: str) -> Callable:
     return _equiv
 
 
-# Map action patterns to equivalent-generating functions.
+# Built-in equivalents, by action name (``owner/repo``); plugins can add more.
 ACTION_HANDLERS: List[Tuple[str, Callable]] = [
-    (r"^actions/checkout@", _checkout_equiv),
-    (r"^actions/setup-node@", _setup_node_equiv),
-    (r"^actions/setup-python@", _setup_python_equiv),
-    (r"^actions/setup-go@", _setup_go_equiv),
-    (r"^actions/setup-java@", _setup_java_equiv),
-    (r"^actions/cache@", _noop_equiv("Cache — no-op locally")),
-    (r"^actions/upload-artifact@", _noop_equiv("Upload artifact — no-op locally")),
-    (r"^actions/download-artifact@", _noop_equiv("Download artifact — no-op locally")),
+    ("actions/checkout", _checkout_equiv),
+    ("actions/setup-node", _setup_node_equiv),
+    ("actions/setup-python", _setup_python_equiv),
+    ("actions/setup-go", _setup_go_equiv),
+    ("actions/setup-java", _setup_java_equiv),
+    ("actions/cache", _noop_equiv("Cache — no-op locally")),
+    ("actions/upload-artifact", _noop_equiv("Upload artifact — no-op locally")),
+    ("actions/download-artifact", _noop_equiv("Download artifact — no-op locally")),
 ]
 
+# Entry point group for packages that ship equivalents for their own actions
+ENTRY_POINT_GROUP = "pipestep.actions"
+
+
+class ActionRegistry:
+    """Action equivalents, looked up by the action's name.
+
+    Handlers are registered for an exact ``owner/repo`` (or
+    ``owner/repo/path``) name, or for a glob such as ``myorg/*``. Exact
+    names are a dict lookup; globs are compiled into one combined regex,
+    tried in registration order. Generated equivalents are memoized per
+    action ref and inputs.
+    """
+
+    def __init__(self) -> None:
+        self._exact: Dict[str, Callable] = {}
+        self._globs: List[Tuple[str, Callable]] = []
+        self._matcher: Optional[re.Pattern] = None
+        self._memo: Dict[tuple, Optional[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, handler: Callable) -> None:
+        """Register ``handler(inputs) -> (description, command)`` for an action name or glob.
+
+        A later registration for the same exact name replaces the earlier one.
+        """
+        key = name.lower()
+        with self._lock:
+            if any(c in key for c in "*?["):
+                self._globs.append((key, handler))
+                self._matcher = None
+            else:
+                self._exact[key] = handler
+            self._memo.clear()
+
+    def load_plugins(self, group: str = ENTRY_POINT_GROUP) -> None:
+        """Call every ``register(registry)`` function advertised under the entry point ``group``."""
+        for entry_point in importlib.metadata.entry_points(group=group):
+            try:
+                entry_point.load()(self)
+            except Exception as e:
+                print(f"\u26a0 Warning: action plugin '{entry_point.name}' failed to load: {e}", file=sys.stderr)
+
+    def handler_for(self, action_ref: str) -> Optional[Callable]:
+        name = action_ref.split("@", 1)[0].lower()
+        # owner/repo/path@ref falls back to the repository's handler
+        handler = self._exact.get(name) or self._exact.get("/".join(name.split("/")[:2]))
+        if handler is not None or not self._globs:
+            return handler
+        matcher = self._matcher
+        if matcher is None:
+            matcher = self._matcher = re.compile("|".join(
+                f"(?P<h{i}>{fnmatch.translate(pattern)})" for i, (pattern, _) in enumerate(self._globs)
+            ))
+        match = matcher.match(name)
+        return self._globs[int(match.lastgroup[1:])][1] if match else None
+
+    def equivalent(self, action_ref: str, inputs: Optional[dict] = None) -> Optional[Tuple[str, str]]:
+        inputs = inputs or {}
+        key = (action_ref, tuple(sorted(inputs.items())))
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        handler = self.handler_for(action_ref)
+        result = handler(inputs) if handler is not None else None
+        with self._lock:
+            self._memo[key] = result
+        return result
+
+
+_registry: Optional[ActionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def default_registry() -> ActionRegistry:
+    """The registry of built-in equivalents plus installed plugins, created on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = ActionRegistry()
+            for name, handler in ACTION_HANDLERS:
+                registry.register(name, handler)
+            registry.load_plugins()
+            _registry = registry
+        return _registry
+
 
 def get_action_equivalent(action_ref: str, inputs: Optional[dict] = None) -> Optional[Tuple[str, str]]:
     """Return (description, command) for a known action, or None.
@@ -98,9 +198,4 @@ def get_action_equivalent(action_ref: str, inputs: Optional[dict] = None) -> Opt
     If inputs (from `with:`) are provided, they are used to generate
     a more precise equivalent command (e.g., specific Node.js version).
     """
-    if inputs is None:
-        inputs = {}
-    for pattern, handler in ACTION_HANDLERS:
-        if re.match(pattern, action_ref):
-            return handler(inputs)
-    return None
+    return default_registry().equivalent(action_ref, inputs)
@@ -0,0 +1,683 @@
+"""Execution backends that host a job's container.
+
+``PipelineEngine`` talks to containers through a small duck-typed surface
+(``id``, ``status``, ``exec_run``, ``reload``, ``stop``, ``remove``) shared by
+Docker SDK containers and :class:`LocalContainer`. A backend knows how to
+make images available, start a container, snapshot a container as an
+image, and open an interactive shell; optionally, it can provide action
+runtimes and run one-off containers for container actions.
+
+Everything a backend creates is labelled with its kind and owning process
+(``owner_labels``), so ``pipestep gc`` can find what a crashed session left.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import re
+import shlex
+import shutil
+import socket
+import subprocess
+import tarfile
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlparse
+
+import docker
+from docker.errors import NotFound
+from docker.models.containers import ExecResult
+
+from pipestep.images import pull_image
+from pipestep.resources import Resources
+from pipestep.scratch import STORE_DIR, ScratchMount
+
+# Images the Node binary for each JavaScript action runtime is taken from
+NODE_RUNTIMES = {
+    "node16": "node:16-bullseye-slim",
+    "node20": "node:20-bookworm-slim",
+    "node24": "node:24-bookworm-slim",
+}
+
+# Where runtime volumes are mounted in job containers
+RUNTIMES_DIR = "/opt/pipestep"
+
+
+# Label on every resource pipestep creates; its value is the resource's kind
+LABEL = "pipestep"
+OWNER_LABEL = "pipestep.owner"
+
+
+def owner_labels(kind: str) -> dict:
+    """Labels marking a resource as created by this process."""
+    return {LABEL: kind, OWNER_LABEL: f"{socket.gethostname()}:{os.getpid()}"}
+
+
+def is_orphan(labels: dict) -> bool:
+    """True if ``labels`` name an owning process on this host that has exited."""
+    host, _, pid = labels.get(OWNER_LABEL, "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # alive, owned by someone else
+    return False
+
+
+@dataclass
+class Resource:
+    """A labelled container, image, volume or network."""
+
+    kind: str  # container | image | volume | network
+    id: str
+    name: str
+    labels: dict = field(default_factory=dict)
+
+    def describe(self) -> str:
+        owner = self.labels.get(OWNER_LABEL, "shared")
+        return f"{self.kind} {self.name or self.id[:12]} ({self.labels.get(LABEL, '?')}, {owner})"
+
+
+def runtime_variable(runtime: str) -> str:
+    """Env var holding the path of ``runtime``'s binary, when it isn't on PATH."""
+    return f"PIPESTEP_{runtime.upper()}"
+
+
+class Backend(ABC):
+    """Interface implemented by every execution backend."""
+
+    name = ""
+    is_remote = False
+
+    @abstractmethod
+    def ensure_image(self, image: str, on_progress=None) -> None:
+        """Make ``image`` available locally, pulling it if needed.
+
+        ``on_progress`` receives :class:`pipestep.images.PullProgress` updates.
+        """
+
+    @abstractmethod
+    def remove_stale(self, container_name: str) -> None:
+        """Remove a leftover container with the given name, if any."""
+
+    @abstractmethod
+    def start(
+        self, image: str, name: str, workdir: str, environment: dict, volumes: Optional[dict] = None,
+        resources: Optional[Resources] = None, scratch: Optional[list[ScratchMount]] = None,
+    ):
+        """Start a long-running container with ``workdir`` at /workspace.
+
+        An empty ``workdir`` means nothing is mounted; /workspace starts
+        empty and is populated through ``put_archive``. ``volumes`` maps
+        named volumes (see ``provide_runtime``) to read-only mount points.
+        ``resources`` limits the container (see ``pipestep.resources``).
+        ``scratch`` directories are RAM-backed, and a persisted one's volume
+        is mounted at its ``store`` (see ``pipestep.scratch``).
+        """
+
+    @abstractmethod
+    def attach(self, container_id: str):
+        """The running container ``container_id`` started by another process (see ``pipestep.state``)."""
+
+    def provide_runtime(self, runtime: str) -> tuple[dict, dict]:
+        """Volumes and env vars that make an action runtime (``node20``...) available to ``start``.
+
+        The default expects the runtime on the container's PATH.
+        """
+        return {}, {}
+
+    def run_image(
+        self, image: str, args: list[str], entrypoint: Optional[list[str]], workdir: str, environment: dict,
+    ) -> tuple[int, bytes, bytes]:
+        """Run a one-off container of ``image`` with ``workdir`` at /workspace.
+
+        Returns the exit code, stdout and stderr; used for container actions.
+        """
+        raise RuntimeError(f"The {self.name} backend can't run container actions; use the docker backend")
+
+    @abstractmethod
+    def commit(self, container, repository: str = "pipestep-fork") -> str:
+        """Snapshot the container's filesystem as a new image and return its reference.
+
+        Bind-mounted content (the workspace, unless it was synced in) is not
+        part of the image.
+        """
+
+    @abstractmethod
+    def remove_image(self, image: str) -> None:
+        """Delete an image created by ``commit``, ignoring errors."""
+
+    @abstractmethod
+    def shell(self, container, env: dict, workdir: str, shell: str = "/bin/bash") -> int:
+        """Run an interactive shell in the container and return its exit code."""
+
+    @abstractmethod
+    def list_resources(self) -> list[Resource]:
+        """Every resource carrying the pipestep label, from any session."""
+
+    @abstractmethod
+    def remove_resource(self, resource: Resource) -> None:
+        """Remove a resource returned by ``list_resources``."""
+
+
+# Connections kept open per daemon; concurrent execs each need one
+DEFAULT_POOL_SIZE = 16
+
+# One client (and so one HTTP connection pool) per daemon endpoint, shared by all engines
+_clients: dict[str, docker.DockerClient] = {}
+_clients_lock = threading.Lock()
+
+# Serializes filling runtime volumes, so concurrent engines copy Node once
+_runtime_lock = threading.Lock()
+
+
+def get_docker_client(base_url: str = "", max_pool_size: int = DEFAULT_POOL_SIZE) -> docker.DockerClient:
+    """Return the shared client for ``base_url`` (default: ``DOCKER_HOST``/local socket).
+
+    Clients are created and pinged once, then reused, so every engine and
+    operation talking to the same daemon shares a keep-alive connection
+    pool. ``ssh://`` endpoints go through the system ``ssh`` binary, which
+    honours ``~/.ssh/config`` and the SSH agent.
+    """
+    endpoint = base_url or os.environ.get("DOCKER_HOST", "")
+    with _clients_lock:
+        client = _clients.get(endpoint)
+        if client is not None:
+            return client
+        use_ssh_client = endpoint.startswith("ssh://")
+        try:
+            if base_url:
+                client = docker.DockerClient(
+                    base_url=base_url, use_ssh_client=use_ssh_client, max_pool_size=max_pool_size,
+                )
+            else:
+                client = docker.from_env(use_ssh_client=use_ssh_client, max_pool_size=max_pool_size)
+            client.ping()
+        except docker.errors.DockerException as e:
+            where = f" at {endpoint}" if endpoint else ". Is Docker Desktop running?"
+            raise RuntimeError(f"Cannot connect to Docker{where}\n  Error: {e}") from e
+        _clients[endpoint] = client
+        return client
+
+
+def is_remote_docker_host(base_url: str = "") -> bool:
+    """True if the endpoint is a daemon on another machine (so bind mounts won't see local files)."""
+    endpoint = base_url or os.environ.get("DOCKER_HOST", "")
+    parsed = urlparse(endpoint)
+    if parsed.scheme == "ssh":
+        return True
+    if parsed.scheme in ("tcp", "http", "https"):
+        return parsed.hostname not in ("localhost", "127.0.0.1", "::1")
+    return False
+
+
+class DockerBackend(Backend):
+    """Runs steps in containers managed by a Docker daemon.
+
+    ``base_url`` selects the daemon (``unix://``, ``tcp://`` or ``ssh://``);
+    by default ``DOCKER_HOST`` or the local socket is used.
+    """
+
+    name = "docker"
+
+    def __init__(self, base_url: str = "", max_pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self.base_url = base_url
+        self.max_pool_size = max_pool_size
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_docker_client(self.base_url, self.max_pool_size)
+        return self._client
+
+    @property
+    def is_remote(self) -> bool:
+        return is_remote_docker_host(self.base_url)
+
+    def ensure_image(self, image: str, on_progress=None) -> None:
+        progress = pull_image(self.client, image, on_progress)
+        if progress.status == "failed":
+            raise RuntimeError(f"Failed to pull {image}: {progress.error}")
+
+    def remove_stale(self, container_name: str) -> None:
+        try:
+            old = self.client.containers.get(container_name)
+            old.remove(force=True)
+        except NotFound:
+            pass
+
+    def start(
+        self, image: str, name: str, workdir: str, environment: dict, volumes: Optional[dict] = None,
+        resources: Optional[Resources] = None, scratch: Optional[list[ScratchMount]] = None,
+    ):
+        mounts = {workdir: {"bind": "/workspace", "mode": "rw"}} if workdir else {}
+        mounts.update({volume: {"bind": path, "mode": "ro"} for volume, path in (volumes or {}).items()})
+        options = resources.docker_options() if resources is not None else {}
+        if scratch:
+            options["tmpfs"] = {**options.get("tmpfs", {}), **{m.path: m.tmpfs_options() for m in scratch}}
+        for mount in scratch or []:
+            if mount.volume:
+                self._ensure_volume(mount.volume, "scratch")
+                mounts[mount.volume] = {"bind": mount.store, "mode": "rw"}
+        return self.client.containers.run(
+            image=image,
+            command="sleep infinity",
+            volumes=mounts,
+            working_dir="/workspace",
+            environment=environment,
+            name=name,
+            labels=owner_labels("job"),
+            detach=True,
+            **options,
+        )
+
+    def attach(self, container_id: str):
+        try:
+            container = self.client.containers.get(container_id)
+        except NotFound:
+            raise RuntimeError(f"Container {container_id[:12]} no longer exists") from None
+        if container.status != "running":
+            raise RuntimeError(f"Container {container.name} is {container.status}, not running")
+        return container
+
+    def provide_runtime(self, runtime: str) -> tuple[dict, dict]:
+        """A ``pipestep-<runtime>`` volume holding the Node binary, filled once from a sidecar image."""
+        image = NODE_RUNTIMES.get(runtime)
+        if image is None:
+            raise RuntimeError(f"Unknown action runtime '{runtime}'. Known: {', '.join(NODE_RUNTIMES)}")
+        volume = f"pipestep-{runtime}"
+        with _runtime_lock:
+            try:
+                self.client.volumes.get(volume)
+            except NotFound:
+                self._fill_runtime_volume(volume, image)
+        mount = f"{RUNTIMES_DIR}/{runtime}"
+        return {volume: mount}, {runtime_variable(runtime): f"{mount}/node"}
+
+    def _ensure_volume(self, volume: str, kind: str) -> None:
+        try:
+            self.client.volumes.get(volume)
+        except NotFound:
+            self.client.volumes.create(volume, labels={LABEL: kind})
+
+    def _fill_runtime_volume(self, volume: str, image: str) -> None:
+        self.ensure_image(image)
+        self.client.volumes.create(volume, labels={LABEL: "runtime"})
+        try:
+            self.client.containers.run(
+                image,
+                ["cp", "-L", "/usr/local/bin/node", "/runtime/node"],
+                volumes={volume: {"bind": "/runtime", "mode": "rw"}},
+                labels=owner_labels("runtime-fill"),
+                remove=True,
+            )
+        except docker.errors.DockerException as e:
+            # Don't leave an empty volume behind to be mistaken for a filled one
+            try:
+                self.client.volumes.get(volume).remove(force=True)
+            except docker.errors.DockerException:
+                pass
+            raise RuntimeError(f"Could not copy Node from {image}: {e}") from e
+
+    def run_image(
+        self, image: str, args: list[str], entrypoint: Optional[list[str]], workdir: str, environment: dict,
+    ) -> tuple[int, bytes, bytes]:
+        self.ensure_image(image)
+        container = self.client.containers.run(
+            image=image,
+            command=args,
+            entrypoint=entrypoint,
+            volumes={workdir: {"bind": "/workspace", "mode": "rw"}},
+            working_dir="/workspace",
+            environment=environment,
+            labels=owner_labels("action"),
+            detach=True,
+        )
+        try:
+            exit_code = container.wait()["StatusCode"]
+            return exit_code, container.logs(stdout=True, stderr=False), container.logs(stdout=False, stderr=True)
+        finally:
+            try:
+                container.remove(force=True)
+            except docker.errors.APIError:
+                pass
+
+    def commit(self, container, repository: str = "pipestep-fork") -> str:
+        tag = uuid.uuid4().hex[:12]
+        container.commit(repository=repository, tag=tag, conf={"Labels": owner_labels("image")})
+        return f"{repository}:{tag}"
+
+    def remove_image(self, image: str) -> None:
+        try:
+            self.client.images.remove(image, force=True)
+        except docker.errors.APIError:
+            pass
+
+    def list_resources(self) -> list[Resource]:
+        label = {"label": LABEL}
+        found = [Resource("container", c.id, c.name, c.labels) for c in self.client.containers.list(all=True, filters=label)]
+        found += [Resource("network", n.id, n.name, n.attrs.get("Labels") or {}) for n in self.client.networks.list(filters=label)]
+        found += [
+            Resource("image", i.id, (i.tags or [""])[0], i.labels or {}) for i in self.client.images.list(filters=label)
+        ]
+        found += [Resource("volume", v.id, v.name, v.attrs.get("Labels") or {}) for v in self.client.volumes.list(filters=label)]
+        return found
+
+    def remove_resource(self, resource: Resource) -> None:
+        if resource.kind == "container":
+            self.client.containers.get(resource.id).remove(force=True)
+        elif resource.kind == "network":
+            self.client.networks.get(resource.id).remove()
+        elif resource.kind == "image":
+            self.client.images.remove(resource.id, force=True)
+        elif resource.kind == "volume":
+            self.client.volumes.get(resource.id).remove(force=True)
+
+    def shell(self, container, env: dict, workdir: str, shell: str = "/bin/bash") -> int:
+        cmd = ["docker", "exec", "-it"]
+        for k, v in env.items():
+            cmd.extend(["-e", f"{k}={v}"])
+        cmd.extend(["-w", workdir, container.id, shell])
+        cli_env = {**os.environ, "DOCKER_HOST": self.base_url} if self.base_url else None
+        return subprocess.call(cmd, env=cli_env)
+
+
+# Where actions from a local mirror are copied inside a container
+ACTIONS_DIR = "/tmp/pipestep-actions"
+
+# Matches /workspace as a whole path component, e.g. "/workspace" or "/workspace/src"
+_WORKSPACE_RE = re.compile(r"(?<![\w./-])/workspace(?![\w.-])")
+_ACTIONS_DIR_RE = re.compile(r"(?<![\w./-])" + re.escape(ACTIONS_DIR) + r"(?![\w.-])")
+
+
+# Local "resources" are temp directories holding this file
+_LABELS_FILE = ".pipestep-labels.json"
+# ...and a container's root also holds what's needed to attach to it from another process
+_CONTAINER_FILE = ".pipestep-container.json"
+
+
+def _write_labels(root: str, labels: dict) -> None:
+    with open(os.path.join(root, _LABELS_FILE), "w") as f:
+        json.dump(labels, f)
+
+
+def _read_labels(root: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(root, _LABELS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _ram_dir() -> Optional[str]:
+    """/dev/shm, where the local backend keeps scratch directories, if it's usable."""
+    return "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+
+
+class LocalContainer:
+    """A "container" that runs commands as host subprocesses.
+
+    This is chroot-lite, not isolation: commands run with the user's
+    privileges on the host. ``/workspace`` in commands, working directories
+    and env values is rewritten to the host workspace, ``ACTIONS_DIR`` to a
+    directory in a private temporary root, and ``HOME`` and ``RUNNER_TEMP``
+    point into that root too. Other ``mounts`` (container path → host
+    directory) are rewritten the same way.
+    """
+
+    def __init__(
+        self, name: str, workdir: str, environment: dict, template: str = "", cpuset: str = "",
+        mounts: Optional[dict[str, str]] = None, scratch_root: str = "",
+    ) -> None:
+        self.name = name
+        self.cpuset = cpuset  # cores commands are pinned to with taskset, if any
+        self.mounts = dict(mounts or {})
+        self.scratch_root = scratch_root  # holds the RAM-backed scratch directories, removed with the container
+        self.id = f"local-{uuid.uuid4().hex[:12]}"
+        self.root = tempfile.mkdtemp(prefix=f"{name}-")
+        if template:
+            # Start from a committed container root (see LocalBackend.commit)
+            shutil.copytree(template, self.root, symlinks=True, dirs_exist_ok=True)
+        _write_labels(self.root, owner_labels("job"))
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.home_dir = os.path.join(self.root, "home")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        os.makedirs(self.home_dir, exist_ok=True)
+        if not workdir:
+            workdir = os.path.join(self.root, "workspace")
+            os.makedirs(workdir, exist_ok=True)
+        self.workdir = workdir
+        self.environment = {
+            **environment,
+            "HOME": self.home_dir,
+            "RUNNER_TEMP": self.tmp_dir,
+            "TMPDIR": self.tmp_dir,
+        }
+        if "/tmp" in self.mounts:
+            # A scratch /tmp replaces the private temp dir
+            self.environment["RUNNER_TEMP"] = self.environment["TMPDIR"] = "/tmp"
+        self.status = "running"
+        with open(os.path.join(self.root, _CONTAINER_FILE), "w") as f:
+            json.dump({
+                "id": self.id, "name": name, "workdir": workdir, "environment": self.environment, "cpuset": cpuset,
+                "mounts": self.mounts, "scratch_root": scratch_root,
+            }, f)
+
+    @classmethod
+    def load(cls, root: str) -> Optional[LocalContainer]:
+        """The container whose root is ``root``, as saved by the process that started it."""
+        try:
+            with open(os.path.join(root, _CONTAINER_FILE)) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        container = cls.__new__(cls)
+        container.name = saved["name"]
+        container.id = saved["id"]
+        container.root = root
+        container.tmp_dir = os.path.join(root, "tmp")
+        container.home_dir = os.path.join(root, "home")
+        container.workdir = saved["workdir"]
+        container.environment = saved["environment"]
+        container.cpuset = saved.get("cpuset", "")
+        container.mounts = saved.get("mounts", {})
+        container.scratch_root = saved.get("scratch_root", "")
+        container.status = "running"
+        return container
+
+    def map_path(self, text: str) -> str:
+        """Rewrite container /workspace (and ``ACTIONS_DIR`` and mount) paths to host paths."""
+        if self.mounts:
+            # One pass, longest first, so a mount inside another maps to its own directory
+            paths = sorted(self.mounts, key=len, reverse=True)
+            pattern = r"(?<![\w./-])(" + "|".join(re.escape(p) for p in paths) + r")(?![\w.-])"
+            text = re.sub(pattern, lambda m: self.mounts[m.group(1)], text)
+        text = _ACTIONS_DIR_RE.sub(lambda _: os.path.join(self.tmp_dir, "pipestep-actions"), text)
+        return _WORKSPACE_RE.sub(lambda _: self.workdir, text)
+
+    def full_env(self, env: dict) -> dict:
+        """Host environment overlaid with container and exec env (paths mapped)."""
+        overlay = {**self.environment, **env}
+        return {**os.environ, **{k: self.map_path(str(v)) for k, v in overlay.items()}}
+
+    def exec_run(self, cmd, environment=None, workdir=None, demux=False, **kwargs) -> ExecResult:
+        if self.status != "running":
+            raise RuntimeError(f"Container {self.name} is not running")
+        argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        argv = [self.map_path(a) for a in argv]
+        if self.cpuset:
+            argv = ["taskset", "-c", self.cpuset, *argv]
+        env = self.full_env(environment or {})
+        cwd = self.map_path(workdir or "/workspace")
+
+        if not os.path.isdir(cwd):
+            message = f"chdir to cwd (\"{cwd}\") failed: no such file or directory\n".encode()
+            return ExecResult(126, (None, message) if demux else message)
+        try:
+            proc = subprocess.run(argv, cwd=cwd, env=env, capture_output=True)
+        except FileNotFoundError as e:
+            message = f"exec: {argv[0]}: {e.strerror}\n".encode()
+            return ExecResult(127, (None, message) if demux else message)
+
+        if demux:
+            return ExecResult(proc.returncode, (proc.stdout or None, proc.stderr or None))
+        return ExecResult(proc.returncode, proc.stdout + proc.stderr)
+
+    def put_archive(self, path: str, data) -> bool:
+        """Extract a tar archive (bytes or file object) at ``path``."""
+        fileobj = io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data
+        # Extraction filters exist from Python 3.11.4 on
+        kwargs = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+        with tarfile.open(fileobj=fileobj, mode="r:*") as tar:
+            tar.extractall(self.map_path(path), **kwargs)
+        return True
+
+    def reload(self) -> None:
+        pass
+
+    def stop(self, timeout: int = 10) -> None:
+        self.status = "exited"
+
+    def remove(self, force: bool = False) -> None:
+        self.status = "removed"
+        shutil.rmtree(self.root, ignore_errors=True)
+        if self.scratch_root:
+            shutil.rmtree(self.scratch_root, ignore_errors=True)
+
+
+class LocalBackend(Backend):
+    """Runs steps directly on the host with ``bash`` — no daemon, no image.
+
+    Only suitable for trusted workflows: there is no filesystem or process
+    isolation, and the host's toolchain stands in for the job image.
+    JavaScript actions use the host's ``node``; container actions can't run.
+    """
+
+    name = "local"
+
+    def __init__(self) -> None:
+        self.containers: dict[str, LocalContainer] = {}
+        # Committed container roots, by image reference
+        self.images: dict[str, str] = {}
+
+    def ensure_image(self, image: str, on_progress=None) -> None:
+        pass
+
+    def remove_stale(self, container_name: str) -> None:
+        old = self.containers.pop(container_name, None)
+        if old is not None:
+            old.remove(force=True)
+
+    def start(
+        self, image: str, name: str, workdir: str, environment: dict, volumes: Optional[dict] = None,
+        resources: Optional[Resources] = None, scratch: Optional[list[ScratchMount]] = None,
+    ) -> LocalContainer:
+        """As ``Backend.start``; of the resource limits, only the cpuset can be applied on the host.
+
+        Scratch directories are host directories under /dev/shm (a tmpfs on
+        Linux), and only paths outside the workspace can be redirected.
+        Their volumes are directories in the temp dir.
+        """
+        cpuset = resources.cpuset if resources is not None else ""
+        if cpuset and shutil.which("taskset") is None:
+            raise RuntimeError("Pinning local steps to a cpuset needs taskset (util-linux)")
+        mounts, scratch_root = {}, ""
+        if scratch:
+            inside = [m.path for m in scratch if m.in_workspace]
+            if inside:
+                raise RuntimeError(
+                    f"The local backend can't put workspace directories on scratch ({', '.join(inside)}); "
+                    "use the docker backend"
+                )
+            scratch_root = tempfile.mkdtemp(prefix=f"{name}-scratch-", dir=_ram_dir())
+            _write_labels(scratch_root, owner_labels("scratch"))
+            mounts[STORE_DIR] = os.path.join(scratch_root, "store")
+            os.makedirs(mounts[STORE_DIR])
+            for index, mount in enumerate(scratch):
+                mounts[mount.path] = os.path.join(scratch_root, str(index))
+                os.makedirs(mounts[mount.path])
+                if mount.volume:
+                    mounts[mount.store] = self._volume_dir(mount.volume, "scratch")
+        container = LocalContainer(
+            name, workdir, environment, template=self.images.get(image, ""), cpuset=cpuset,
+            mounts=mounts, scratch_root=scratch_root,
+        )
+        self.containers[name] = container
+        return container
+
+    def attach(self, container_id: str) -> LocalContainer:
+        for resource in self.list_resources():
+            if resource.kind != "container":
+                continue
+            container = LocalContainer.load(resource.id)
+            if container is not None and container.id == container_id:
+                self.containers[container.name] = container
+                return container
+        raise RuntimeError(f"Container {container_id} no longer exists")
+
+    def _volume_dir(self, volume: str, kind: str) -> str:
+        """The data directory of a named "volume", a labelled directory in the temp dir."""
+        root = os.path.join(tempfile.gettempdir(), volume)
+        os.makedirs(os.path.join(root, "data"), exist_ok=True)
+        if _read_labels(root) is None:
+            _write_labels(root, {LABEL: kind})
+        return os.path.join(root, "data")
+
+    def commit(self, container, repository: str = "pipestep-fork") -> str:
+        image = f"{repository}:{uuid.uuid4().hex[:12]}"
+        root = tempfile.mkdtemp(prefix="pipestep-image-")
+        shutil.copytree(container.root, root, symlinks=True, dirs_exist_ok=True)
+        _write_labels(root, owner_labels("image"))
+        self.images[image] = root
+        return image
+
+    def remove_image(self, image: str) -> None:
+        root = self.images.pop(image, None)
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def list_resources(self) -> list[Resource]:
+        found = []
+        for directory in {tempfile.gettempdir(), _ram_dir() or tempfile.gettempdir()}:
+            for entry in os.scandir(directory):
+                if not entry.name.startswith("pipestep-") or not entry.is_dir(follow_symlinks=False):
+                    continue
+                labels = _read_labels(entry.path)
+                if labels is not None:
+                    kind = {"image": "image", "scratch": "volume"}.get(labels.get(LABEL), "container")
+                    found.append(Resource(kind, entry.path, entry.name, labels))
+        return found
+
+    def remove_resource(self, resource: Resource) -> None:
+        shutil.rmtree(resource.id, ignore_errors=True)
+
+    def shell(self, container, env: dict, workdir: str, shell: str = "/bin/bash") -> int:
+        try:
+            return subprocess.call([shell], cwd=container.map_path(workdir), env=container.full_env(env))
+        except FileNotFoundError:
+            return 127
+
+
+BACKENDS = {
+    "docker": DockerBackend,
+    "local": LocalBackend,
+}
+
+
+def get_backend(name: str, **options) -> Backend:
+    """Instantiate a backend by name, passing backend-specific options."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backend '{name}'. Choose from: {', '.join(BACKENDS)}") from None
+    return cls(**options)
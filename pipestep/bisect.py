@@ -0,0 +1,225 @@
+"""Find the commit that broke a job by bisecting git history.
+
+Each candidate revision is checked out into a temporary worktree, its
+workflow is re-parsed, and the job is run headlessly. Runs share a
+:class:`pipestep.cache.StepCache`, so leading steps that are identical
+across revisions (same image, same commands, same files apart from the
+bisected workflow) run once. Several revisions can be tested at a time;
+each round narrows the range to between the last good and the first bad
+probe.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from pipestep.backends import Backend
+from pipestep.cache import StepCache, run_cached
+from pipestep.local_actions import expand_workflow
+from pipestep.parser import parse_workflow
+from pipestep.runner import StepRun
+
+_worktree_lock = threading.Lock()
+
+
+@dataclass
+class RevisionResult:
+    """Outcome of running the job at one revision."""
+
+    rev: str
+    subject: str = ""
+    runs: list[StepRun] = field(default_factory=list)
+    cached: int = 0
+    error: str = ""
+
+    @property
+    def failing_step(self) -> Optional[StepRun]:
+        for run in self.runs:
+            if run.exit_code not in (0, None):
+                return run
+        return None
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and self.failing_step is None
+
+    def describe(self) -> str:
+        label = f"{self.rev[:10]} {self.subject}".rstrip()
+        if self.error:
+            return f"{label}: bad — {self.error}"
+        failing = self.failing_step
+        if failing is not None:
+            return f"{label}: bad — step {failing.index + 1} '{failing.name}' exited {failing.exit_code}"
+        cached = f" ({self.cached} cached)" if self.cached else ""
+        return f"{label}: good, {len(self.runs)} steps{cached}"
+
+
+@dataclass
+class BisectResult:
+    """The first bad commit (None if ``bad`` itself passed) and every revision tested."""
+
+    first_bad: Optional[RevisionResult]
+    tested: list[RevisionResult]
+    candidates: int
+
+
+def _git(repo: str, *args: str) -> str:
+    return subprocess.check_output(["git", *args], cwd=repo, stderr=subprocess.PIPE).decode().strip()
+
+
+def candidate_revisions(repo: str, good: str, bad: str) -> list[str]:
+    """Commits after ``good`` up to and including ``bad``, oldest first."""
+    try:
+        out = _git(repo, "rev-list", "--reverse", "--ancestry-path", f"{good}..{bad}")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"Cannot list commits {good}..{bad}: {e.stderr.decode(errors='replace').strip()}") from e
+    revs = out.split()
+    if not revs:
+        raise ValueError(f"No commits between {good} and {bad}; is {good} an ancestor of {bad}?")
+    return revs
+
+
+def workspace_key(repo: str, rev: str, workflow_path: str) -> str:
+    """Hash of every file in the revision except ``workflow_path``.
+
+    The workflow's steps are part of each cache key already, so edits to it
+    alone keep the workspace key; anything else the steps may read, scripts
+    under ``.github/`` included, changes it.
+    """
+    workflow = os.path.normpath(workflow_path).replace(os.sep, "/")
+    entries = [
+        line for line in _git(repo, "ls-tree", "-r", "-z", rev).split("\0")
+        if line.split("\t", 1)[-1] != workflow
+    ]
+    return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+
+class _Worktree:
+    """A detached git worktree of one revision, removed on exit."""
+
+    def __init__(self, repo: str, rev: str) -> None:
+        self.repo = repo
+        self.rev = rev
+        self.path = ""
+
+    def __enter__(self) -> str:
+        parent = tempfile.mkdtemp(prefix="pipestep-bisect-")
+        self.path = os.path.join(parent, self.rev[:12])
+        # git serializes worktree bookkeeping through lock files; don't race it
+        with _worktree_lock:
+            _git(self.repo, "worktree", "add", "--detach", "--quiet", self.path, self.rev)
+        return self.path
+
+    def __exit__(self, *exc) -> None:
+        with _worktree_lock:
+            try:
+                _git(self.repo, "worktree", "remove", "--force", self.path)
+            except subprocess.CalledProcessError:
+                pass
+        shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
+
+
+def check_revision(
+    repo: str,
+    rev: str,
+    workflow_path: str,
+    job_name: str,
+    backend: Backend,
+    cache: StepCache,
+    mirrors: Optional[list[str]] = None,
+) -> RevisionResult:
+    """Run ``job_name`` from ``workflow_path`` (relative to the repo root) as of ``rev``."""
+    result = RevisionResult(rev=rev, subject=_git(repo, "log", "-1", "--format=%s", rev))
+    with _Worktree(repo, rev) as tree:
+        path = os.path.join(tree, workflow_path)
+        if not os.path.isfile(path):
+            result.error = f"{workflow_path} does not exist"
+            return result
+        try:
+            workflow = parse_workflow(path)
+            expand_workflow(workflow, tree, mirrors or [])
+        except Exception as e:
+            result.error = f"workflow does not parse: {e}"
+            return result
+        job = next((j for j in workflow.jobs if j.name == job_name), None)
+        if job is None:
+            result.error = f"job '{job_name}' not found"
+            return result
+
+        def _count(run: StepRun, cached: bool) -> None:
+            result.cached += cached
+
+        try:
+            result.runs = run_cached(
+                job, tree, backend, cache, workspace_key(repo, rev, workflow_path), name=rev[:12], on_step=_count,
+            )
+        except Exception as e:
+            result.error = str(e)
+    return result
+
+
+def bisect(
+    repo: str,
+    good: str,
+    bad: str,
+    workflow_path: str,
+    job_name: str,
+    backend: Backend,
+    parallel: int = 1,
+    mirrors: Optional[list[str]] = None,
+    on_result: Optional[Callable[[RevisionResult], None]] = None,
+) -> BisectResult:
+    """Find the first commit in ``good..bad`` at which the job fails.
+
+    ``good`` is assumed to pass; ``bad`` is tested first. Each round tests
+    up to ``parallel`` revisions spread evenly over the remaining range.
+    """
+    revs = candidate_revisions(repo, good, bad)
+    cache = StepCache(backend)
+    tested: dict[int, RevisionResult] = {}
+
+    def _test(index: int) -> RevisionResult:
+        result = check_revision(repo, revs[index], workflow_path, job_name, backend, cache, mirrors)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    try:
+        tested[len(revs) - 1] = _test(len(revs) - 1)
+        if tested[len(revs) - 1].ok:
+            return BisectResult(first_bad=None, tested=list(tested.values()), candidates=len(revs))
+
+        lo, hi = -1, len(revs) - 1  # revs[lo] (or good) passes, revs[hi] fails
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            while hi - lo > 1:
+                probes = _probes(lo, hi, parallel)
+                for index, result in zip(probes, pool.map(_test, probes)):
+                    tested[index] = result
+                bad_probes = [i for i in probes if not tested[i].ok]
+                if bad_probes:
+                    hi = min(bad_probes)
+                good_probes = [i for i in probes if i < hi and tested[i].ok]
+                if good_probes:
+                    lo = max(good_probes)
+    finally:
+        cache.clear()
+    return BisectResult(
+        first_bad=tested[hi],
+        tested=[tested[i] for i in sorted(tested)],
+        candidates=len(revs),
+    )
+
+
+def _probes(lo: int, hi: int, count: int) -> list[int]:
+    """Up to ``count`` indexes strictly between ``lo`` and ``hi``, evenly spaced."""
+    span = hi - lo
+    count = max(1, min(count, span - 1))
+    return sorted({lo + (span * k) // (count + 1) for k in range(1, count + 1)} - {lo, hi})
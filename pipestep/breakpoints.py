@@ -0,0 +1,212 @@
+"""Conditional and data breakpoints, checked as steps finish.
+
+A plain breakpoint (B) stops an auto-run before a step. A conditional
+breakpoint is checked after a step finishes and stops the auto-run when
+it holds. Conditions are written as:
+
+- ``duration > 90`` (or ``90s``, ``1.5m``, ``2h``): the step took longer.
+- ``output ~ <regex>``: the step's output matches.
+- ``changed <path>``: the file's size, modification time or inode changed
+  since the breakpoint was set (or last hit).
+- anything else is an expression, as in ``if:``, over ``step`` (``name``,
+  ``index``, ``exit_code``, ``outcome``, ``duration``) and ``env`` —
+  e.g. ``step.exit_code == 3 || env.TARGET == 'prod'``.
+
+Conditions are parsed once and checked against what the finished step
+already left in memory; only a watched file outside a host-visible
+workspace costs an exec in the container.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Mapping, Optional
+
+from pipestep.expressions import Expression, ExpressionError, parse_expression, to_string, truthy
+from pipestep.models import Step
+
+if TYPE_CHECKING:
+    from pipestep.engine import PipelineEngine
+
+_DURATION_RE = re.compile(r"duration\s*>\s*(\d+(?:\.\d+)?)\s*(s|m|h)?", re.IGNORECASE)
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+
+@dataclass
+class StepEvent:
+    """A finished step, as seen by conditions."""
+
+    index: int
+    step: Step
+    exit_code: int
+    output: str
+    duration: float
+    env: Mapping[str, str] = field(default_factory=dict)
+    engine: Optional[PipelineEngine] = None  # for file watches
+
+
+class Condition:
+    """Something to check after a step; ``check`` returns why it holds, or an empty string."""
+
+    text = ""
+
+    def check(self, event: StepEvent) -> str:
+        raise NotImplementedError
+
+
+class DurationCondition(Condition):
+    def __init__(self, text: str, seconds: float) -> None:
+        self.text = text
+        self.seconds = seconds
+
+    def check(self, event: StepEvent) -> str:
+        if event.duration > self.seconds:
+            return f"took {event.duration:.1f}s (> {self.seconds:g}s)"
+        return ""
+
+
+class OutputCondition(Condition):
+    def __init__(self, text: str, pattern: str) -> None:
+        self.text = text
+        try:
+            self.pattern = re.compile(pattern, re.MULTILINE)
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{pattern}': {e}") from None
+
+    def check(self, event: StepEvent) -> str:
+        match = self.pattern.search(event.output)
+        if match is None:
+            return ""
+        line = event.output[event.output.rfind("\n", 0, match.start()) + 1:].split("\n", 1)[0]
+        return f"output matched /{self.pattern.pattern}/: {line.strip()[:80]}"
+
+
+class FileCondition(Condition):
+    def __init__(self, text: str, path: str) -> None:
+        self.text = text
+        self.path = path if path.startswith("/") else f"/workspace/{path}"
+        self.signature: Optional[tuple] = None
+        self.primed = False
+
+    def prime(self, engine: PipelineEngine) -> None:
+        """Record the file's current state; later changes are hits."""
+        self.signature = path_signature(engine, self.path)
+        self.primed = True
+
+    def check(self, event: StepEvent) -> str:
+        if event.engine is None:
+            return ""
+        if not self.primed:
+            self.prime(event.engine)
+            return ""
+        signature = path_signature(event.engine, self.path)
+        if signature == self.signature:
+            return ""
+        before, self.signature = self.signature, signature
+        if before is None:
+            return f"{self.path} was created"
+        return f"{self.path} was deleted" if signature is None else f"{self.path} changed"
+
+
+class ExpressionCondition(Condition):
+    def __init__(self, text: str, expression: Expression) -> None:
+        self.text = text
+        self.expression = expression
+        unknown = expression.contexts() - {"step", "env"}
+        if unknown:
+            raise ValueError(f"Breakpoint conditions can read step and env, not: {', '.join(sorted(unknown))}")
+
+    def check(self, event: StepEvent) -> str:
+        context = {
+            "step": {
+                "name": event.step.name,
+                "index": event.index,
+                "exit_code": event.exit_code,
+                "outcome": "success" if event.exit_code == 0 else "failure",
+                "duration": event.duration,
+            },
+        }
+        if "env" in self.expression.contexts():
+            context["env"] = dict(event.env)
+        status = "success" if event.exit_code == 0 else "failure"
+        try:
+            value = self.expression.evaluate(context, status)
+        except ExpressionError as e:
+            # Stopping is the safe side of a broken condition during an unattended run
+            return f"{self.text} could not be evaluated: {e}"
+        return f"{self.text} is {to_string(value)}" if truthy(value) else ""
+
+
+def parse_condition(text: str) -> Condition:
+    """Parse a condition (see the module docstring); raises ValueError if it's invalid."""
+    text = text.strip()
+    if not text:
+        raise ValueError("Empty breakpoint condition")
+    duration = _DURATION_RE.fullmatch(text)
+    if duration:
+        return DurationCondition(text, float(duration.group(1)) * _UNITS[(duration.group(2) or "").lower()])
+    keyword, _, rest = text.partition(" ")
+    if keyword == "output" and rest.lstrip().startswith("~"):
+        return OutputCondition(text, rest.lstrip()[1:].strip())
+    if keyword == "changed" and rest.strip():
+        return FileCondition(text, rest.strip())
+    return ExpressionCondition(text, parse_expression(text))
+
+
+def path_signature(engine: PipelineEngine, path: str) -> Optional[tuple]:
+    """Something that changes when the file at container ``path`` does; None if it doesn't exist.
+
+    Workspace files are stat'ed on the host when the workspace is a host
+    directory; anything else is checksummed with one exec.
+    """
+    workspace = engine.workspace
+    if workspace is not None and workspace.path and (path == "/workspace" or path.startswith("/workspace/")):
+        host_path = os.path.join(workspace.path, path[len("/workspace/"):])
+        try:
+            st = os.stat(host_path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+    if engine.container is None:
+        return None
+    result = engine.container.exec_run(f"cksum {shlex.quote(path)}", demux=True)
+    if result.exit_code != 0:
+        return None
+    return tuple((result.output[0] or b"").split()[:2])
+
+
+@dataclass
+class ConditionalBreakpoint:
+    """A condition, checked after one step (``step`` is its index) or after every step."""
+
+    condition: Condition
+    step: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        return self.condition.text
+
+    def describe(self) -> str:
+        scope = "any step" if self.step is None else f"step {self.step + 1}"
+        return f"{self.text} (after {scope})"
+
+    def to_dict(self) -> dict:
+        return {"condition": self.text, "step": self.step}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ConditionalBreakpoint:
+        return cls(parse_condition(data["condition"]), data.get("step"))
+
+
+def check_breakpoints(breakpoints: list[ConditionalBreakpoint], event: StepEvent) -> list[str]:
+    """Reasons to stop after ``event``: one per conditional breakpoint that holds."""
+    hits = []
+    for bp in breakpoints:
+        if bp.step is None or bp.step == event.index:
+            reason = bp.condition.check(event)
+            if reason:
+                hits.append(reason)
+    return hits
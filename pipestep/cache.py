@@ -0,0 +1,195 @@
+"""Prefix step cache: reuse container state for identical leading steps.
+
+After a step passes, the container is committed and stored under a key
+derived from the job image, a workspace key and every step up to and
+including this one. A later run whose leading steps hash the same starts
+from the deepest cached image and replays the cached results, instead of
+re-executing those steps.
+
+The workspace has to live inside the container for a commit to capture
+it, so cached runs use the ``sync`` mount mode.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Optional
+
+from pipestep.backends import Backend
+from pipestep.engine import PipelineEngine
+from pipestep.history import History, StepRecord
+from pipestep.models import Job, StepResult
+from pipestep.resources import Resources
+from pipestep.runner import StepRun, runnable_step
+from pipestep.teardown import run_concurrently
+
+
+@dataclass
+class CacheEntry:
+    """Cached outcome of a step prefix; ``image`` is empty when the step failed."""
+
+    run: StepRun
+    image: str = ""
+
+
+class StepCache:
+    """Thread-safe cache of step-prefix outcomes, owning the images it commits."""
+
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+        self._entries: dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            old = self._entries.get(key)
+            self._entries[key] = entry
+        # Concurrent runs may commit the same prefix; keep one image
+        if old is not None and old.image and old.image != entry.image:
+            self.backend.remove_image(old.image)
+
+    def clear(self) -> None:
+        """Forget every entry and delete the committed images."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        run_concurrently([
+            lambda image=entry.image: self.backend.remove_image(image) for entry in entries if entry.image
+        ])
+
+
+def prefix_keys(job: Job, workspace_key: str) -> list[str]:
+    """Cache key for each prefix of ``job.steps`` (key i covers steps 0..i)."""
+    digest = hashlib.sha256(json.dumps([job.docker_image, workspace_key, dict(job.env)], sort_keys=True).encode())
+    keys = []
+    for step in job.steps:
+        target = runnable_step(step)
+        if target is None:
+            spec = [step.action_ref, None]
+        else:
+            spec = [target.command, dict(target.env), target.working_directory, target.image, target.entrypoint]
+            if target.shell:
+                spec.append(target.shell)
+        digest.update(json.dumps(spec, sort_keys=True).encode())
+        keys.append(digest.copy().hexdigest())
+    return keys
+
+
+def run_cached(
+    job: Job,
+    workdir: str,
+    backend: Backend,
+    cache: StepCache,
+    workspace_key: str,
+    name: str = "",
+    on_step: Optional[Callable[[StepRun, bool], None]] = None,
+    cache_limit: Optional[int] = None,
+    resources: Optional[Resources] = None,
+    warm_python: bool = False,
+    history: Optional[History] = None,
+    workflow: str = "",
+) -> list[StepRun]:
+    """Run ``job`` headlessly until its first failure, reusing cached prefixes.
+
+    ``on_step`` receives each step's run and whether it came from the cache.
+    Steps with no local equivalent are skipped (and don't change the state).
+    Only the first ``cache_limit`` steps (default: all) are added to the cache.
+    ``resources`` limits the job's container; ``warm_python`` runs its
+    ``shell: python`` steps in a warm interpreter. With ``history``, each
+    step that ran or was replayed is recorded there under ``workflow``.
+    """
+    keys = prefix_keys(job, workspace_key)
+    limits = resources.describe() if resources is not None else Resources().describe()
+
+    def _done(run: StepRun, cached: bool) -> None:
+        if history is not None and not run.skipped:
+            history.record(StepRecord(
+                workflow=workflow,
+                job=job.name,
+                step=run.name,
+                image=job.docker_image,
+                backend=backend.name,
+                duration=run.duration,
+                exit_code=run.exit_code,
+                cached=cached,
+                resources=limits,
+                index=run.index,
+            ))
+        if on_step is not None:
+            on_step(run, cached)
+
+    runs: list[StepRun] = []
+    image = ""
+    for key in keys:
+        entry = cache.get(key)
+        if entry is None:
+            break
+        runs.append(entry.run)
+        _done(entry.run, True)
+        if not entry.image:
+            return runs  # the cached prefix ends in a failure
+        image = entry.image
+    if len(runs) == len(keys):
+        return runs
+
+    engine = PipelineEngine(
+        job=replace(job, docker_image=image) if image else job,
+        workdir=workdir,
+        backend=backend,
+        mount_mode="sync",
+        resources=resources,
+        warm_python=warm_python,
+    )
+    if name:
+        engine._container_name += f"-{name}"
+    if image:
+        engine._resync = False  # the workspace is already inside the cached image
+    try:
+        engine.setup()
+        for index in range(len(runs), len(job.steps)):
+            step = job.steps[index]
+            target = runnable_step(step)
+            if target is None:
+                run = StepRun(index, step.name, "", None, skipped=f"no local equivalent for {step.action_ref}")
+            else:
+                start = time.monotonic()
+                try:
+                    result = engine.run_step(target)
+                except Exception as e:
+                    result = StepResult(exit_code=1, stdout="", stderr=str(e))
+                run = StepRun(
+                    index, step.name, target.command, result.exit_code,
+                    duration=time.monotonic() - start,
+                    output=result.stdout + result.stderr,
+                )
+            runs.append(run)
+            _done(run, False)
+            if cache_limit is not None and index >= cache_limit:
+                if run.exit_code not in (0, None):
+                    break
+                continue
+            if run.exit_code not in (0, None):
+                cache.put(keys[index], CacheEntry(run=run))
+                break
+            cache.put(keys[index], CacheEntry(run=run, image=engine.commit()))
+    finally:
+        engine.cleanup()
+    return runs
@@ -4,9 +4,20 @@ from __future__ import annotations
 
 import sys
 import os
+import sqlite3
+import subprocess
 import yaml
 from pipestep import __version__
+from pipestep.backends import Backend, get_backend
+from pipestep.history import History
+from pipestep.images import PullProgress, collect_images, pull_images, start_prefetch, summarize
+from pipestep.local_actions import expand_workflow, mirror_dirs
+from pipestep.models import Job, Workflow
 from pipestep.parser import parse_workflow
+from pipestep.resources import Resources, job_resources
+from pipestep.scratch import ScratchMount, parse_scratch, persist_to_volumes
+from pipestep.stress import DEFAULT_RUNS
+from pipestep.workspace import MOUNT_MODES
 
 
 def main() -> None:
@@ -16,7 +27,7 @@ def main() -> None:
     except KeyboardInterrupt:
         print()
         sys.exit(130)
-    except ValueError as e:
+    except (ValueError, RuntimeError) as e:
         print(f"Error: {e}")
         sys.exit(1)
     except yaml.YAMLError as e:
@@ -34,38 +45,30 @@ def _run() -> None:
         _print_help()
         sys.exit(0)
 
-    if len(sys.argv) < 3 or sys.argv[1] != "run":
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        _print_help()
+        sys.exit(1)
+    if len(sys.argv) < 3 and sys.argv[1] not in NO_ARGUMENT_COMMANDS:
         _print_help()
         sys.exit(1)
 
-    if sys.argv[2] in ("--help", "-h"):
+    if len(sys.argv) >= 3 and sys.argv[2] in ("--help", "-h"):
         _print_help()
         sys.exit(0)
 
-    workflow_path = sys.argv[2]
-    if not os.path.exists(workflow_path):
-        print(f"Error: File not found: {workflow_path}")
-        sys.exit(1)
-    if not os.path.isfile(workflow_path):
-        print(f"Error: Not a file: {workflow_path}")
-        sys.exit(1)
+    COMMANDS[sys.argv[1]](sys.argv[2] if len(sys.argv) >= 3 else "")
 
-    workdir = "."
-    if "--workdir" in sys.argv:
-        idx = sys.argv.index("--workdir")
-        if idx + 1 < len(sys.argv):
-            workdir = sys.argv[idx + 1]
-        else:
-            print("Error: --workdir requires a path argument")
-            sys.exit(1)
 
-    workdir = os.path.abspath(workdir)
+def _run_workflow(workflow_path: str) -> None:
+    workdir = os.path.abspath(_option("--workdir", ".", "a path"))
+    backend = _backend_from_args()
+    # A remote daemon can't bind-mount local files, so stream the workspace instead
+    mount_mode = _option("--mount", "sync" if backend.is_remote else "rw", "a mode")
+    if mount_mode not in MOUNT_MODES:
+        raise ValueError(f"Unknown mount mode '{mount_mode}'. Choose from: {', '.join(MOUNT_MODES)}")
+    stress_runs = _int_option("--stress-runs", DEFAULT_RUNS)
 
-    try:
-        workflow = parse_workflow(workflow_path)
-    except Exception as e:
-        print(f"Error parsing workflow: {e}")
-        sys.exit(1)
+    workflow = _load_workflow(workflow_path, workdir)
 
     print(f"Workflow: {workflow.name}")
     print(f"Trigger:  {workflow.trigger}")
@@ -75,6 +78,13 @@ def _run() -> None:
         print("Error: No jobs found in workflow.")
         sys.exit(1)
 
+    # Start pulling every job's images now, while the user is still choosing a job
+    if backend.name == "docker":
+        try:
+            start_prefetch(backend.client, collect_images(workflow))
+        except RuntimeError:
+            pass  # connection errors are reported when the container is set up
+
     if len(workflow.jobs) == 1:
         job = workflow.jobs[0]
     else:
@@ -102,6 +112,13 @@ def _run() -> None:
     print(f"\nJob: {job.name}")
     print(f"Image: {job.docker_image}")
     print(f"Steps: {len(job.steps)} total, {len(run_steps)} runnable, {action_steps} actions")
+    _warn_local_limits(backend)
+    resources = _resources_from_args(job, backend)
+    print(f"Resources: {resources.describe()}")
+    scratch = _scratch_from_args(job, workdir)
+    if scratch:
+        print(f"Scratch (tmpfs): {', '.join(m.describe() for m in scratch)}")
+    warm_python = "--warm-python" in sys.argv
 
     if len(job.steps) == 0:
         print("\nError: This job has no steps defined.")
@@ -112,29 +129,544 @@ def _run() -> None:
         print("PipeStep will offer local equivalents where available.")
 
     print()
-    print(f"⚠  {workdir} will be mounted read-write into the container.")
-    print(f"   Steps can modify your files. Use --workdir to mount a copy if concerned.")
+    if backend.name == "local":
+        print(f"⚠  Steps will run directly on this machine (local backend).")
+        print(f"   There is no container isolation. Only use this for trusted workflows.")
+    if mount_mode == "rw":
+        print(f"⚠  {workdir} will be mounted read-write at /workspace.")
+        print(f"   Steps can modify your files. Use --mount overlay or --mount snapshot to isolate them.")
+    elif mount_mode == "sync":
+        print(f"   {workdir} will be copied into the container; press W in the TUI to push later edits.")
+    else:
+        print(f"   {workdir} will be mounted as an isolated {mount_mode}; your files will not be modified.")
+    in_workspace = [m.path[len("/workspace/"):] for m in scratch if m.in_workspace]
+    if in_workspace:
+        print(f"   {', '.join(in_workspace)} will be RAM-backed; what steps write there stays in the container.")
     print()
 
+    if "--detach" in sys.argv:
+        _start_detached(workflow, job, workdir, backend, mount_mode, resources, scratch, warm_python)
+        return
+
     from pipestep.tui import PipeStepApp
-    app = PipeStepApp(workflow=workflow, job=job, workdir=workdir)
-    app.run()
+    history = _open_history()
+    app = PipeStepApp(
+        workflow=workflow, job=job, workdir=workdir, backend=backend,
+        mount_mode=mount_mode, stress_runs=stress_runs, history=history, resources=resources, scratch=scratch,
+        warm_python=warm_python,
+    )
+    _run_app(app, history)
+
+
+def _run_app(app, history) -> None:
+    """Run the TUI; if the user detached, say how to come back."""
+    from pipestep.state import SessionState
+
+    try:
+        result = app.run()
+    finally:
+        if history is not None:
+            history.close()
+    if isinstance(result, SessionState):
+        print(f"Detached session {result.id}; the container is still running.")
+        print(f"  Reattach with: pipestep attach {result.id}")
+
+
+def _start_detached(
+    workflow: Workflow, job, workdir: str, backend: Backend, mount_mode: str, resources: Resources,
+    scratch: list[ScratchMount], warm_python: bool,
+) -> None:
+    """Set up the job's container without the TUI and leave it running for ``pipestep attach``."""
+    from pipestep.engine import PipelineEngine
+    from pipestep.state import engine_state
+
+    engine = PipelineEngine(
+        job=job, workdir=workdir, backend=backend, mount_mode=mount_mode, resources=resources, scratch=scratch,
+        warm_python=warm_python,
+    )
+    print(f"Setting up container ({backend.name} backend)...")
+    try:
+        engine.setup()
+        state = engine_state(engine, workflow.path)
+        state.save()
+    except BaseException:
+        engine.cleanup()
+        raise
+    engine.detach()
+    print(f"Detached session {state.id}; the container is running.")
+    print(f"  Attach with: pipestep attach {state.id}")
+
+
+def _attach(session_id: str) -> None:
+    """Reattach the TUI to a detached session, list them, or discard one."""
+    from pipestep.engine import PipelineEngine
+    from pipestep.state import find_state, list_states
+
+    if not session_id or session_id.startswith("--"):
+        states = list_states()
+        if not states:
+            print("No detached sessions.")
+            return
+        print("Detached sessions:")
+        for state in states:
+            print(f"  {state.describe()}")
+        return
+
+    state = find_state(session_id)
+    if state.in_use:
+        raise RuntimeError(f"Session {state.id} is attached in another process ({state.attached})")
+    backend = get_backend(state.backend, base_url=state.docker_host) if state.docker_host else get_backend(state.backend)
+
+    if "--discard" in sys.argv:
+        engine = PipelineEngine(
+            job=Job(name=state.job, runs_on="", docker_image=""),
+            workdir=state.workdir, backend=backend, mount_mode=state.mount_mode,
+            scratch=[ScratchMount.from_dict(m) for m in state.scratch],
+        )
+        try:
+            engine.attach(state.container_id, state.workspace, state.environment, state.owner)
+        except RuntimeError as e:
+            print(f"⚠ Warning: {e}", file=sys.stderr)
+        engine.cleanup()
+        state.remove()
+        print(f"Discarded session {state.id}.")
+        return
+
+    workflow = _load_workflow(state.workflow_path, state.workdir)
+    job = next((j for j in workflow.jobs if j.name == state.job), None)
+    if job is None:
+        raise ValueError(f"Job '{state.job}' is no longer in {state.workflow_path}")
+
+    from pipestep.tui import PipeStepApp
+    history = _open_history()
+    app = PipeStepApp(
+        workflow=workflow, job=job, workdir=state.workdir, backend=backend, mount_mode=state.mount_mode,
+        stress_runs=_int_option("--stress-runs", DEFAULT_RUNS), history=history, state=state,
+    )
+    _run_app(app, history)
+
+
+def _pull(workflow_path: str) -> None:
+    """Pull every image used by a workflow, concurrently, with progress."""
+    backend = _backend_from_args()
+    if backend.name != "docker":
+        raise ValueError("pipestep pull only applies to the docker backend")
+    workflow = _load_workflow(workflow_path)
+    images = collect_images(workflow)
+    print(f"Pulling {len(images)} images for {workflow.name}")
+    client = backend.client
+
+    reported: set[str] = set()
+    interactive = sys.stdout.isatty()
+
+    def _progress(pulls: list[PullProgress]) -> None:
+        for pull in pulls:
+            if pull.finished and pull.image not in reported:
+                reported.add(pull.image)
+                mark = "✗" if pull.status == "failed" else "✓"
+                print(f"\r\033[K  {mark} {pull.describe()}" if interactive else f"  {mark} {pull.describe()}")
+        if interactive:
+            print(f"\r\033[K  {summarize(pulls)}", end="", flush=True)
+
+    results = pull_images(client, images, on_progress=_progress)
+    if interactive:
+        print("\r\033[K", end="")
+    failed = [r for r in results if r.status == "failed"]
+    if failed:
+        print(f"{len(failed)} of {len(results)} images failed to pull.")
+        sys.exit(1)
+    print("All images ready.")
+
+
+def _replay(session_path: str) -> None:
+    """Re-run recorded sessions headlessly and compare outcomes with the recordings."""
+    from pipestep.session import format_report, replay_sessions
+
+    paths = _positional()
+    missing = [p for p in paths if not os.path.isfile(p)]
+    if missing:
+        print(f"Error: File not found: {missing[0]}")
+        sys.exit(1)
+    workdir = _option("--workdir", "", "a path")
+    repeat = _int_option("--repeat", 1)
+    parallel = _int_option("--parallel", 4)
+    remote = _backend_from_args().is_remote
+    mount_mode = _option("--mount", "sync" if remote else "snapshot", "a mode")
+    if mount_mode not in MOUNT_MODES:
+        raise ValueError(f"Unknown mount mode '{mount_mode}'. Choose from: {', '.join(MOUNT_MODES)}")
+
+    reports = replay_sessions(
+        paths,
+        workdir=os.path.abspath(workdir) if workdir else "",
+        backend_factory=_backend_from_args,
+        mount_mode=mount_mode,
+        repeat=repeat,
+        parallel=parallel,
+    )
+    for report in reports:
+        print("\n".join(format_report(report)))
+    failed = sum(1 for r in reports if not r.ok)
+    print()
+    if failed:
+        print(f"{failed} of {len(reports)} sessions did not reproduce.")
+        sys.exit(1)
+    print(f"All {len(reports)} sessions reproduced.")
+
+
+def _plan(workflow_path: str) -> None:
+    """Show what a run would do, without starting a container."""
+    import glob
+    from pipestep.plan import format_plan, plan_workflow
+    from pipestep.session import historical_durations
+
+    workdir = os.path.abspath(_option("--workdir", ".", "a path"))
+    backend = _backend_from_args()
+    sessions = _option("--sessions", "pipestep-session-*.jsonl", "a glob pattern")
+    workflow = _load_workflow(workflow_path, workdir)
+    durations = historical_durations(sorted(glob.glob(sessions)))
+    history = _open_history()
+    if history is not None:
+        # The history database is more complete; session recordings fill gaps
+        durations = {**durations, **history.durations(workflow.path)}
+        history.close()
+    plan = plan_workflow(workflow, backend, workdir, durations, job_name=_option("--job", "", "a job name"))
+    print("\n".join(format_plan(plan)))
+
+
+def _bisect(workflow_path: str) -> None:
+    """Find the first commit at which a job starts failing."""
+    from pipestep.bisect import bisect
+
+    good = _option("--good", "", "a revision")
+    if not good:
+        raise ValueError("pipestep bisect needs --good <revision> (a commit where the job passed)")
+    bad = _option("--bad", "HEAD", "a revision")
+    parallel = _int_option("--parallel", 1)
+    backend = _backend_from_args()
+    if backend.is_remote:
+        raise ValueError("pipestep bisect needs a local Docker daemon or --backend local")
+
+    workflow = _load_workflow(workflow_path)
+    try:
+        repo = subprocess.check_output(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=os.path.dirname(os.path.abspath(workflow_path)), stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        raise ValueError(f"{workflow_path} is not inside a git repository") from None
+    rel_path = os.path.relpath(os.path.realpath(workflow_path), os.path.realpath(repo))
+
+    job_name = _option("--job", "", "a job name")
+    if not job_name:
+        if len(workflow.jobs) != 1:
+            names = ", ".join(j.name for j in workflow.jobs)
+            raise ValueError(f"Workflow has several jobs; choose one with --job ({names})")
+        job_name = workflow.jobs[0].name
+
+    print(f"Bisecting {job_name} in {rel_path}: {good} (good) .. {bad} (bad)")
+    result = bisect(
+        repo, good, bad, rel_path, job_name, backend, parallel=parallel, mirrors=mirror_dirs(_action_mirror()),
+        on_result=lambda r: print(f"  {'✓' if r.ok else '✗'} {r.describe()}"),
+    )
+    print()
+    if result.first_bad is None:
+        print(f"{bad} passes; nothing to bisect.")
+        sys.exit(1)
+    first = result.first_bad
+    print(f"First bad commit: {first.rev}")
+    print(f"  {first.subject}")
+    failing = first.failing_step
+    if failing is not None:
+        print(f"First failing step: {failing.index + 1}. {failing.name} (exit {failing.exit_code})")
+        for line in failing.output.splitlines()[-10:]:
+            print(f"  | {line}")
+    elif first.error:
+        print(f"  {first.error}")
+    print(f"Tested {len(result.tested)} of {result.candidates} commits.")
+
+
+def _run_all(workflow_path: str) -> None:
+    """Run every job headlessly, running leading steps shared between jobs once."""
+    from pipestep.jobs import run_jobs, shared_prefixes
+
+    workdir = os.path.abspath(_option("--workdir", ".", "a path"))
+    backend = _backend_from_args()
+    parallel = _int_option("--parallel", 4)
+    workflow = _load_workflow(workflow_path, workdir)
+    job_name = _option("--job", "", "a job name")
+    jobs = [j for j in workflow.jobs if not job_name or j.name == job_name]
+    if not jobs:
+        raise ValueError(f"Job '{job_name}' not found. Jobs: {', '.join(j.name for j in workflow.jobs)}")
+
+    pin_cores = "--pin-cores" in sys.argv
+    _warn_local_limits(backend)
+    resources = {job.name: _resources_from_args(job, backend) for job in jobs}
+
+    shared = shared_prefixes(jobs, workdir)
+    pinned = ", each pinned to its own cores" if pin_cores else ""
+    print(f"Running {len(jobs)} jobs of {workflow.name} ({parallel} at a time{pinned})")
+    for job in jobs:
+        note = f", first {shared[job.name]} shared" if shared[job.name] else ""
+        print(f"  {job.name}: {len(job.steps)} steps{note}; {resources[job.name].describe()}")
+    print()
+    if backend.name == "local":
+        print("⚠  Steps will run directly on this machine (local backend).")
+    history = _open_history()
+    try:
+        results = run_jobs(
+            jobs, workdir, backend, parallel=parallel,
+            on_job=lambda r: print(f"  {'✓' if r.ok else '✗'} {r.describe()}"),
+            resources=resources, pin_cores=pin_cores, warm_python="--warm-python" in sys.argv,
+            history=history, workflow=workflow.path,
+        )
+    finally:
+        if history is not None:
+            history.close()
+    failed = [r for r in results if not r.ok]
+    print()
+    if failed:
+        print(f"{len(failed)} of {len(results)} jobs failed.")
+        sys.exit(1)
+    print(f"All {len(results)} jobs passed.")
+
+
+def _gc(_: str) -> None:
+    """Remove containers, images, volumes and networks left behind by crashed sessions."""
+    from pipestep.state import detached_owners
+    from pipestep.teardown import collect_garbage
+
+    backend = _backend_from_args()
+    everything = "--all" in sys.argv
+    dry_run = "--dry-run" in sys.argv
+    resources = collect_garbage(backend, everything=everything, dry_run=dry_run, keep_owners=detached_owners())
+    if not resources:
+        print("Nothing to clean up.")
+        return
+    verb = "Would remove" if dry_run else "Removed"
+    print(f"{verb} {len(resources)} resource(s):")
+    for resource in resources:
+        print(f"  {resource.describe()}")
+
+
+def _open_history():
+    """Open the step history database, or None if it can't be used."""
+    try:
+        return History()
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠ Step history unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def _load_workflow(workflow_path: str, workdir: str = "") -> Workflow:
+    """Parse a workflow; with ``workdir``, also expand its local composite actions."""
+    if not os.path.exists(workflow_path):
+        print(f"Error: File not found: {workflow_path}")
+        sys.exit(1)
+    if not os.path.isfile(workflow_path):
+        print(f"Error: Not a file: {workflow_path}")
+        sys.exit(1)
+    try:
+        workflow = parse_workflow(workflow_path)
+    except Exception as e:
+        print(f"Error parsing workflow: {e}")
+        sys.exit(1)
+    if workdir:
+        expand_workflow(workflow, workdir, mirror_dirs(_action_mirror()))
+    return workflow
+
+
+def _action_mirror() -> str:
+    return _option("--action-mirror", "", "a path")
+
+
+def _backend_from_args() -> Backend:
+    backend_name = _option("--backend", "docker", "a backend name")
+    docker_host = _option("--docker-host", "", "a URL")
+    if docker_host and backend_name != "docker":
+        raise ValueError("--docker-host only applies to the docker backend")
+    if docker_host:
+        return get_backend(backend_name, base_url=docker_host)
+    return get_backend(backend_name)
+
+
+# Resource limit flags, by the pipestep.resources.Resources field they set
+RESOURCE_FLAGS = {
+    "--cpus": "cpus",
+    "--cpuset-cpus": "cpuset",
+    "--memory": "memory",
+    "--pids-limit": "pids",
+    "--shm-size": "shm_size",
+    "--tmp-size": "tmp_size",
+}
+
+
+def _resources_from_args(job: Job, backend: Backend) -> Resources:
+    """The limits for ``job``'s container: its runner size, then container options, then flags."""
+    overrides = {name: _option(flag, "", "a value") for flag, name in RESOURCE_FLAGS.items() if flag in sys.argv}
+    resources = job_resources(job, _option("--runner-size", "auto", "a size"), overrides)
+    if backend.name != "local":
+        return resources
+    # The host can't enforce a container's limits, only pin steps to cores
+    return Resources(cpuset=resources.cpuset)
+
+
+def _scratch_from_args(job: Job, workdir: str) -> list[ScratchMount]:
+    """RAM-backed directories from ``--scratch``, given volumes with ``--persist-scratch``."""
+    scratch = parse_scratch(_option("--scratch", "", "a list of directories"), _option("--scratch-size", "", "a size"))
+    if "--persist-scratch" in sys.argv:
+        if not scratch:
+            raise ValueError("--persist-scratch needs --scratch")
+        persist_to_volumes(scratch, job.name, workdir)
+    return scratch
+
+
+def _warn_local_limits(backend: Backend) -> None:
+    unenforced = (RESOURCE_FLAGS.keys() - {"--cpuset-cpus"}) | {"--runner-size"}
+    if backend.name == "local" and any(flag in sys.argv for flag in unenforced):
+        print("⚠ Warning: the local backend can only pin steps to --cpuset-cpus; other limits are ignored",
+              file=sys.stderr)
+
+
+def _option(flag: str, default: str, what: str) -> str:
+    """Return the value following ``flag`` in argv, or ``default`` if absent."""
+    if flag not in sys.argv:
+        return default
+    idx = sys.argv.index(flag)
+    if idx + 1 < len(sys.argv):
+        return sys.argv[idx + 1]
+    print(f"Error: {flag} requires {what} argument")
+    sys.exit(1)
+
+
+def _int_option(flag: str, default: int) -> int:
+    value = _option(flag, str(default), "a number")
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{flag} must be a positive integer, got '{value}'")
+    return int(value)
+
+
+def _positional() -> list[str]:
+    """Arguments after the command that are neither flags nor flag values."""
+    args = []
+    skip = False
+    for arg in sys.argv[2:]:
+        if skip:
+            skip = False
+        elif arg.startswith("--"):
+            skip = True
+        else:
+            args.append(arg)
+    return args
 
 
 def _print_help() -> None:
     """Print CLI usage information."""
     print(f"pipestep {__version__} — Interactive CI pipeline debugger")
     print()
-    print("Usage: pipestep run <workflow.yml> [options]")
+    print("Usage: pipestep <command> <workflow.yml> [options]")
+    print("       pipestep replay <session.jsonl>... [options]")
+    print("       pipestep attach [<session-id>] [--discard]")
+    print("       pipestep gc [--all] [--dry-run] [--backend <name>]")
+    print()
+    print("Commands:")
+    print("  run               Step through a job interactively (--detach: start the")
+    print("                    container and leave it running for attach; D in the")
+    print("                    TUI detaches too)")
+    print("  attach            Reattach to a detached session, or list them")
+    print("                    (--discard: remove its container instead)")
+    print("  pull              Pull every image the workflow uses, in parallel")
+    print("  plan              Show what a run would do, without starting containers:")
+    print("                    images to pull, matrix, if: results, historical timings")
+    print("  run-all           Run every job headlessly; leading steps that jobs share")
+    print("                    run once and each job forks from the result")
+    print("  gc                Remove containers, images and volumes left by crashed")
+    print("                    sessions, keeping detached ones (--all: everything")
+    print("                    pipestep created, including cached runtimes, scratch")
+    print("                    volumes and detached sessions; --dry-run: only list them)")
+    print("  bisect            Find the commit where a job started failing")
+    print("                    (needs --good <rev>; --bad defaults to HEAD)")
+    print("  replay            Re-run recorded sessions (pipestep-session-*.jsonl)")
+    print("                    headlessly and report steps whose exit code or output")
+    print("                    changed")
     print()
     print("Options:")
     print("  --workdir <path>  Directory to mount as /workspace (default: .)")
+    print("  --backend <name>  Where steps run: docker, or local for trusted workflows")
+    print("                    run on the host without containers (default: docker)")
+    print("  --mount <mode>    How the workdir is exposed: rw (bind mount), overlay")
+    print("                    (copy-on-write), snapshot (reflink copy), or sync (no")
+    print("                    mount; changed files are pushed with W) (default: rw,")
+    print("                    or sync for a remote Docker host)")
+    print("  --docker-host <url>")
+    print("                    Docker daemon to use, e.g. ssh://user@buildbox or")
+    print("                    tcp://host:2376 (default: $DOCKER_HOST or local socket)")
+    print("  --action-mirror <dir>")
+    print("                    Directory of mirrored actions, as <owner>/<repo>@<ref>/")
+    print("                    (default: $PIPESTEP_ACTION_MIRROR)")
+    print("  --runner-size <size>")
+    print("                    run, run-all: limit the job container like a GitHub-hosted")
+    print("                    runner: public (4 CPUs, 16g), private (2 CPUs, 7g),")
+    print("                    <n>-core, or none (default: auto, from runs-on)")
+    print("  --cpus <n>, --cpuset-cpus <cores>, --memory <size>, --pids-limit <n>,")
+    print("  --shm-size <size>, --tmp-size <size>")
+    print("                    run, run-all: override single limits; --tmp-size mounts")
+    print("                    a tmpfs of that size at /tmp")
+    print("  --pin-cores       run-all: split the host's cores between the jobs running")
+    print("                    at once")
+    print("  --scratch <dirs>  run: put directories on a tmpfs, comma-separated, each")
+    print("                    optionally with a size: temp (RUNNER_TEMP), tool-cache")
+    print("                    (RUNNER_TOOL_CACHE), an absolute path, or a workspace")
+    print("                    directory, e.g. temp,build:4g,node_modules")
+    print("  --scratch-size <size>")
+    print("                    run: size of scratch directories that don't give one")
+    print("                    (default: half the memory)")
+    print("  --persist-scratch run: restore scratch directories from named volumes at")
+    print("                    start and save them back when the session ends")
+    print("  --warm-python     run, run-all: run `shell: python` steps in a Python")
+    print("                    process started once per container, which forks for")
+    print("                    each step, instead of starting an interpreter per step")
+    print("  --stress-runs <n>")
+    print(f"                    Parallel runs for a flake hunt (F key) (default: {DEFAULT_RUNS})")
+    print("  --good <rev>, --bad <rev>")
+    print("                    bisect: known passing and failing revisions")
+    print("  --job <name>      bisect: job to run (required if the workflow has several);")
+    print("                    plan, run-all: only this job")
+    print("  --sessions <glob> plan: session recordings to take timings from")
+    print("                    (default: pipestep-session-*.jsonl)")
+    print("  --repeat <n>      replay: run each session n times to find nondeterministic")
+    print("                    steps (default: 1)")
+    print("  --parallel <n>    replay: sessions to replay at once (default: 4);")
+    print("                    bisect: revisions to test at once (default: 1);")
+    print("                    run-all: jobs to run at once (default: 4)")
     print("  --version, -V     Show version")
     print("  --help, -h        Show this help")
     print()
     print("Example:")
     print("  pipestep run .github/workflows/ci.yml")
     print("  pipestep run ci.yml --workdir /path/to/project")
+    print("  pipestep run ci.yml --detach && pipestep attach <session-id>")
+    print("  pipestep run ci.yml --scratch temp,target:8g --persist-scratch")
+    print("  pipestep pull .github/workflows/ci.yml")
+    print("  pipestep replay pipestep-session-*.jsonl --repeat 3")
+    print("  pipestep plan .github/workflows/ci.yml")
+    print("  pipestep run-all .github/workflows/ci.yml --parallel 8")
+    print("  pipestep run-all ci.yml --parallel 4 --pin-cores --runner-size private")
+    print("  pipestep bisect .github/workflows/ci.yml --good v1.2.0 --parallel 3")
+
+
+COMMANDS = {
+    "run": _run_workflow,
+    "pull": _pull,
+    "replay": _replay,
+    "bisect": _bisect,
+    "plan": _plan,
+    "run-all": _run_all,
+    "gc": _gc,
+    "attach": _attach,
+}
+
+# Commands that don't take a workflow or session file
+NO_ARGUMENT_COMMANDS = {"gc", "attach"}
 
 
 if __name__ == "__main__":
@@ -1,25 +1,58 @@
-"""Docker-based execution engine for running pipeline steps in containers."""
+"""Execution engine for running pipeline steps in containers."""
 
 from __future__ import annotations
 
+import io
 import os
 import re
 import atexit
 import shlex
 import signal
 import subprocess
-
-import docker
-from docker.errors import NotFound, ImageNotFound
+import tarfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from pipestep.backends import OWNER_LABEL, Backend, DockerBackend, owner_labels
 from pipestep.models import Step, Job, StepResult
+from pipestep.resources import Resources
+from pipestep.scratch import STORE_DIR, ScratchMount
+from pipestep.shells import WARM_CLIENT, WARM_SERVER, program, script_suffix, shell_argv
+from pipestep.teardown import run_concurrently
+from pipestep.workspace import (
+    MOUNT_MODES, RESYNC_MODES, SyncResult, Workspace, WorkspaceSync, clone_workspace, prepare_workspace,
+    reopen_workspace,
+)
+
+# Exit codes of steps stopped by pipestep, as `timeout` and Ctrl-C would report them
+TIMEOUT_EXIT_CODE = 124
+CANCELLED_EXIT_CODE = 130
+
+# Seconds a stopped step gets between SIGTERM and SIGKILL
+KILL_GRACE = 2.0
+
+# Runs the step's command ("$4" on) as a background job, which job control
+# (set -m) puts in its own process group, and records the group id in "$1" so
+# the whole group can be killed. With a `shell:`, the script ("$3") is first
+# written to the file "$2", which the command runs. The wrapper's own stderr
+# (job notices) is discarded.
+_STEP_WRAPPER = (
+    'pidfile=$1 file=$2; if [ -n "$file" ]; then printf "%s\\n" "$3" > "$file" || exit 1; fi; shift 3; '
+    'exec 3>&2 2>/dev/null; set -m; '
+    '"$@" 2>&3 3>&- & echo $! > "$pidfile"; '
+    'wait $!; code=$?; rm -f "$pidfile" ${file:+"$file"}; exit $code'
+)
 
 # Module-level registry so atexit/signal handlers can find all engines
 _active_engines: list["PipelineEngine"] = []
 
 
 def _cleanup_all_engines() -> None:
-    for engine in list(_active_engines):
-        engine.cleanup()
+    # Concurrently, and bounded: whatever is left is reaped by `pipestep gc`
+    run_concurrently([engine.cleanup for engine in list(_active_engines)])
 
 
 atexit.register(_cleanup_all_engines)
@@ -36,29 +69,76 @@ for _sig in (signal.SIGTERM, signal.SIGINT):
         signal.signal(_sig, _signal_handler)
 
 
-class PipelineEngine:
-    """Manages a Docker container that executes pipeline steps sequentially."""
+@dataclass
+class _RunningStep:
+    """A step whose exec is in flight, so it can be cancelled."""
+
+    pidfile: str
+    done: threading.Event = field(default_factory=threading.Event)
+    cancelled: bool = False
+
 
-    def __init__(self, job: Job, workdir: str = ".") -> None:
+class PipelineEngine:
+    """Manages a container that executes pipeline steps sequentially.
+
+    The container is provided by a backend (Docker by default); see
+    ``pipestep.backends``. ``mount_mode`` controls how ``workdir`` is exposed
+    at /workspace; see ``pipestep.workspace``. ``resources`` limits the
+    container's CPU, memory and pids; see ``pipestep.resources``.
+    ``scratch`` directories are RAM-backed; see ``pipestep.scratch``.
+    ``warm_python`` runs ``shell: python`` steps in a warm interpreter; see
+    ``pipestep.shells``.
+    """
+
+    def __init__(
+        self,
+        job: Job,
+        workdir: str = ".",
+        backend: Optional[Backend] = None,
+        mount_mode: str = "rw",
+        resources: Optional[Resources] = None,
+        scratch: Optional[list[ScratchMount]] = None,
+        warm_python: bool = False,
+    ) -> None:
+        if mount_mode not in MOUNT_MODES:
+            raise ValueError(f"Unknown mount mode '{mount_mode}'. Choose from: {', '.join(MOUNT_MODES)}")
         self.job = job
         self.workdir = os.path.abspath(workdir)
-        self._client = None
+        self.backend = backend if backend is not None else DockerBackend()
+        if self.backend.is_remote and mount_mode != "sync":
+            raise ValueError(
+                f"Mount mode '{mount_mode}' needs a local Docker daemon; "
+                "a remote host can't see local files. Use the 'sync' mount mode."
+            )
+        self.mount_mode = mount_mode
+        # Container limits, see pipestep.resources; unlimited by default
+        self.resources = resources if resources is not None else Resources()
+        self.scratch = list(scratch or [])
+        # Run `shell: python` steps in a warm interpreter, see pipestep.shells
+        self.warm_python = warm_python
+        self._warm_dir: Optional[str] = None  # its directory in the container; empty if it can't start
+        self.workspace: Optional[Workspace] = None
+        self.initial_sync: Optional[SyncResult] = None
+        self._sync: Optional[WorkspaceSync] = None
+        # Forks inherit their workspace from the parent and never resync from the host
+        self._resync = mount_mode in RESYNC_MODES
+        # Container paths of mirrored actions already copied in
+        self._provided_actions: set[str] = set()
         self.container = None
+        self.environment: dict = {}
+        # Owner label of the container (this process, unless attached; see pipestep.state)
+        self.owner = owner_labels("job")[OWNER_LABEL]
+        # Seconds spent running steps, counted against the job's timeout-minutes
+        self.elapsed = 0.0
+        self._running: list[_RunningStep] = []
+        self._running_lock = threading.Lock()
         safe_name = re.sub(r'[^a-zA-Z0-9_.-]', '-', job.name)
         self._container_name = f"pipestep-{safe_name}-{os.getpid()}"
 
     @property
     def client(self):
-        if self._client is None:
-            try:
-                self._client = docker.from_env()
-                self._client.ping()
-            except docker.errors.DockerException as e:
-                raise RuntimeError(
-                    "Cannot connect to Docker. Is Docker Desktop running?\n"
-                    f"  Error: {e}"
-                ) from e
-        return self._client
+        """The Docker client (Docker backend only)."""
+        return self.backend.client
 
     @property
     def container_id(self) -> str:
@@ -67,21 +147,16 @@ class PipelineEngine:
             return ""
         return self.container.id
 
-    def setup(self) -> None:
-        """Pull the Docker image and start a long-running container."""
-        image = self.job.docker_image
+    def setup(self, on_pull_progress=None) -> None:
+        """Pull the job image and start a long-running container.
 
-        try:
-            self.client.images.get(image)
-        except ImageNotFound:
-            self.client.images.pull(image)
+        ``on_pull_progress`` receives layer-level pull progress, if a pull is needed.
+        """
+        image = self.job.docker_image
+        self.backend.ensure_image(image, on_pull_progress)
 
         # Remove stale container with same name
-        try:
-            old = self.client.containers.get(self._container_name)
-            old.remove(force=True)
-        except NotFound:
-            pass
+        self.backend.remove_stale(self._container_name)
 
         # Default env vars to match GitHub Actions runner
         git_sha = ""
@@ -106,48 +181,329 @@ class PipelineEngine:
             "RUNNER_TEMP": "/tmp",
             "DEBIAN_FRONTEND": "noninteractive",
         }
+        default_env.update({m.env: m.path for m in self.scratch if m.env})
+
+        # Runtimes for JavaScript action steps (e.g. a Node volume)
+        volumes = {}
+        for runtime in sorted({s.runtime for s in self.job.steps if s.runtime}):
+            runtime_volumes, runtime_env = self.backend.provide_runtime(runtime)
+            volumes.update(runtime_volumes)
+            default_env.update(runtime_env)
+        self.environment = {**default_env, **self.job.env}
+
+        if self.workspace is None:
+            self.workspace = prepare_workspace(self.workdir, self.mount_mode)
+        # Register before starting so a failed start still releases the workspace
+        if self not in _active_engines:
+            _active_engines.append(self)
 
-        self.container = self.client.containers.run(
+        self.container = self.backend.start(
             image=image,
-            command="sleep infinity",
-            volumes={
-                self.workdir: {"bind": "/workspace", "mode": "rw"},
-            },
-            working_dir="/workspace",
-            environment={
-                **default_env,
-                **self.job.env,
-            },
             name=self._container_name,
-            detach=True,
+            workdir=self.workspace.path,
+            environment=self.environment,
+            volumes=volumes,
+            resources=self.resources,
+            scratch=self.scratch,
         )
+        self._restore_scratch()
+
+        if self._resync:
+            self._sync = WorkspaceSync(self.workdir)
+            if self.mount_mode == "snapshot":
+                self._sync.mark_synced()
+            else:
+                self.initial_sync = self._sync.sync(self.container)
+
+    def detach(self) -> None:
+        """Stop managing the container and workspace, leaving both in place for ``attach``."""
+        self._stop_warm_python()
+        self.container = None
+        self.workspace = None
+        self._sync = None
+        if self in _active_engines:
+            _active_engines.remove(self)
+
+    def attach(self, container_id: str, workspace: dict, environment: dict, owner: str) -> None:
+        """Take over a container left by ``detach`` in another process (see ``pipestep.state``).
+
+        A resynced workspace is pushed in full on the next sync, since edits
+        made while detached can't be told apart.
+        """
+        self.container = self.backend.attach(container_id)
+        self.workspace = reopen_workspace(**workspace) if workspace else None
+        self.environment = environment
+        self.owner = owner
+        if self._resync:
+            self._sync = WorkspaceSync(self.workdir)
         if self not in _active_engines:
             _active_engines.append(self)
 
-    def run_step(self, step: Step) -> StepResult:
-        """Execute a step's shell command inside the container."""
+    def sync_workspace(self) -> SyncResult:
+        """Push host edits made since the last sync into the container."""
         if self.container is None:
             raise RuntimeError("Engine not set up. Call setup() first.")
+        if self._sync is None:
+            raise RuntimeError(f"Workspace is a live {self.mount_mode} mount; there is nothing to sync.")
+        return self._sync.sync(self.container)
 
-        env = {**self.job.env, **step.env}
-        cmd = f"bash --noprofile --norc -e -o pipefail -c {shlex.quote(step.command)}"
+    def commit(self) -> str:
+        """Snapshot the container as an image to ``fork`` from; remove it with ``backend.remove_image``."""
+        if self.container is None:
+            raise RuntimeError("Engine not set up. Call setup() first.")
+        return self.backend.commit(self.container)
+
+    def fork(self, image: str, suffix: str) -> "PipelineEngine":
+        """Start a copy of this engine from ``image`` (see ``commit``).
 
-        result = self.container.exec_run(
-            cmd,
-            environment=env,
-            workdir=step.working_directory,
-            demux=True,
+        The fork gets its own copy of the current workspace — or, when the
+        workspace was synced into the container, the copy inside the image —
+        so it can run steps without disturbing this engine or the host.
+        """
+        if self.container is None or self.workspace is None:
+            raise RuntimeError("Engine not set up. Call setup() first.")
+        fork = PipelineEngine(
+            job=replace(self.job, docker_image=image),
+            workdir=self.workdir,
+            backend=self.backend,
+            mount_mode=self.mount_mode,
+            resources=self.resources,
+            warm_python=self.warm_python,
+            # Only this engine saves to the volumes; the fork gets a copy of the contents
+            scratch=[replace(m, volume="") for m in self.scratch],
         )
+        fork._container_name = f"{self._container_name}-{suffix}"
+        fork._resync = False
+        if self.workspace.path:
+            fork.workspace = clone_workspace(self.workspace.path)
+        else:
+            fork.workspace = prepare_workspace(self.workdir, "sync")
+        try:
+            fork.setup()
+            # A committed image doesn't include tmpfs contents. Archives can't be put
+            # into a tmpfs directly (they land underneath it), so they go through STORE_DIR
+            for mount in self.scratch:
+                result = self.container.exec_run(["tar", "-C", mount.path, "-cf", "-", "."], demux=True)
+                if result.exit_code == 0:
+                    staging = f"{STORE_DIR}/.copy"
+                    fork.container.exec_run(["mkdir", "-p", staging])
+                    fork.container.put_archive(staging, result.output[0] or b"")
+                    result = fork.container.exec_run(
+                        ["sh", "-c", 'cp -a "$1"/. "$2"/ && rm -rf "$1"', "sh", staging, mount.path], demux=True,
+                    )
+                if result.exit_code != 0:
+                    raise RuntimeError(f"Copying scratch {mount.path} failed: {_decode(result)[1].strip()}")
+        except Exception:
+            fork.cleanup()
+            raise
+        return fork
+
+    def _restore_scratch(self) -> None:
+        """Fill persisted scratch directories from their volumes."""
+        for mount in self.scratch:
+            if mount.volume:
+                result = self.container.exec_run(
+                    ["sh", "-c", 'cp -a "$1"/. "$2"/', "sh", mount.store, mount.path], demux=True,
+                )
+                if result.exit_code != 0:
+                    raise RuntimeError(f"Restoring scratch {mount.path} failed: {_decode(result)[1].strip()}")
+
+    def save_scratch(self) -> None:
+        """Copy persisted scratch directories to their volumes, replacing what was there."""
+        if self.container is None:
+            return
+        for mount in self.scratch:
+            if mount.volume:
+                result = self.container.exec_run(
+                    ["sh", "-c", 'find "$1" -mindepth 1 -delete && cp -a "$2"/. "$1"/', "sh", mount.store, mount.path],
+                    demux=True,
+                )
+                if result.exit_code != 0:
+                    raise RuntimeError(f"Saving scratch {mount.path} failed: {_decode(result)[1].strip()}")
 
-        stdout = result.output[0].decode("utf-8", errors="replace") if result.output[0] else ""
-        stderr = result.output[1].decode("utf-8", errors="replace") if result.output[1] else ""
+    def run_step(self, step: Step) -> StepResult:
+        """Execute a step's shell command inside the container.
 
+        The step is stopped — its whole process group killed — when it
+        exceeds its own or the job's ``timeout-minutes``, or when
+        ``cancel_step`` is called; the call then returns at once with exit
+        code ``TIMEOUT_EXIT_CODE`` or ``CANCELLED_EXIT_CODE``.
+        """
+        if self.container is None:
+            raise RuntimeError("Engine not set up. Call setup() first.")
+
+        limit, why = self.time_limit(step)
+        if limit is not None and limit <= 0:
+            return StepResult(exit_code=TIMEOUT_EXIT_CODE, stdout="", stderr=f"{why} was already used up\n")
+        start = time.monotonic()
+        try:
+            if step.image:
+                return self._run_in_image(step)
+            if step.action_source and step.action_path not in self._provided_actions:
+                self._provide_action(step.action_source, step.action_path)
+            return self._exec_step(step, limit, why)
+        finally:
+            self.elapsed += time.monotonic() - start
+
+    def time_limit(self, step: Step) -> tuple[Optional[float], str]:
+        """Seconds ``step`` may run, from its own and the job's ``timeout-minutes`` (None: no limit)."""
+        limits = []
+        if step.timeout_minutes:
+            limits.append((step.timeout_minutes * 60, f"the step's timeout-minutes ({step.timeout_minutes:g})"))
+        if self.job.timeout_minutes:
+            remaining = self.job.timeout_minutes * 60 - self.elapsed
+            limits.append((remaining, f"the job's timeout-minutes ({self.job.timeout_minutes:g})"))
+        if not limits:
+            return None, ""
+        return min(limits)
+
+    def _exec_step(self, step: Step, limit: Optional[float], why: str) -> StepResult:
+        env = {**self.job.env, **step.env}
+        step_id = uuid.uuid4().hex[:12]
+        running = _RunningStep(pidfile=f"/tmp/pipestep-step-{step_id}.pid")
+        if step.shell:
+            file = f"/tmp/pipestep-step-{step_id}{script_suffix(step.shell)}"
+            try:
+                argv = shell_argv(step.shell, file)
+            except ValueError as e:
+                return StepResult(exit_code=1, stdout="", stderr=f"{e}\n")
+            if step.shell == "python" and self.warm_python:
+                server = self._warm_python_server(env)
+                if server:
+                    argv = ["sh", f"{server}/client", server, file]
+            cmd = ["bash", "--noprofile", "--norc", "-c", _STEP_WRAPPER, "pipestep", running.pidfile, file, step.command]
+        else:
+            cmd = ["bash", "--noprofile", "--norc", "-c", _STEP_WRAPPER, "pipestep", running.pidfile, "", ""]
+            argv = ["bash", "--noprofile", "--norc", "-e", "-o", "pipefail", "-c", step.command]
+        cmd += argv
+        outcome: dict = {}
+
+        def _exec() -> None:
+            try:
+                outcome["result"] = self.container.exec_run(
+                    cmd, environment=env, workdir=step.working_directory, demux=True,
+                )
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                running.done.set()
+
+        with self._running_lock:
+            self._running.append(running)
+        # The exec blocks until the step exits; waiting on it in another
+        # thread lets a timeout or cancel return without it
+        thread = threading.Thread(target=_exec, daemon=True, name="pipestep-step")
+        thread.start()
+        try:
+            running.done.wait(limit)
+            if not outcome:
+                took = f"{limit / 60:g}m" if limit and limit >= 60 else f"{limit or 0:.1f}s"
+                stopped = "Cancelled" if running.cancelled else f"Timed out after {took}, {why}"
+                self._kill(running, thread)
+                code = CANCELLED_EXIT_CODE if running.cancelled else TIMEOUT_EXIT_CODE
+                stdout, stderr = _decode(outcome["result"]) if "result" in outcome else ("", "")
+                return StepResult(exit_code=code, stdout=stdout, stderr=f"{stderr}{stopped}; process group killed\n")
+        finally:
+            with self._running_lock:
+                self._running.remove(running)
+        if "error" in outcome:
+            raise outcome["error"]
+        stdout, stderr = _decode(outcome["result"])
+        exit_code = outcome["result"].exit_code
+        if exit_code == 127 and step.shell and not self._has_program(program(step.shell), env):
+            stderr += f"shell '{step.shell}' needs {program(step.shell)}, which isn't installed in {self.job.docker_image}\n"
+        return StepResult(exit_code=exit_code, stdout=stdout, stderr=stderr)
+
+    def _has_program(self, name: str, env: dict) -> bool:
+        result = self.container.exec_run(["sh", "-c", 'command -v "$1"', "sh", name], environment=env)
+        return result.exit_code == 0
+
+    def _warm_python_server(self, env: dict) -> str:
+        """The directory of the warm Python server (see ``pipestep.shells``), started on first use.
+
+        Empty if it can't start, e.g. because the image has no ``python``;
+        Python steps then start their own interpreter.
+        """
+        if self._warm_dir is None:
+            base = f"/tmp/pipestep-python-{uuid.uuid4().hex[:12]}"
+            script = (
+                'mkdir -p "$1" && printf "%s" "$2" > "$1/server.py" && printf "%s" "$3" > "$1/client" '
+                '&& mkfifo "$1/control" && command -v python > /dev/null || exit 1; '
+                'python "$1/server.py" "$1" < /dev/null > /dev/null 2>&1 & echo $! > "$1/pid"; '
+                'i=0; while [ ! -e "$1/ready" ] && [ $i -lt 100 ] && kill -0 $! 2>/dev/null; '
+                'do sleep 0.05; i=$((i + 1)); done; [ -e "$1/ready" ]'
+            )
+            result = self.container.exec_run(
+                ["sh", "-c", script, "sh", base, WARM_SERVER, WARM_CLIENT], environment=env,
+            )
+            self._warm_dir = base if result.exit_code == 0 else ""
+        return self._warm_dir
+
+    def _stop_warm_python(self) -> None:
+        """Stop the warm Python server, if it was started."""
+        if self._warm_dir and self.container is not None:
+            try:
+                self.container.exec_run(
+                    ["sh", "-c", 'kill "$(cat "$1/pid")"; rm -rf "$1"', "sh", self._warm_dir],
+                )
+            except Exception:
+                pass
+        self._warm_dir = None
+
+    def _kill(self, running: _RunningStep, thread: threading.Thread) -> None:
+        """TERM, then after ``KILL_GRACE`` KILL, the step's process group."""
+        for signal_name in ("TERM", "KILL"):
+            script = (
+                f'for i in 1 2 3 4 5 6 7 8 9 10; do [ -s "$1" ] && break; sleep 0.1; done; '
+                f'pg=$(cat "$1" 2>/dev/null) && kill -{signal_name} -- "-$pg"'
+            )
+            try:
+                self.container.exec_run(["bash", "-c", script, "pipestep", running.pidfile])
+            except Exception:
+                return  # the container is gone, and the step with it
+            # Wait for the exec to return, to keep whatever output it had
+            thread.join(KILL_GRACE)
+            if not thread.is_alive():
+                return
+
+    def cancel_step(self) -> bool:
+        """Stop the steps currently running in this engine; returns whether there were any."""
+        with self._running_lock:
+            running = list(self._running)
+        for step in running:
+            step.cancelled = True
+            step.done.set()
+        return bool(running)
+
+    def _run_in_image(self, step: Step) -> StepResult:
+        """Run a container action's step in a one-off container sharing the workspace."""
+        if not self.workspace.path:
+            raise RuntimeError(
+                f"Container actions need the workspace mounted; '{self.mount_mode}' keeps it inside the job "
+                "container. Use the rw, overlay or snapshot mount mode."
+            )
+        exit_code, stdout, stderr = self.backend.run_image(
+            step.image,
+            args=shlex.split(step.command),
+            entrypoint=shlex.split(step.entrypoint) if step.entrypoint else None,
+            workdir=self.workspace.path,
+            environment={**self.environment, **step.env},
+        )
         return StepResult(
-            exit_code=result.exit_code,
-            stdout=stdout,
-            stderr=stderr,
+            exit_code=exit_code,
+            stdout=stdout.decode("utf-8", errors="replace"),
+            stderr=stderr.decode("utf-8", errors="replace"),
         )
 
+    def _provide_action(self, source: str, path: str) -> None:
+        """Copy a mirrored action's directory into the container at ``path``."""
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            tar.add(source, arcname=".")
+        self.container.exec_run(["mkdir", "-p", path])
+        self.container.put_archive(path, buf.getvalue())
+        self._provided_actions.add(path)
+
     def get_env(self) -> dict:
         """Return the container's current environment variables."""
         if self.container is None:
@@ -169,18 +525,33 @@ class PipelineEngine:
         stdout = result.output[0].decode() if result.output[0] else ""
         return [f for f in stdout.strip().split("\n") if f]
 
+    def shell(self, env: dict, workdir: str = "/workspace") -> int:
+        """Open an interactive shell in the container (bash, falling back to sh)."""
+        if self.container is None:
+            raise RuntimeError("Engine not set up. Call setup() first.")
+        ret = self.backend.shell(self.container, env, workdir, "/bin/bash")
+        if ret != 0:
+            ret = self.backend.shell(self.container, env, workdir, "/bin/sh")
+        return ret
+
     def cleanup(self) -> None:
-        """Stop and remove the container, ignoring errors during teardown."""
+        """Save persisted scratch, remove the container and release the workspace, ignoring errors during teardown."""
+        try:
+            self.save_scratch()
+        except Exception:
+            pass
+        self._stop_warm_python()
         if self.container is not None:
-            try:
-                self.container.stop(timeout=3)
-            except Exception:
-                pass
+            # The container only runs `sleep infinity`; there is nothing to stop gracefully
             try:
                 self.container.remove(force=True)
             except Exception:
                 pass
             self.container = None
+        if self.workspace is not None:
+            self.workspace.release()
+            self.workspace = None
+        self._sync = None
         if self in _active_engines:
             _active_engines.remove(self)
 
@@ -189,3 +560,9 @@ class PipelineEngine:
 
     def __exit__(self, *exc):
         self.cleanup()
+
+
+def _decode(result) -> tuple[str, str]:
+    stdout = result.output[0].decode("utf-8", errors="replace") if result.output[0] else ""
+    stderr = result.output[1].decode("utf-8", errors="replace") if result.output[1] else ""
+    return stdout, stderr
@@ -0,0 +1,397 @@
+"""A small evaluator for GitHub Actions expressions (``${{ ... }}``).
+
+Supports literals, context lookups (``env.FOO``, ``matrix['os']``), the
+operators ``! == != < <= > >= && ||`` and the built-in functions that make
+sense offline. Semantics follow GitHub's: missing properties are ``null``,
+string comparisons are case-insensitive, ``&&``/``||`` return an operand
+rather than a boolean, and mixed-type comparisons coerce to numbers.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from typing import Any
+
+# Contexts whose values only exist while a workflow is really running
+RUNTIME_CONTEXTS = frozenset({"secrets", "steps", "needs", "jobs", "inputs", "vars"})
+
+# Job status functions; a condition without one is implicitly `success() && (...)`
+STATUS_FUNCTIONS = frozenset({"success", "failure", "always", "cancelled"})
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>0x[0-9a-fA-F]+|-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<op>==|!=|<=|>=|&&|\|\||[!<>()\[\].,*])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_-]*)
+    )""", re.VERBOSE)
+
+_INTERPOLATION_RE = re.compile(r"\$\{\{(.*?)\}\}", re.DOTALL)
+
+
+class ExpressionError(ValueError):
+    """An expression could not be parsed or evaluated."""
+
+
+@dataclass
+class Expression:
+    """A parsed expression; evaluate it against a dict of contexts."""
+
+    text: str
+    node: tuple
+
+    def contexts(self) -> set[str]:
+        """Names of the contexts the expression reads (``env``, ``matrix``...)."""
+        return {n[1] for n in _walk(self.node) if n[0] == "context"}
+
+    def functions(self) -> set[str]:
+        return {n[1].lower() for n in _walk(self.node) if n[0] == "call"}
+
+    def evaluate(self, context: dict, status: str = "success") -> Any:
+        """Evaluate with ``context`` mapping context names to values.
+
+        ``status`` is the job status seen by ``success()``/``failure()``:
+        one of success, failure or cancelled.
+        """
+        return _eval(self.node, context, status)
+
+
+def parse_expression(text: str) -> Expression:
+    """Parse expression text, with or without the ``${{ }}`` wrapper."""
+    source = text.strip()
+    if source.startswith("${{") and source.endswith("}}"):
+        source = source[3:-2]
+    tokens = _tokenize(source)
+    parser = _Parser(tokens, text)
+    node = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise ExpressionError(f"Unexpected '{tokens[parser.pos][1]}' in expression: {text}")
+    return Expression(text=text, node=node)
+
+
+def evaluate(text: str, context: dict, status: str = "success") -> Any:
+    return parse_expression(text).evaluate(context, status)
+
+
+def evaluate_condition(text: str, context: dict, status: str = "success") -> bool:
+    """Evaluate an ``if:`` condition the way the runner does.
+
+    An empty condition means ``success()``; a condition that calls no
+    status function is combined with ``success()``.
+    """
+    if not text.strip():
+        return status == "success"
+    expression = parse_expression(text)
+    result = truthy(expression.evaluate(context, status))
+    if not expression.functions() & STATUS_FUNCTIONS:
+        result = result and status == "success"
+    return result
+
+
+def interpolate(text: str, context: dict, partial: bool = False) -> str:
+    """Replace every ``${{ expr }}`` in ``text`` with its string value.
+
+    With ``partial``, expressions that read a context missing from
+    ``context``, or that don't evaluate, are left as they are.
+    """
+    def _replace(match: re.Match) -> str:
+        if not partial:
+            return to_string(evaluate(match.group(1), context))
+        try:
+            expression = parse_expression(match.group(1))
+            if not expression.contexts() <= context.keys():
+                return match.group(0)
+            return to_string(expression.evaluate(context))
+        except ExpressionError:
+            return match.group(0)
+
+    return _INTERPOLATION_RE.sub(_replace, text)
+
+
+def truthy(value: Any) -> bool:
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    return value not in (None, False, 0, "")
+
+
+def to_string(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, indent=2)
+    return str(value)
+
+
+def to_number(value: Any) -> float:
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return 0.0
+        try:
+            return float(int(text, 16)) if text.lower().startswith("0x") else float(text)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+# --- Parsing ---
+
+def _tokenize(source: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        if source[pos:].strip() == "":
+            break
+        match = _TOKEN_RE.match(source, pos)
+        if match is None or match.end() == pos:
+            raise ExpressionError(f"Unexpected character '{source[pos:].strip()[0]}' in expression: {source}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str]], text: str) -> None:
+        self.tokens = tokens
+        self.text = text
+        self.pos = 0
+
+    def _peek(self) -> tuple[str, str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ("end", "")
+
+    def _take(self, value: str = "") -> tuple[str, str]:
+        token = self._peek()
+        if token[0] == "end" or (value and token[1] != value):
+            expected = f"'{value}'" if value else "more input"
+            raise ExpressionError(f"Expected {expected} in expression: {self.text}")
+        self.pos += 1
+        return token
+
+    def _binary(self, operators: tuple[str, ...], operand) -> tuple:
+        node = operand()
+        while self._peek()[0] == "op" and self._peek()[1] in operators:
+            op = self._take()[1]
+            node = ("binary", op, node, operand())
+        return node
+
+    def parse_or(self) -> tuple:
+        return self._binary(("||",), self.parse_and)
+
+    def parse_and(self) -> tuple:
+        return self._binary(("&&",), self.parse_equality)
+
+    def parse_equality(self) -> tuple:
+        return self._binary(("==", "!="), self.parse_comparison)
+
+    def parse_comparison(self) -> tuple:
+        return self._binary(("<", "<=", ">", ">="), self.parse_unary)
+
+    def parse_unary(self) -> tuple:
+        if self._peek() == ("op", "!"):
+            self._take()
+            return ("not", self.parse_unary())
+        return self.parse_postfix()
+
+    def parse_postfix(self) -> tuple:
+        node = self.parse_primary()
+        while True:
+            token = self._peek()
+            if token == ("op", "."):
+                self._take()
+                name = self._take()
+                if name[0] == "name":
+                    node = ("index", node, ("literal", name[1]))
+                elif name == ("op", "*"):
+                    node = ("star", node)
+                else:
+                    raise ExpressionError(f"Expected a property name after '.' in expression: {self.text}")
+            elif token == ("op", "["):
+                self._take()
+                if self._peek() == ("op", "*"):
+                    self._take()
+                    node = ("star", node)
+                else:
+                    node = ("index", node, self.parse_or())
+                self._take("]")
+            else:
+                return node
+
+    def parse_primary(self) -> tuple:
+        kind, value = self._take()
+        if kind == "number":
+            return ("literal", to_number(value))
+        if kind == "string":
+            return ("literal", value[1:-1].replace("''", "'"))
+        if kind == "op" and value == "(":
+            node = self.parse_or()
+            self._take(")")
+            return node
+        if kind == "name":
+            if value in ("true", "false"):
+                return ("literal", value == "true")
+            if value == "null":
+                return ("literal", None)
+            if self._peek() == ("op", "("):
+                self._take()
+                args = []
+                if self._peek() != ("op", ")"):
+                    args.append(self.parse_or())
+                    while self._peek() == ("op", ","):
+                        self._take()
+                        args.append(self.parse_or())
+                self._take(")")
+                return ("call", value, args)
+            return ("context", value)
+        raise ExpressionError(f"Unexpected '{value}' in expression: {self.text}")
+
+
+def _walk(node: tuple):
+    yield node
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            yield from _walk(child)
+        elif isinstance(child, list):
+            for item in child:
+                yield from _walk(item)
+
+
+# --- Evaluation ---
+
+def _eval(node: tuple, context: dict, status: str) -> Any:
+    kind = node[0]
+    if kind == "literal":
+        return node[1]
+    if kind == "context":
+        return context.get(node[1])
+    if kind == "index":
+        return _index(_eval(node[1], context, status), _eval(node[2], context, status))
+    if kind == "star":
+        base = _eval(node[1], context, status)
+        if isinstance(base, dict):
+            return list(base.values())
+        return list(base) if isinstance(base, list) else []
+    if kind == "not":
+        return not truthy(_eval(node[1], context, status))
+    if kind == "binary":
+        op = node[1]
+        left = _eval(node[2], context, status)
+        if op == "&&":
+            return _eval(node[3], context, status) if truthy(left) else left
+        if op == "||":
+            return left if truthy(left) else _eval(node[3], context, status)
+        return _compare(op, left, _eval(node[3], context, status))
+    if kind == "call":
+        args = [_eval(arg, context, status) for arg in node[2]]
+        return _call(node[1], args, status)
+    raise ExpressionError(f"Unknown expression node {kind}")
+
+
+def _index(base: Any, key: Any) -> Any:
+    if isinstance(base, list) and not isinstance(base, str):
+        # `matrix.*.os`-style access maps over the filtered array
+        if isinstance(key, str):
+            return [_index(item, key) for item in base]
+        number = to_number(key)
+        if math.isnan(number) or not number.is_integer() or not 0 <= number < len(base):
+            return None
+        return base[int(number)]
+    if isinstance(base, dict) and isinstance(key, str):
+        if key in base:
+            return base[key]
+        lowered = key.lower()
+        return next((v for k, v in base.items() if str(k).lower() == lowered), None)
+    return None
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if isinstance(left, str) and isinstance(right, str):
+        a, b = left.lower(), right.lower()
+    elif type(left) is type(right) and isinstance(left, (dict, list)):
+        if op in ("==", "!="):
+            return (left is right) == (op == "==")
+        return False
+    else:
+        a, b = to_number(left), to_number(right)
+        if math.isnan(a) or math.isnan(b):
+            return op == "!="
+    if op == "==":
+        return a == b
+    if op == "!=":
+        return a != b
+    if op == "<":
+        return a < b
+    if op == "<=":
+        return a <= b
+    if op == ">":
+        return a > b
+    return a >= b
+
+
+def _call(name: str, args: list, status: str) -> Any:
+    fn = name.lower()
+    if fn == "success":
+        return status == "success"
+    if fn == "failure":
+        return status == "failure"
+    if fn == "cancelled":
+        return status == "cancelled"
+    if fn == "always":
+        return True
+    if fn == "contains":
+        _arity(name, args, 2)
+        haystack, needle = args
+        if isinstance(haystack, list):
+            return any(_compare("==", item, needle) for item in haystack)
+        return to_string(needle).lower() in to_string(haystack).lower()
+    if fn == "startswith":
+        _arity(name, args, 2)
+        return to_string(args[0]).lower().startswith(to_string(args[1]).lower())
+    if fn == "endswith":
+        _arity(name, args, 2)
+        return to_string(args[0]).lower().endswith(to_string(args[1]).lower())
+    if fn == "format":
+        if not args:
+            raise ExpressionError("format() needs a format string")
+        values = [to_string(a) for a in args[1:]]
+        return re.sub(
+            r"\{\{|\}\}|\{(\d+)\}",
+            lambda m: m.group(0)[0] if m.group(1) is None else values[int(m.group(1))],
+            to_string(args[0]),
+        )
+    if fn == "join":
+        if not 1 <= len(args) <= 2:
+            raise ExpressionError("join() takes one or two arguments")
+        separator = to_string(args[1]) if len(args) == 2 else ","
+        items = args[0] if isinstance(args[0], list) else [args[0]]
+        return separator.join(to_string(i) for i in items)
+    if fn == "tojson":
+        _arity(name, args, 1)
+        return json.dumps(args[0], indent=2)
+    if fn == "fromjson":
+        _arity(name, args, 1)
+        try:
+            return json.loads(to_string(args[0]))
+        except json.JSONDecodeError as e:
+            raise ExpressionError(f"fromJSON: invalid JSON: {e}") from e
+    if fn == "hashfiles":
+        raise ExpressionError("hashFiles() needs the workspace and can't be evaluated here")
+    raise ExpressionError(f"Unknown function '{name}'")
+
+
+def _arity(name: str, args: list, count: int) -> None:
+    if len(args) != count:
+        raise ExpressionError(f"{name}() takes {count} argument{'s' if count != 1 else ''}, got {len(args)}")
@@ -0,0 +1,252 @@
+"""Local history of step durations, across sessions.
+
+Every executed step is recorded in a small SQLite database keyed by
+workflow path, job, step index and step name (unnamed steps are named
+after their action or command, so names can repeat within a job), along
+with its exit code, image, backend, the container's resource limits and
+whether its result came from the step cache. The TUI reads it to show
+expected durations, ETAs and regressions against the rolling median.
+
+Writes go through a queue to a single background thread that commits them
+in batches, so recording a step never blocks the caller on disk I/O.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import queue
+import sqlite3
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Passing runs the rolling median is computed over
+WINDOW = 20
+
+# A run is a regression if it is this many times slower than the median...
+REGRESSION_FACTOR = 1.5
+# ...and at least this many seconds slower (ignores noise in fast steps)
+REGRESSION_MIN_SECONDS = 1.0
+
+# The writer flushes when this many records are pending, or after FLUSH_INTERVAL
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS step_runs (
+    id INTEGER PRIMARY KEY,
+    workflow TEXT NOT NULL,
+    job TEXT NOT NULL,
+    step TEXT NOT NULL,
+    image TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    duration REAL NOT NULL,
+    exit_code INTEGER,
+    cached INTEGER NOT NULL DEFAULT 0,
+    recorded REAL NOT NULL,
+    resources TEXT NOT NULL DEFAULT '',
+    step_index INTEGER NOT NULL DEFAULT -1
+);
+CREATE INDEX IF NOT EXISTS step_runs_key ON step_runs (workflow, job, step, recorded);
+"""
+
+# Columns added since the first schema, with their definitions, for older databases
+_ADDED_COLUMNS = {
+    "resources": "TEXT NOT NULL DEFAULT ''",
+    "step_index": "INTEGER NOT NULL DEFAULT -1",  # unknown for older rows, which never match a step
+}
+
+
+def default_path() -> str:
+    """``$PIPESTEP_HISTORY``, else ``$XDG_DATA_HOME/pipestep/history.db``."""
+    if os.environ.get("PIPESTEP_HISTORY"):
+        return os.environ["PIPESTEP_HISTORY"]
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(data_home, "pipestep", "history.db")
+
+
+@dataclass
+class StepStats:
+    """Rolling statistics of a step's passing runs."""
+
+    median: float
+    count: int
+    last: float
+
+    def eta(self, elapsed: float) -> float:
+        """Seconds left if this run takes the median time (never negative)."""
+        return max(0.0, self.median - elapsed)
+
+    def is_regression(self, duration: float) -> bool:
+        return (
+            self.count >= 3
+            and duration > self.median * REGRESSION_FACTOR
+            and duration - self.median >= REGRESSION_MIN_SECONDS
+        )
+
+
+@dataclass
+class StepRecord:
+    workflow: str
+    job: str
+    step: str
+    image: str
+    backend: str
+    duration: float
+    exit_code: Optional[int]
+    cached: bool = False
+    recorded: float = 0.0
+    resources: str = ""  # the container's limits, see pipestep.resources.Resources.describe
+    index: int = -1  # the step's position in the job
+
+
+class History:
+    """The duration database, with a batched background writer."""
+
+    def __init__(self, path: str = "") -> None:
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._queue: queue.Queue[Optional[StepRecord]] = queue.Queue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._reader = self._connect()
+        self._reader.executescript(_SCHEMA)
+        self._migrate()
+        self._read_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="pipestep-history")
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self) -> None:
+        existing = {row[1] for row in self._reader.execute("PRAGMA table_info(step_runs)")}
+        with self._reader:
+            for column, definition in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._reader.execute(f"ALTER TABLE step_runs ADD COLUMN {column} {definition}")
+
+    def record(self, record: StepRecord) -> None:
+        """Queue a run for writing; returns immediately."""
+        if not record.recorded:
+            record.recorded = time.time()
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(record)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued record is committed."""
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._flushed.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+        with self._read_lock:
+            self._reader.close()
+
+    def _write_loop(self) -> None:
+        # An in-memory database is private to its connection, so share the reader's
+        conn = self._reader if self.path == ":memory:" else self._connect()
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(conn, batch)
+        if conn is not self._reader:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: list[StepRecord]) -> None:
+        rows = [
+            (
+                r.workflow, r.job, r.step, r.image, r.backend, r.duration, r.exit_code, int(r.cached), r.recorded,
+                r.resources, r.index,
+            )
+            for r in batch
+        ]
+        try:
+            with self._read_lock if conn is self._reader else contextlib.nullcontext():
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO step_runs "
+                        "(workflow, job, step, image, backend, duration, exit_code, cached, recorded, resources, "
+                        "step_index) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+        except sqlite3.Error:
+            pass  # history is best-effort; never take the session down with it
+        finally:
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def job_stats(
+        self, workflow: str, job: str, window: int = WINDOW, resources: Optional[str] = None,
+    ) -> dict[tuple[int, str], StepStats]:
+        """Rolling stats per (index, name) step of a job, from its last ``window`` passing, uncached runs.
+
+        With ``resources``, only runs under those limits count, so a smaller
+        runner size isn't compared against a larger one.
+        """
+        query = "SELECT step_index, step, duration FROM step_runs WHERE workflow = ? AND job = ? AND exit_code = 0 AND cached = 0"
+        params: tuple = (workflow, job)
+        if resources is not None:
+            query += " AND resources = ?"
+            params += (resources,)
+        with self._read_lock:
+            rows = self._reader.execute(query + " ORDER BY recorded DESC", params).fetchall()
+        samples: dict[tuple[int, str], list[float]] = {}
+        for index, step, duration in rows:
+            values = samples.setdefault((index, step), [])
+            if len(values) < window:
+                values.append(duration)
+        return {
+            key: StepStats(median=statistics.median(values), count=len(values), last=values[0])
+            for key, values in samples.items()
+        }
+
+    def durations(self, workflow: str, window: int = WINDOW) -> dict[tuple[str, int, str], list[float]]:
+        """Recent passing durations for every step of a workflow, keyed by (job, index, step)."""
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT job, step_index, step, duration FROM step_runs "
+                "WHERE workflow = ? AND exit_code = 0 AND cached = 0 ORDER BY recorded DESC",
+                (workflow,),
+            ).fetchall()
+        result: dict[tuple[str, int, str], list[float]] = {}
+        for job, index, step, duration in rows:
+            values = result.setdefault((job, index, step), [])
+            if len(values) < window:
+                values.append(duration)
+        return result
+
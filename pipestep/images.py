@@ -0,0 +1,229 @@
+"""Concurrent image pulls with per-layer progress.
+
+Pulls are de-duplicated: asking for an image that is already being pulled
+(e.g. by the background prefetch started while the user picks a job) joins
+the in-flight pull instead of starting another.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from docker.errors import ImageNotFound
+
+from pipestep.models import Workflow
+
+# Minimum seconds between progress callbacks for one pull
+PROGRESS_INTERVAL = 0.2
+
+
+@dataclass
+class LayerProgress:
+    """Download state of one image layer."""
+
+    status: str = ""
+    current: int = 0
+    total: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("Pull complete", "Already exists")
+
+
+@dataclass
+class PullProgress:
+    """Progress of a single image pull, keyed by layer id."""
+
+    image: str
+    status: str = "waiting"  # waiting | pulling | present | pulled | failed
+    error: str = ""
+    layers: dict[str, LayerProgress] = field(default_factory=dict)
+    started: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("present", "pulled", "failed")
+
+    def describe(self) -> str:
+        if self.status == "present":
+            return f"{self.image}: already present"
+        if self.status == "failed":
+            return f"{self.image}: failed — {self.error}"
+        if self.status == "pulled":
+            return f"{self.image}: pulled in {self.elapsed:.1f}s"
+        done = sum(1 for layer in self.layers.values() if layer.done)
+        current, total = _bytes(self.layers.values())
+        size = f", {_mb(current)}/{_mb(total)} MB" if total else ""
+        return f"{self.image}: {done}/{len(self.layers)} layers{size}"
+
+
+def summarize(pulls: list[PullProgress]) -> str:
+    """Aggregate progress across pulls, counting layers shared between images once."""
+    layers: dict[str, LayerProgress] = {}
+    for pull in pulls:
+        for layer_id, layer in pull.layers.items():
+            seen = layers.get(layer_id)
+            if seen is None or layer.current > seen.current or layer.done:
+                layers[layer_id] = layer
+    finished = sum(1 for p in pulls if p.finished)
+    current, total = _bytes(layers.values())
+    shared = sum(len(p.layers) for p in pulls) - len(layers)
+    text = f"{finished}/{len(pulls)} images, {len(layers)} layers"
+    if shared:
+        text += f" ({shared} shared)"
+    if total:
+        text += f", {_mb(current)}/{_mb(total)} MB"
+    return text
+
+
+def _bytes(layers) -> tuple[int, int]:
+    current = total = 0
+    for layer in layers:
+        if layer.total:
+            total += layer.total
+            current += layer.total if layer.done else layer.current
+    return current, total
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1_000_000:.1f}"
+
+
+def collect_images(workflow: Workflow) -> list[str]:
+    """Every distinct image a workflow needs: job images, services, and docker:// actions."""
+    images: dict[str, None] = {}
+    for job in workflow.jobs:
+        images[job.docker_image] = None
+        for service in job.services:
+            images[service] = None
+        for step in job.steps:
+            if step.is_action and step.action_ref.startswith("docker://"):
+                images[step.action_ref[len("docker://"):]] = None
+    return list(images)
+
+
+class _InflightPull:
+    def __init__(self, image: str) -> None:
+        self.progress = PullProgress(image=image)
+        self.listeners: list[Callable[[PullProgress], None]] = []
+        self.done = threading.Event()
+        self.last_notified = 0.0
+
+    def notify(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_notified < PROGRESS_INTERVAL:
+            return
+        self.last_notified = now
+        for listener in list(self.listeners):
+            try:
+                listener(self.progress)
+            except Exception:
+                pass
+
+
+_inflight: dict[tuple[int, str], _InflightPull] = {}
+_inflight_lock = threading.Lock()
+
+
+def pull_image(
+    client,
+    image: str,
+    on_progress: Optional[Callable[[PullProgress], None]] = None,
+    force: bool = False,
+) -> PullProgress:
+    """Pull ``image`` unless present, reporting per-layer progress.
+
+    If another thread is already pulling the same image through the same
+    client, wait for that pull (receiving its progress) instead.
+    """
+    key = (id(client), image)
+    with _inflight_lock:
+        pull = _inflight.get(key)
+        owner = pull is None
+        if owner:
+            pull = _InflightPull(image)
+            _inflight[key] = pull
+        if on_progress is not None:
+            pull.listeners.append(on_progress)
+
+    if not owner:
+        pull.done.wait()
+        return pull.progress
+
+    progress = pull.progress
+    progress.started = time.monotonic()
+    try:
+        if not force and _image_present(client, image):
+            progress.status = "present"
+        else:
+            progress.status = "pulling"
+            for event in client.api.pull(image, stream=True, decode=True):
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                layer_id = event.get("id")
+                if layer_id and "progressDetail" in event:
+                    layer = progress.layers.setdefault(layer_id, LayerProgress())
+                    layer.status = event.get("status", layer.status)
+                    detail = event.get("progressDetail") or {}
+                    if event.get("status") == "Downloading":
+                        layer.current = detail.get("current", layer.current)
+                        layer.total = detail.get("total", layer.total)
+                    pull.notify()
+            progress.status = "pulled"
+    except Exception as e:
+        progress.status = "failed"
+        progress.error = str(e)
+    finally:
+        progress.elapsed = time.monotonic() - progress.started
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        pull.notify(force=True)
+        pull.done.set()
+    return progress
+
+
+def _image_present(client, image: str) -> bool:
+    try:
+        client.images.get(image)
+        return True
+    except ImageNotFound:
+        return False
+
+
+def pull_images(
+    client,
+    images: list[str],
+    on_progress: Optional[Callable[[list[PullProgress]], None]] = None,
+    max_workers: int = 4,
+) -> list[PullProgress]:
+    """Pull several images concurrently; ``on_progress`` receives all pulls' states."""
+    states = [PullProgress(image=image) for image in images]
+    lock = threading.Lock()
+
+    def _track(index: int) -> Callable[[PullProgress], None]:
+        def _update(progress: PullProgress) -> None:
+            with lock:
+                states[index] = progress
+                snapshot = list(states)
+            if on_progress is not None:
+                on_progress(snapshot)
+        return _update
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(pull_image, client, image, _track(i)) for i, image in enumerate(images)]
+        return [f.result() for f in futures]
+
+
+def start_prefetch(client, images: list[str]) -> threading.Thread:
+    """Pull ``images`` in a background daemon thread, ignoring failures.
+
+    Later ``pull_image`` calls for the same images join these pulls.
+    """
+    thread = threading.Thread(target=pull_images, args=(client, images), daemon=True, name="pipestep-prefetch")
+    thread.start()
+    return thread
@@ -0,0 +1,150 @@
+"""Run every job of a workflow headlessly, sharing their common leading steps.
+
+Jobs in one workflow usually start the same way (same image, checkout,
+toolchain setup, dependency install). The leading steps that two or more
+jobs have in common are run once, in a base container that is committed
+after each step (see :mod:`pipestep.cache`); every job then starts from
+the deepest committed image its steps match — a filesystem fork of the
+shared base — and runs only what is left.
+
+With ``pin_cores``, the host's cores are split between the jobs running
+at once, so one job's ``make -j`` can't starve the others.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import queue
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Optional
+
+from pipestep.backends import Backend
+from pipestep.cache import StepCache, prefix_keys, run_cached
+from pipestep.history import History
+from pipestep.models import Job
+from pipestep.resources import Resources, partition_cores
+from pipestep.runner import StepRun
+
+
+@dataclass
+class JobRun:
+    """Outcome of one job."""
+
+    job: Job
+    runs: list[StepRun] = field(default_factory=list)
+    cached: int = 0  # leading steps taken from the shared base
+    duration: float = 0.0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and all(r.exit_code in (0, None) for r in self.runs)
+
+    def describe(self) -> str:
+        if self.error:
+            return f"{self.job.name}: error — {self.error}"
+        failed = next((r for r in self.runs if r.exit_code not in (0, None)), None)
+        shared = f", {self.cached} shared" if self.cached else ""
+        status = f"failed at step {failed.index + 1} '{failed.name}'" if failed else "passed"
+        return f"{self.job.name}: {status} ({len(self.runs)} steps{shared}, {self.duration:.1f}s)"
+
+
+def shared_prefixes(jobs: list[Job], workspace_key: str) -> dict[str, int]:
+    """For each job, the number of leading steps it shares with at least one other job."""
+    keys = {job.name: prefix_keys(job, workspace_key) for job in jobs}
+    counts = Counter(key for job_keys in keys.values() for key in job_keys)
+    depths = {}
+    for name, job_keys in keys.items():
+        depth = 0
+        while depth < len(job_keys) and counts[job_keys[depth]] > 1:
+            depth += 1
+        depths[name] = depth
+    return depths
+
+
+def run_jobs(
+    jobs: list[Job],
+    workdir: str,
+    backend: Backend,
+    parallel: int = 1,
+    on_job: Optional[Callable[[JobRun], None]] = None,
+    resources: Optional[dict[str, Resources]] = None,
+    pin_cores: bool = False,
+    warm_python: bool = False,
+    history: Optional[History] = None,
+    workflow: str = "",
+) -> list[JobRun]:
+    """Run ``jobs`` headlessly, up to ``parallel`` at a time, each until its first failure.
+
+    ``resources`` limits each job's containers, by job name; with
+    ``pin_cores``, each running job also gets its own share of the cores.
+    ``warm_python`` runs ``shell: python`` steps in a warm interpreter.
+    With ``history``, every job's steps are recorded there under ``workflow``.
+    """
+    workspace_key = workdir
+    cache = StepCache(backend)
+    depths = shared_prefixes(jobs, workspace_key)
+    # One cpuset per job that can run at once, taken as a job starts and returned when it ends
+    cpusets: queue.Queue[str] = queue.Queue()
+    if pin_cores:
+        for cpuset in partition_cores(min(max(1, parallel), len(jobs))):
+            cpusets.put(cpuset)
+
+    @contextlib.contextmanager
+    def _limits(job: Job):
+        limits = (resources or {}).get(job.name, Resources())
+        if not pin_cores:
+            yield limits
+            return
+        cpuset = cpusets.get()
+        try:
+            yield replace(limits, cpuset=cpuset)
+        finally:
+            cpusets.put(cpuset)
+
+    def _warm(job: Job) -> None:
+        base = replace(job, name=f"{job.name}-base", steps=job.steps[:depths[job.name]])
+        try:
+            with _limits(job) as limits:
+                run_cached(base, workdir, backend, cache, workspace_key, resources=limits, warm_python=warm_python)
+        except Exception:
+            pass  # each job then runs the steps itself and reports the error
+
+    def _run(job: Job) -> JobRun:
+        result = JobRun(job=job)
+        start = time.monotonic()
+
+        def _count(run: StepRun, cached: bool) -> None:
+            result.cached += cached
+
+        try:
+            with _limits(job) as limits:
+                result.runs = run_cached(
+                    job, workdir, backend, cache, workspace_key, on_step=_count, cache_limit=depths[job.name],
+                    resources=limits, warm_python=warm_python, history=history, workflow=workflow,
+                )
+        except Exception as e:
+            result.error = str(e)
+        result.duration = time.monotonic() - start
+        if on_job is not None:
+            on_job(result)
+        return result
+
+    try:
+        # One base per distinct shared prefix, skipping prefixes of a deeper base
+        covered: set[str] = set()
+        bases = []
+        for job in sorted(jobs, key=lambda j: -depths[j.name]):
+            depth = depths[job.name]
+            keys = prefix_keys(job, workspace_key)[:depth]
+            if depth and keys[-1] not in covered:
+                covered.update(keys)
+                bases.append(job)
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            list(pool.map(_warm, bases))
+            return list(pool.map(_run, jobs))
+    finally:
+        cache.clear()
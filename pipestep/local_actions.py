@@ -0,0 +1,290 @@
+"""Local and mirrored actions: read ``action.yml`` and expand composite actions.
+
+``uses: ./path`` names an action inside the workspace. ``owner/repo[/path]@ref``
+is looked up in local mirror directories (``--action-mirror`` or
+``$PIPESTEP_ACTION_MIRROR``), laid out as ``<mirror>/<owner>/<repo>@<ref>/``,
+or ``<mirror>/<owner>/<repo>/`` to serve any ref.
+
+A composite action is expanded into its ``runs.steps``, with
+``${{ inputs.* }}`` and ``${{ github.action_path }}`` substituted, so each
+of its steps runs — and can be paused at — like a workflow step.
+JavaScript and container actions become a single step run by
+:mod:`pipestep.action_runner`. Parsed definitions are cached by path and
+content hash.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+import yaml
+
+from pipestep.action_runner import container_action_step, docker_uses_step, node_step
+from pipestep.actions import get_action_equivalent
+from pipestep.backends import ACTIONS_DIR
+from pipestep.expressions import interpolate
+from pipestep.models import Step, Workflow, layered_env
+
+MIRROR_ENV = "PIPESTEP_ACTION_MIRROR"
+
+# Composite actions nesting deeper than this are assumed to be a cycle
+MAX_DEPTH = 10
+
+_ACTION_FILES = ("action.yml", "action.yaml")
+_REMOTE_RE = re.compile(r"^(?P<owner>[\w.-]+)/(?P<repo>[\w.-]+)(?:/(?P<path>[^@]+))?@(?P<ref>.+)$")
+_ACTION_PATH_RE = re.compile(r"\$\{\{\s*github\.action_path\s*\}\}")
+
+_definitions: dict[str, tuple[str, "ActionDefinition"]] = {}
+_definitions_lock = threading.Lock()
+
+
+@dataclass
+class ActionDefinition:
+    """A parsed ``action.yml``."""
+
+    path: str  # the action's directory on the host
+    name: str
+    using: str  # composite, node20, docker, ...
+    inputs: dict = field(default_factory=dict)
+    runs: dict = field(default_factory=dict)
+
+    @property
+    def steps(self) -> list:
+        return self.runs.get("steps") or []
+
+    def resolve_inputs(self, given: dict) -> tuple[dict, list[str]]:
+        """Input values for a call with ``given`` (defaults filled in), and the missing required ones."""
+        values, missing = {}, []
+        for name, spec in self.inputs.items():
+            spec = spec if isinstance(spec, dict) else {}
+            if name in given:
+                values[name] = given[name]
+            elif "default" in spec:
+                values[name] = _scalar(spec["default"])
+            else:
+                values[name] = ""
+                if spec.get("required"):
+                    missing.append(name)
+        # GitHub passes undeclared inputs through too (with a warning)
+        values.update({k: v for k, v in given.items() if k not in values})
+        return values, missing
+
+
+@dataclass
+class ResolvedAction:
+    """Where an action lives on the host, and where its steps see it."""
+
+    source: str  # host directory
+    path: str  # directory inside the container (``github.action_path``)
+    in_workspace: bool
+
+
+def mirror_dirs(extra: str = "") -> list[str]:
+    """Mirror directories from ``extra`` and ``$PIPESTEP_ACTION_MIRROR`` (both ``os.pathsep``-separated)."""
+    dirs = []
+    for value in (extra, os.environ.get(MIRROR_ENV, "")):
+        dirs += [os.path.abspath(d) for d in value.split(os.pathsep) if d]
+    return dirs
+
+
+def resolve_action(ref: str, workdir: str, mirrors: list[str]) -> Optional[ResolvedAction]:
+    """Find the directory of the action ``ref``, or None if it isn't available locally."""
+    if ref.startswith("./"):
+        rel = os.path.normpath(ref[2:])
+        if rel.startswith(".."):
+            return None
+        source = os.path.join(os.path.abspath(workdir), rel)
+        if not os.path.isdir(source):
+            return None
+        path = "/workspace" if rel == "." else f"/workspace/{rel}"
+        return ResolvedAction(source=source, path=path, in_workspace=True)
+
+    match = _REMOTE_RE.match(ref)
+    if match is None:
+        return None  # docker:// and malformed refs
+    owner, repo, sub, version = match.group("owner", "repo", "path", "ref")
+    sub = os.path.normpath(sub) if sub else ""
+    if sub.startswith(".."):
+        return None
+    for mirror in mirrors:
+        for base in (os.path.join(mirror, owner, f"{repo}@{version}"), os.path.join(mirror, owner, repo)):
+            source = os.path.join(base, sub) if sub else base
+            if os.path.isdir(source):
+                path = f"{ACTIONS_DIR}/{owner}/{repo}@{version}" + (f"/{sub}" if sub else "")
+                return ResolvedAction(source=source, path=path, in_workspace=False)
+    return None
+
+
+def load_action(directory: str) -> ActionDefinition:
+    """Parse ``action.yml`` (or ``action.yaml``) in ``directory``.
+
+    Definitions are cached by file path and content hash, so an edited
+    action is re-read and an unchanged one is parsed once.
+    """
+    for filename in _ACTION_FILES:
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            break
+    else:
+        raise ValueError(f"No action.yml in {directory}")
+    path = os.path.realpath(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    with _definitions_lock:
+        cached = _definitions.get(path)
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+
+    try:
+        raw = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML in {path}: {e}") from e
+    if not isinstance(raw, dict) or not isinstance(raw.get("runs"), dict):
+        raise ValueError(f"Invalid action file {path}: no 'runs' section found")
+    runs = raw["runs"]
+    definition = ActionDefinition(
+        path=os.path.dirname(path),
+        name=str(raw.get("name", os.path.basename(os.path.dirname(path)))),
+        using=str(runs.get("using", "")),
+        inputs=raw.get("inputs") if isinstance(raw.get("inputs"), dict) else {},
+        runs=runs,
+    )
+    if definition.using == "composite" and not isinstance(runs.get("steps"), list):
+        raise ValueError(f"Invalid composite action {path}: 'runs.steps' must be a list")
+    with _definitions_lock:
+        _definitions[path] = (digest, definition)
+    return definition
+
+
+def expand_action(step: Step, workdir: str, mirrors: list[str], depth: int = 0) -> Optional[list[Step]]:
+    """The steps an action step expands to, or None if the action isn't available locally.
+
+    Actions with a built-in equivalent (see :mod:`pipestep.actions`) are
+    left to it. Raises ValueError for unreadable or unsupported action
+    files and runaway nesting.
+    """
+    if not step.is_action:
+        return None
+    if step.action_ref.startswith("docker://"):
+        return [docker_uses_step(step)]
+    if not step.action_ref.startswith("./") and get_action_equivalent(step.action_ref, step.action_with):
+        return None
+    resolved = resolve_action(step.action_ref, workdir, mirrors)
+    if resolved is None:
+        return None
+    definition = load_action(resolved.source)
+    inputs, _ = definition.resolve_inputs(step.action_with)
+    context = {"inputs": inputs}
+
+    def _sub(text) -> str:
+        text = _ACTION_PATH_RE.sub(lambda _: resolved.path, _scalar(text))
+        return interpolate(text, context, partial=True)
+
+    if definition.using.startswith("node"):
+        return [node_step(step, definition, resolved, inputs)]
+    if definition.using == "docker":
+        return [container_action_step(step, definition, inputs, _sub)]
+    if definition.using != "composite":
+        raise ValueError(f"{step.action_ref}: unsupported runs.using '{definition.using}'")
+    if depth >= MAX_DEPTH:
+        raise ValueError(f"{step.action_ref}: composite actions nested more than {MAX_DEPTH} deep")
+
+    steps = []
+    for i, raw in enumerate(definition.steps):
+        if not isinstance(raw, dict):
+            raise ValueError(f"{step.action_ref}: step {i + 1} is not a mapping")
+        env = layered_env(step.env, {
+            "GITHUB_ACTION_PATH": resolved.path,
+            **{str(k): _sub(v) for k, v in (raw.get("env") or {}).items()},
+        })
+        condition = _sub(raw["if"]).strip() if raw.get("if") not in (None, "") else ""
+        if step.condition:
+            condition = f"({step.condition}) && ({condition})" if condition else step.condition
+        source = "" if resolved.in_workspace else resolved.source
+
+        if "uses" in raw:
+            child = Step(
+                name="",
+                command="",
+                env=env,
+                is_action=True,
+                action_ref=_sub(raw["uses"]),
+                action_with={str(k): _sub(v) for k, v in (raw.get("with") or {}).items()},
+                condition=condition,
+                timeout_minutes=step.timeout_minutes,
+            )
+            child.name = f"{step.name} / {raw.get('name') or f'Action: {child.action_ref}'}"
+            nested = expand_action(child, workdir, mirrors, depth + 1)
+            steps.extend(nested if nested is not None else [child])
+            continue
+
+        if "run" not in raw:
+            raise ValueError(f"{step.action_ref}: step {i + 1} has neither 'run' nor 'uses'")
+        command = _sub(raw["run"]).strip()
+        working_dir = _sub(raw.get("working-directory") or "/workspace")
+        if not working_dir.startswith("/"):
+            working_dir = f"/workspace/{working_dir}"
+        label = raw.get("name") or command.split("\n")[0]
+        steps.append(Step(
+            name=f"{step.name} / {label}",
+            command=command,
+            env=env,
+            working_directory=working_dir,
+            condition=condition,
+            action_path=resolved.path,
+            action_source=source,
+            shell=_sub(raw.get("shell") or ""),
+            # The action's timeout, applied to each of its steps
+            timeout_minutes=step.timeout_minutes,
+        ))
+    return steps
+
+
+def expand_workflow(workflow: Workflow, workdir: str, mirrors: list[str]) -> None:
+    """Replace local and mirrored action steps in every job with the steps they expand to.
+
+    Problems (missing inputs, unreadable action files) become workflow
+    warnings; the step is then left as an action step.
+    """
+    for job in workflow.jobs:
+        steps = []
+        for step in job.steps:
+            try:
+                expanded = expand_action(step, workdir, mirrors)
+            except ValueError as e:
+                _warn(workflow, f"Step '{step.name}': {e}")
+                expanded = None
+            if expanded is None:
+                if step.is_action and step.action_ref.startswith("./"):
+                    if resolve_action(step.action_ref, workdir, mirrors) is None:
+                        _warn(workflow, f"Step '{step.name}': local action {step.action_ref} not found in {workdir}.")
+                steps.append(step)
+                continue
+            resolved = resolve_action(step.action_ref, workdir, mirrors)
+            if resolved is not None:
+                _, missing = load_action(resolved.source).resolve_inputs(step.action_with)
+                if missing:
+                    _warn(workflow, f"Step '{step.name}': {step.action_ref} is missing required inputs: {', '.join(missing)}.")
+            steps.extend(expanded)
+        job.steps = steps
+
+
+def _warn(workflow: Workflow, msg: str) -> None:
+    workflow.warnings.append(msg)
+    print(f"⚠ Warning: {msg}", file=sys.stderr)
+
+
+def _scalar(value) -> str:
+    """YAML scalar as the string GitHub would see."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
@@ -0,0 +1,78 @@
+"""On-disk storage for step output.
+
+Step output can be large and is rarely read back after it has been shown,
+so instead of keeping it in memory a :class:`Step` holds a
+:class:`LogHandle` — an offset and length into an append-only log file —
+and reads the text back on demand.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+class LogStore:
+    """An append-only log file of step output; removed on ``close`` unless ``path`` was given."""
+
+    def __init__(self, path: str = "") -> None:
+        self._owned = not path
+        if not path:
+            fd, path = tempfile.mkstemp(prefix="pipestep-output-", suffix=".log")
+            os.close(fd)
+        self.path = path
+        self._file = open(path, "a+b")
+        self._lock = threading.Lock()
+
+    def append(self, text: str) -> LogHandle:
+        data = text.encode("utf-8", errors="replace")
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+        return LogHandle(self, offset, len(data))
+
+    def read(self, offset: int, length: int) -> str:
+        return os.pread(self._file.fileno(), length, offset).decode("utf-8", errors="replace")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+        if self._owned:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+@dataclass(frozen=True, slots=True)
+class LogHandle:
+    """A slice of a :class:`LogStore`."""
+
+    store: LogStore
+    offset: int
+    length: int
+
+    def read(self) -> str:
+        return self.store.read(self.offset, self.length)
+
+
+_default: Optional[LogStore] = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> LogStore:
+    """The process-wide store, created on first use and removed at exit."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LogStore()
+            atexit.register(_default.close)
+        return _default
@@ -1,10 +1,25 @@
-"""Data models for workflows, jobs, steps, and execution results."""
+"""Data models for workflows, jobs, steps, and execution results.
+
+Models use ``__slots__``, and env mappings are layered: a job's env is a
+``ChainMap`` of its own variables over the workflow's, and each step's a
+layer over its job's, so large generated workflows don't copy the shared
+layers into every step.
+"""
 
 from __future__ import annotations
 
+from collections import ChainMap
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import Mapping, Optional
+
+from pipestep.logs import LogHandle, default_store
+
+
+def layered_env(base: Mapping, own: Optional[dict] = None) -> ChainMap:
+    """``own`` variables over ``base``, sharing ``base``'s layers rather than copying them."""
+    parents = base.maps if isinstance(base, ChainMap) else [base]
+    return ChainMap(own if own is not None else {}, *parents)
 
 
 class StepStatus(Enum):
@@ -18,24 +33,41 @@ class StepStatus(Enum):
     SKIPPED = "skipped"
 
 
-@dataclass
+@dataclass(slots=True)
 class Step:
     """A single step within a CI job (either a shell command or an action reference)."""
 
     name: str
     command: str
-    env: dict = field(default_factory=dict)
+    env: Mapping[str, str] = field(default_factory=dict)
     working_directory: str = "/workspace"
     status: StepStatus = StepStatus.PENDING
     breakpoint: bool = False
     is_action: bool = False
     action_ref: str = ""
     action_with: dict = field(default_factory=dict)
-    output: str = ""
+    condition: str = ""  # the step's `if:` expression, if any
+    action_path: str = ""  # for steps of a composite action: its directory in the container
+    action_source: str = ""  # ...and on the host, if it must be copied in (not in the workspace)
+    runtime: str = ""  # action runtime the command needs, e.g. node20
+    image: str = ""  # run in a one-off container of this image (container actions); command holds its args
+    entrypoint: str = ""  # ...overriding the image's entrypoint
+    timeout_minutes: float = 0  # `timeout-minutes`; 0 means no limit
+    shell: str = ""  # `shell:` (or the defaults'); empty runs the command with bash -c, see pipestep.shells
+    output_log: Optional[LogHandle] = None  # see the `output` property
     exit_code: Optional[int] = None
 
+    @property
+    def output(self) -> str:
+        """The last run's output, read back from the on-disk log."""
+        return self.output_log.read() if self.output_log is not None else ""
+
+    @output.setter
+    def output(self, text: str) -> None:
+        self.output_log = default_store().append(text) if text else None
+
 
-@dataclass
+@dataclass(slots=True)
 class Job:
     """A CI job containing a sequence of steps and a target runner image."""
 
@@ -43,10 +75,15 @@ class Job:
     runs_on: str
     docker_image: str
     steps: list[Step] = field(default_factory=list)
-    env: dict = field(default_factory=dict)
+    env: Mapping[str, str] = field(default_factory=dict)
+    services: list[str] = field(default_factory=list)
+    condition: str = ""  # the job's `if:` expression, if any
+    matrix: dict = field(default_factory=dict)  # raw `strategy.matrix`, see parser.expand_matrix
+    timeout_minutes: float = 0  # `timeout-minutes` for the job's total step run time; 0 means no limit
+    container_options: str = ""  # `container.options`; resource flags apply, see pipestep.resources
 
 
-@dataclass
+@dataclass(slots=True)
 class Workflow:
     """A parsed GitHub Actions workflow with one or more jobs."""
 
@@ -54,9 +91,10 @@ class Workflow:
     trigger: str
     jobs: list[Job] = field(default_factory=list)
     warnings: list[str] = field(default_factory=list)
+    path: str = ""  # absolute path of the workflow file, if parsed from one
 
 
-@dataclass
+@dataclass(slots=True)
 class StepResult:
     """Output captured from executing a single step in the container."""
 
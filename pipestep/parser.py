@@ -1,11 +1,30 @@
-"""Parser for GitHub Actions workflow YAML files."""
+"""Parser for GitHub Actions workflow YAML files.
+
+A job that calls a reusable workflow in the repository
+(``uses: ./.github/workflows/build.yml``) is replaced by that workflow's
+jobs, named ``<caller>/<job>``, with its ``${{ inputs.* }}`` and
+``${{ secrets.* }}`` substituted from the caller's ``with:`` and
+``secrets:``. Called workflows may call others; a cycle is an error.
+Workflow files are cached by content hash, and substituted ones by their
+path and inputs too, so a workflow shared by many callers is read once.
+"""
 
 from __future__ import annotations
 
+import copy
+import hashlib
+import json
+import os
 import re
 import sys
+import threading
+from typing import Optional
+
 import yaml
-from pipestep.models import Workflow, Job, Step
+from pipestep.expressions import interpolate
+from pipestep.models import Workflow, Job, Step, layered_env
+from pipestep.resources import parse_options
+from pipestep.shells import check_shell
 
 IMAGE_MAP = {
     "ubuntu-latest": "ubuntu:22.04",
@@ -14,19 +33,28 @@ IMAGE_MAP = {
     "ubuntu-20.04": "ubuntu:20.04",
 }
 
+# Reusable workflows nesting deeper than this are rejected (GitHub allows 10 levels)
+MAX_DEPTH = 10
+
+# Parsed workflow files by content hash, and substituted reusable workflows
+# by (path, content hash, inputs and secrets). Both are only read through
+# copies, so callers are free to modify what they get.
+_files: dict[str, object] = {}
+_resolved: dict[tuple[str, str, str], dict] = {}
+_cache_lock = threading.Lock()
+# The caches are emptied when they grow past this many entries
+MAX_FILES = 256
+MAX_RESOLVED = 512
+
 
 def parse_workflow(path: str) -> Workflow:
     """Parse a GitHub Actions YAML file into a Workflow model."""
-    with open(path) as f:
-        raw = yaml.safe_load(f)
+    path = os.path.abspath(path)
+    _, raw = _load_yaml(path)
 
     if not isinstance(raw, dict):
         raise ValueError(f"Invalid workflow file: expected YAML mapping, got {type(raw).__name__}")
 
-    # PyYAML parses bare `on:` as boolean True — normalize it
-    if True in raw:
-        raw["on"] = raw.pop(True)
-
     if not isinstance(raw.get("jobs"), dict):
         raise ValueError("Invalid workflow file: no 'jobs' section found")
 
@@ -42,91 +70,369 @@ def parse_workflow(path: str) -> Workflow:
     else:
         trigger = "on: unknown"
 
-    workflow_env = _str_dict(raw.get("env", {}))
+    warnings: list[str] = []
+    jobs = _parse_jobs(raw, path, warnings, (path,))
+    return Workflow(name=name, trigger=trigger, jobs=jobs, warnings=warnings, path=path)
+
 
-    warnings = []
+def _parse_jobs(raw: dict, path: str, warnings: list[str], stack: tuple[str, ...]) -> list[Job]:
+    """The jobs of the workflow ``raw`` read from ``path``; ``stack`` is the chain of workflows calling it."""
+    workflow_env = _str_dict(raw.get("env", {}))
+    workflow_shell = _default_shell(raw)
     jobs = []
     for job_id, job_raw in raw.get("jobs", {}).items():
-        runs_on = job_raw.get("runs-on", "ubuntu-latest")
+        if isinstance(job_raw, dict) and job_raw.get("uses"):
+            called = _called_jobs(str(job_id), job_raw, path, warnings, stack)
+            if called is not None:
+                jobs.extend(called)
+                continue
+        jobs.append(_parse_job(str(job_id), job_raw, workflow_env, workflow_shell, warnings))
+    return jobs
 
-        # Handle runs-on as a list (e.g. [self-hosted, linux])
-        if isinstance(runs_on, list):
-            runs_on_key = runs_on[0] if runs_on else "ubuntu-latest"
-        else:
-            runs_on_key = str(runs_on)
 
-        # Detect matrix/expression placeholders that can't be resolved locally
-        if re.search(r'\$\{\{', runs_on_key):
-            msg = f"Job '{job_id}': runs-on uses expression '{runs_on_key}' which can't be resolved locally. Using ubuntu:22.04."
-            warnings.append(msg)
-            print(f"\u26a0 Warning: {msg}", file=sys.stderr)
-            runs_on_key = "ubuntu-latest"
-
-        # Check for container: at job level first
-        container_raw = job_raw.get("container", None)
-        if isinstance(container_raw, str):
-            docker_image = container_raw
-        elif isinstance(container_raw, dict):
-            docker_image = container_raw.get("image", IMAGE_MAP.get(runs_on_key, "ubuntu:22.04"))
+def _parse_job(job_id: str, job_raw: dict, workflow_env: dict, workflow_shell: str, warnings: list[str]) -> Job:
+    runs_on = job_raw.get("runs-on", "ubuntu-latest")
+
+    # Handle runs-on as a list (e.g. [self-hosted, linux])
+    if isinstance(runs_on, list):
+        runs_on_key = runs_on[0] if runs_on else "ubuntu-latest"
+    else:
+        runs_on_key = str(runs_on)
+
+    # Detect matrix/expression placeholders that can't be resolved locally
+    if re.search(r'\$\{\{', runs_on_key):
+        msg = f"Job '{job_id}': runs-on uses expression '{runs_on_key}' which can't be resolved locally. Using ubuntu:22.04."
+        warnings.append(msg)
+        print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+        runs_on_key = "ubuntu-latest"
+
+    # Check for container: at job level first
+    container_raw = job_raw.get("container", None)
+    if isinstance(container_raw, str):
+        docker_image = container_raw
+    elif isinstance(container_raw, dict):
+        docker_image = container_raw.get("image", IMAGE_MAP.get(runs_on_key, "ubuntu:22.04"))
+    else:
+        docker_image = IMAGE_MAP.get(runs_on_key, "ubuntu:22.04")
+
+    if runs_on_key not in IMAGE_MAP and container_raw is None:
+        msg = f"'{runs_on_key}' has no local Docker mapping. Using ubuntu:22.04 as fallback."
+        warnings.append(msg)
+        print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+
+    job_env = layered_env(workflow_env, _str_dict(job_raw.get("env", {})))
+
+    # Service container images (not started, but pre-pulled with the job image)
+    services = []
+    services_raw = job_raw.get("services", {})
+    if isinstance(services_raw, dict):
+        for service_raw in services_raw.values():
+            if isinstance(service_raw, str):
+                services.append(service_raw)
+            elif isinstance(service_raw, dict) and service_raw.get("image"):
+                services.append(str(service_raw["image"]))
+
+    strategy = job_raw.get("strategy") or {}
+    matrix = strategy.get("matrix", {}) if isinstance(strategy, dict) else {}
+    if not isinstance(matrix, dict):
+        msg = f"Job '{job_id}': matrix '{matrix}' is an expression and can't be expanded locally."
+        warnings.append(msg)
+        print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+        matrix = {}
+
+    job_timeout = _timeout(job_raw.get("timeout-minutes"), f"Job '{job_id}'", warnings)
+    container_options = ""
+    if isinstance(container_raw, dict) and container_raw.get("options"):
+        container_options = _container_options(str(container_raw["options"]), f"Job '{job_id}'", warnings)
+    job_shell = _default_shell(job_raw) or workflow_shell
+
+    steps = []
+    for step_raw in job_raw.get("steps", []):
+        step_env = layered_env(job_env, _str_dict(step_raw.get("env", {})))
+        condition = _condition(step_raw.get("if"))
+
+        if "uses" in step_raw:
+            action_ref = step_raw["uses"]
+            step_name = step_raw.get("name", f"Action: {action_ref}")
+            action_with = _str_dict(step_raw.get("with", {}))
+            steps.append(Step(
+                name=step_name,
+                command="",
+                env=step_env,
+                is_action=True,
+                action_ref=action_ref,
+                action_with=action_with,
+                condition=condition,
+                timeout_minutes=_timeout(step_raw.get("timeout-minutes"), f"Step '{step_name}'", warnings),
+            ))
+        elif "run" in step_raw:
+            command = step_raw["run"].strip()
+            step_name = step_raw.get("name", command.split("\n")[0])
+            working_dir = step_raw.get("working-directory")
+            if working_dir and not working_dir.startswith("/"):
+                working_dir = f"/workspace/{working_dir}"
+            elif working_dir is None:
+                working_dir = "/workspace"
+
+            # Warn about unresolvable expressions in commands
+            expressions = re.findall(r'\$\{\{[^}]*\}\}', command)
+            matrix_exprs = [e for e in expressions if 'matrix.' in e or 'secrets.' in e or 'github.' in e]
+            if matrix_exprs:
+                msg = f"Step '{step_name}': contains expressions {', '.join(matrix_exprs[:3])} that won't resolve locally."
+                warnings.append(msg)
+                print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+
+            steps.append(Step(
+                name=step_name,
+                command=command,
+                env=step_env,
+                working_directory=working_dir,
+                condition=condition,
+                timeout_minutes=_timeout(step_raw.get("timeout-minutes"), f"Step '{step_name}'", warnings),
+                shell=_shell(step_raw.get("shell") or job_shell, f"Step '{step_name}'", warnings),
+            ))
+
+    return Job(
+        name=job_id,
+        runs_on=runs_on_key,
+        docker_image=docker_image,
+        steps=steps,
+        env=job_env,
+        services=services,
+        condition=_condition(job_raw.get("if")),
+        matrix=matrix,
+        timeout_minutes=job_timeout,
+        container_options=container_options,
+    )
+
+
+def _called_jobs(
+    job_id: str, job_raw: dict, path: str, warnings: list[str], stack: tuple[str, ...],
+) -> Optional[list[Job]]:
+    """The jobs of the reusable workflow that job ``job_id`` calls, or None if it isn't in the repository.
+
+    Raises ValueError for a cycle, nesting deeper than ``MAX_DEPTH`` or an
+    unreadable workflow file.
+    """
+    ref = str(job_raw["uses"]).strip()
+    root = _repo_root(path)
+    if not ref.startswith("./"):
+        _warn(
+            warnings,
+            f"Job '{job_id}': reusable workflow '{ref}' is in another repository and can't be fetched; the job has no steps.",
+        )
+        return None
+    called = os.path.normpath(os.path.join(root, ref[2:]))
+    if called in stack:
+        chain = " → ".join(os.path.relpath(p, root) for p in (*stack[stack.index(called):], called))
+        raise ValueError(f"Reusable workflows call each other in a cycle: {chain}")
+    if len(stack) > MAX_DEPTH:
+        raise ValueError(f"Job '{job_id}': reusable workflows nested more than {MAX_DEPTH} deep")
+    if not os.path.isfile(called):
+        _warn(warnings, f"Job '{job_id}': reusable workflow {ref} not found; the job has no steps.")
+        return None
+    try:
+        digest, raw = _load_yaml(called)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML in reusable workflow {called}: {e}") from e
+    if not isinstance(raw, dict) or not isinstance(raw.get("jobs"), dict):
+        raise ValueError(f"Invalid reusable workflow {called}: no 'jobs' section found")
+
+    trigger = raw.get("on")
+    if "workflow_call" not in (trigger if isinstance(trigger, (dict, list)) else [trigger]):
+        _warn(warnings, f"Job '{job_id}': {ref} isn't triggered by workflow_call; GitHub won't run it from another workflow.")
+    call = trigger.get("workflow_call") if isinstance(trigger, dict) else None
+    given = job_raw.get("with") if isinstance(job_raw.get("with"), dict) else {}
+    inputs, missing = _call_inputs(call, given)
+    if missing:
+        _warn(warnings, f"Job '{job_id}': {ref} requires inputs {', '.join(missing)}, which aren't given.")
+    context: dict = {"inputs": inputs}
+    secrets = job_raw.get("secrets")
+    if isinstance(secrets, dict):
+        context["secrets"] = _str_dict(secrets)  # `secrets: inherit` leaves secrets.* to the caller's
+
+    key = (called, digest, json.dumps(context, sort_keys=True, default=str))
+    with _cache_lock:
+        resolved = _resolved.get(key)
+    if resolved is None:
+        resolved = _substitute(raw, context)
+        with _cache_lock:
+            if len(_resolved) >= MAX_RESOLVED:
+                _resolved.clear()
+            _resolved[key] = resolved
+
+    jobs = _parse_jobs(copy.deepcopy(resolved), called, warnings, (*stack, called))
+    condition = _condition(job_raw.get("if"))
+    strategy = job_raw.get("strategy") or {}
+    matrix = strategy.get("matrix") if isinstance(strategy, dict) else None
+    for job in jobs:
+        job.name = f"{job_id}/{job.name}"
+        if condition:
+            job.condition = f"({condition}) && ({job.condition})" if job.condition else condition
+        if isinstance(matrix, dict) and not job.matrix:
+            job.matrix = copy.deepcopy(matrix)
+    return jobs
+
+
+def _load_yaml(path: str) -> tuple[str, object]:
+    """The content hash and a copy of the parsed YAML of a workflow file, with a bare `on:` key normalized.
+
+    Cached by content hash, so the same file in another checkout is parsed once.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    with _cache_lock:
+        raw = _files.get(digest)
+    if raw is None:
+        raw = yaml.safe_load(content)
+        # PyYAML parses bare `on:` as boolean True — normalize it
+        if isinstance(raw, dict) and True in raw:
+            raw["on"] = raw.pop(True)
+        with _cache_lock:
+            if len(_files) >= MAX_FILES:
+                _files.clear()
+            _files[digest] = raw
+    return digest, copy.deepcopy(raw)
+
+
+def _repo_root(path: str) -> str:
+    """The repository holding workflow file ``path``: the directory containing its ``.github``, else its own directory."""
+    directory = probe = os.path.dirname(path)
+    while os.path.basename(probe) != ".github":
+        parent = os.path.dirname(probe)
+        if parent == probe:
+            return directory
+        probe = parent
+    return os.path.dirname(probe)
+
+
+def _call_inputs(call, given: dict) -> tuple[dict, list[str]]:
+    """Input values for a `workflow_call` with ``given`` (defaults filled in), and the missing required ones."""
+    specs = call.get("inputs") if isinstance(call, dict) else None
+    values, missing = {}, []
+    for name, spec in (specs if isinstance(specs, dict) else {}).items():
+        spec = spec if isinstance(spec, dict) else {}
+        if name in given:
+            values[name] = "" if given[name] is None else given[name]
+        elif "default" in spec:
+            values[name] = spec["default"]
         else:
-            docker_image = IMAGE_MAP.get(runs_on_key, "ubuntu:22.04")
+            values[name] = False if spec.get("type") == "boolean" else ""
+            if spec.get("required"):
+                missing.append(str(name))
+    values.update({str(k): v for k, v in given.items() if k not in values})
+    return values, missing
+
+
+def _substitute(raw, context: dict):
+    """A copy of ``raw`` with the expressions that read ``context`` in its strings replaced."""
+    if isinstance(raw, dict):
+        return {k: _substitute(v, context) for k, v in raw.items()}
+    if isinstance(raw, list):
+        return [_substitute(v, context) for v in raw]
+    if isinstance(raw, str) and "${{" in raw:
+        return interpolate(raw, context, partial=True)
+    return raw
+
 
-        if runs_on_key not in IMAGE_MAP and container_raw is None:
-            msg = f"'{runs_on_key}' has no local Docker mapping. Using ubuntu:22.04 as fallback."
+def _warn(warnings: list[str], msg: str) -> None:
+    warnings.append(msg)
+    print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+
+
+def expand_matrix(matrix: dict) -> list[dict]:
+    """Expand a `strategy.matrix` mapping into its combinations, GitHub-style.
+
+    The cross product of the axes, minus ``exclude`` entries (which match
+    on the keys they name), then ``include`` entries: each is merged into
+    every original combination it doesn't contradict, or added as a new
+    combination if there is none. An empty matrix has one empty combination.
+    """
+    axes = {k: v for k, v in matrix.items() if k not in ("include", "exclude")}
+    combos: list[dict] = [{}]
+    for key, values in axes.items():
+        values = values if isinstance(values, list) else [values]
+        combos = [{**combo, key: value} for combo in combos for value in values]
+    if not axes:
+        combos = []
+
+    excludes = [e for e in matrix.get("exclude") or [] if isinstance(e, dict)]
+    combos = [c for c in combos if not any(all(c.get(k) == v for k, v in e.items()) for e in excludes)]
+
+    originals = [dict(c) for c in combos]
+    for include in matrix.get("include") or []:
+        if not isinstance(include, dict):
+            continue
+        merged = False
+        for combo, original in zip(combos, originals):
+            if all(original.get(k, v) == v for k, v in include.items() if k in axes):
+                combo.update(include)
+                merged = True
+        if not merged:
+            combos.append(dict(include))
+    return combos or [{}]
+
+
+def _condition(raw) -> str:
+    """Normalize an `if:` value (YAML may hand us a bool) to expression text."""
+    if raw is None:
+        return ""
+    if isinstance(raw, bool):
+        return str(raw).lower()
+    return str(raw).strip()
+
+
+def _timeout(raw, where: str, warnings: list[str]) -> float:
+    """A `timeout-minutes` value in minutes, or 0 (no limit) if absent or not a number."""
+    if raw is None:
+        return 0
+    try:
+        minutes = float(raw)
+    except (TypeError, ValueError):
+        minutes = -1
+    if minutes <= 0 or isinstance(raw, bool):
+        msg = f"{where}: timeout-minutes '{raw}' isn't a positive number of minutes and is ignored."
+        warnings.append(msg)
+        print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+        return 0
+    return minutes
+
+
+def _default_shell(raw: dict) -> str:
+    """The `defaults.run.shell` of a workflow or job mapping, if any."""
+    defaults = raw.get("defaults")
+    run = defaults.get("run") if isinstance(defaults, dict) else None
+    return str(run.get("shell") or "").strip() if isinstance(run, dict) else ""
+
+
+def _shell(raw, where: str, warnings: list[str]) -> str:
+    """A step's `shell`; one that can't run here is kept, so the step fails saying why, and reported now."""
+    shell = str(raw or "").strip()
+    if shell:
+        try:
+            check_shell(shell)
+        except ValueError as e:
+            msg = f"{where}: {e}; the step will fail."
             warnings.append(msg)
             print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+    return shell
+
 
-        job_env = _str_dict(job_raw.get("env", {}))
-
-        steps = []
-        for step_raw in job_raw.get("steps", []):
-            step_env = {**workflow_env, **job_env, **_str_dict(step_raw.get("env", {}))}
-
-            if "uses" in step_raw:
-                action_ref = step_raw["uses"]
-                step_name = step_raw.get("name", f"Action: {action_ref}")
-                action_with = _str_dict(step_raw.get("with", {}))
-                steps.append(Step(
-                    name=step_name,
-                    command="",
-                    env=step_env,
-                    is_action=True,
-                    action_ref=action_ref,
-                    action_with=action_with,
-                ))
-            elif "run" in step_raw:
-                command = step_raw["run"].strip()
-                step_name = step_raw.get("name", command.split("\n")[0])
-                working_dir = step_raw.get("working-directory")
-                if working_dir and not working_dir.startswith("/"):
-                    working_dir = f"/workspace/{working_dir}"
-                elif working_dir is None:
-                    working_dir = "/workspace"
-
-                # Warn about unresolvable expressions in commands
-                expressions = re.findall(r'\$\{\{[^}]*\}\}', command)
-                matrix_exprs = [e for e in expressions if 'matrix.' in e or 'secrets.' in e or 'github.' in e]
-                if matrix_exprs:
-                    msg = f"Step '{step_name}': contains expressions {', '.join(matrix_exprs[:3])} that won't resolve locally."
-                    warnings.append(msg)
-                    print(f"\u26a0 Warning: {msg}", file=sys.stderr)
-
-                steps.append(Step(
-                    name=step_name,
-                    command=command,
-                    env=step_env,
-                    working_directory=working_dir,
-                ))
-
-        jobs.append(Job(
-            name=job_id,
-            runs_on=runs_on_key,
-            docker_image=docker_image,
-            steps=steps,
-            env={**workflow_env, **job_env},
-        ))
-
-    return Workflow(name=name, trigger=trigger, jobs=jobs, warnings=warnings)
+def _container_options(raw: str, where: str, warnings: list[str]) -> str:
+    """`container.options`, if its resource flags are valid; other docker flags are reported and ignored."""
+    try:
+        _, ignored = parse_options(raw)
+    except ValueError as e:
+        msg = f"{where}: container options '{raw}' are ignored: {e}"
+        warnings.append(msg)
+        print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+        return ""
+    if ignored:
+        msg = f"{where}: container options {' '.join(ignored)} aren't applied locally."
+        warnings.append(msg)
+        print(f"\u26a0 Warning: {msg}", file=sys.stderr)
+    return raw
 
 
 def _str_dict(d: dict) -> dict:
@@ -0,0 +1,242 @@
+"""Dry-run planning: what a run would do, without starting a container.
+
+The plan resolves each image (present locally or needing a pull), expands
+matrices, evaluates ``if:`` conditions where their inputs are known
+offline, says how each action step would be handled, and estimates
+durations from previously recorded sessions.
+"""
+
+from __future__ import annotations
+
+import statistics
+import subprocess
+from dataclasses import dataclass, field
+from typing import Optional
+
+from docker.errors import ImageNotFound
+
+from pipestep.actions import get_action_equivalent
+from pipestep.backends import Backend
+from pipestep.expressions import (
+    RUNTIME_CONTEXTS, ExpressionError, evaluate_condition, parse_expression, to_string,
+)
+from pipestep.images import collect_images
+from pipestep.models import Job, Step, Workflow
+from pipestep.parser import expand_matrix
+
+
+@dataclass
+class ImagePlan:
+    """Where an image will come from."""
+
+    image: str
+    status: str  # present | pull | host | unknown
+    size: int = 0
+    note: str = ""
+
+    def describe(self) -> str:
+        if self.status == "present":
+            return f"{self.image}: present ({self.size / 1_000_000:.1f} MB)"
+        if self.status == "pull":
+            return f"{self.image}: needs pull"
+        if self.status == "host":
+            return f"{self.image}: not used (host toolchain)"
+        return f"{self.image}: unknown — {self.note}"
+
+
+@dataclass
+class Decision:
+    """Whether something runs: yes, no, or only known at runtime."""
+
+    runs: bool
+    reason: str = ""
+    runtime: bool = False  # depends on secrets, step outputs, ...
+
+    def describe(self) -> str:
+        if self.runtime:
+            return f"decided at runtime ({self.reason})"
+        return self.reason
+
+
+@dataclass
+class StepPlan:
+    """Planned handling of one step."""
+
+    index: int
+    name: str
+    kind: str  # run | equivalent | manual
+    detail: str
+    decision: Decision
+    estimate: Optional[float] = None
+    samples: int = 0
+
+
+@dataclass
+class JobPlan:
+    """Planned run of one job, for one matrix combination."""
+
+    job: Job
+    combination: dict
+    decision: Decision
+    steps: list[StepPlan] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        if not self.combination:
+            return self.job.name
+        values = ", ".join(f"{k}={to_string(v)}" for k, v in self.combination.items())
+        return f"{self.job.name} [{values}]"
+
+    @property
+    def estimate(self) -> Optional[float]:
+        """Sum of historical durations of the steps that will run, if all are known."""
+        running = [s for s in self.steps if s.decision.runs and s.kind != "manual"]
+        if any(s.estimate is None for s in running):
+            return None
+        return sum(s.estimate for s in running)
+
+    @property
+    def pauses(self) -> int:
+        """Action steps with no local equivalent, where a run will stop for the user."""
+        return sum(1 for s in self.steps if s.decision.runs and s.kind == "manual")
+
+
+@dataclass
+class Plan:
+    workflow: Workflow
+    images: list[ImagePlan]
+    jobs: list[JobPlan]
+
+
+def resolve_images(backend: Backend, images: list[str]) -> list[ImagePlan]:
+    """Check which images are already present, without pulling anything."""
+    if backend.name != "docker":
+        return [ImagePlan(image, "host") for image in images]
+    try:
+        client = backend.client
+    except RuntimeError:
+        return [ImagePlan(image, "unknown", note="Docker not reachable") for image in images]
+    plans = []
+    for image in images:
+        try:
+            plans.append(ImagePlan(image, "present", size=client.images.get(image).attrs.get("Size", 0)))
+        except ImageNotFound:
+            plans.append(ImagePlan(image, "pull"))
+    return plans
+
+
+def git_context(workdir: str) -> dict:
+    """The parts of the ``github`` context that can be read from a local checkout."""
+    def _git(*args: str) -> str:
+        try:
+            return subprocess.check_output(["git", *args], cwd=workdir, stderr=subprocess.DEVNULL).decode().strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return ""
+
+    ref = _git("symbolic-ref", "HEAD")
+    return {
+        "sha": _git("rev-parse", "HEAD"),
+        "ref": ref,
+        "ref_name": ref.rsplit("/", 1)[-1] if ref else "",
+        "ref_type": "branch" if ref else "",
+        "workspace": "/workspace",
+    }
+
+
+def decide(condition: str, context: dict) -> Decision:
+    """Evaluate an ``if:`` condition, assuming every earlier step succeeded."""
+    if not condition:
+        return Decision(True)
+    label = f"if: {condition}"
+    try:
+        expression = parse_expression(condition)
+    except ExpressionError as e:
+        return Decision(True, f"{label} — can't parse: {e}", runtime=True)
+    unknown = sorted(expression.contexts() & RUNTIME_CONTEXTS)
+    if unknown:
+        return Decision(True, f"{label} reads {', '.join(unknown)}", runtime=True)
+    try:
+        runs = evaluate_condition(condition, context)
+    except ExpressionError as e:
+        return Decision(True, f"{label} — {e}", runtime=True)
+    return Decision(runs, f"{label} → {str(runs).lower()}")
+
+
+def plan_step(index: int, step: Step, job: Job, context: dict, durations: dict) -> StepPlan:
+    decision = decide(step.condition, {**context, "env": {**job.env, **step.env}})
+    if not step.is_action:
+        kind, detail = "run", step.command.split("\n")[0]
+    else:
+        equiv = get_action_equivalent(step.action_ref, step.action_with)
+        if equiv is None:
+            kind, detail = "manual", f"{step.action_ref}: no local equivalent, pauses for S/I"
+        else:
+            kind, detail = "equivalent", f"{step.action_ref} → {equiv[0]}"
+    samples = durations.get((job.name, index, step.name), [])
+    return StepPlan(
+        index=index,
+        name=step.name,
+        kind=kind,
+        detail=detail,
+        decision=decision,
+        estimate=statistics.median(samples) if samples else None,
+        samples=len(samples),
+    )
+
+
+def plan_workflow(
+    workflow: Workflow,
+    backend: Backend,
+    workdir: str = ".",
+    durations: Optional[dict] = None,
+    job_name: str = "",
+) -> Plan:
+    """Plan every job (or just ``job_name``), one entry per matrix combination."""
+    durations = durations or {}
+    jobs = [j for j in workflow.jobs if not job_name or j.name == job_name]
+    if job_name and not jobs:
+        raise ValueError(f"Job '{job_name}' not found. Jobs: {', '.join(j.name for j in workflow.jobs)}")
+    github = {**git_context(workdir), "event_name": workflow.trigger.removeprefix("on: ").split(",")[0].strip()}
+    runner = {"os": "Linux", "arch": "X64", "temp": "/tmp", "name": "pipestep"}
+
+    plans = []
+    for job in jobs:
+        for combination in expand_matrix(job.matrix):
+            context = {"github": github, "runner": runner, "matrix": combination, "env": dict(job.env)}
+            job_plan = JobPlan(job=job, combination=combination, decision=decide(job.condition, context))
+            job_plan.steps = [plan_step(i, step, job, context, durations) for i, step in enumerate(job.steps)]
+            plans.append(job_plan)
+    scope = Workflow(workflow.name, workflow.trigger, jobs)
+    return Plan(workflow=workflow, images=resolve_images(backend, collect_images(scope)), jobs=plans)
+
+
+def format_plan(plan: Plan) -> list[str]:
+    """Human-readable plan."""
+    lines = [f"Workflow: {plan.workflow.name} ({plan.workflow.trigger})", "", "Images:"]
+    marks = {"present": "✓", "pull": "↓", "host": "-", "unknown": "?"}
+    lines += [f"  {marks[i.status]} {i.describe()}" for i in plan.images]
+    for job_plan in plan.jobs:
+        lines += ["", f"Job {job_plan.label} ({job_plan.job.docker_image})"]
+        if not job_plan.decision.runs:
+            lines.append(f"  skipped: {job_plan.decision.describe()}")
+            continue
+        if job_plan.decision.reason:
+            lines.append(f"  {job_plan.decision.describe()}")
+        for step in job_plan.steps:
+            if not step.decision.runs:
+                mark, note = "⊘", f"skip: {step.decision.describe()}"
+            else:
+                mark = {"run": "▸", "equivalent": "≈", "manual": "⏸"}[step.kind]
+                note = step.detail
+                if step.decision.reason:
+                    note += f"  [{step.decision.describe()}]"
+            timing = f"~{step.estimate:.1f}s ({step.samples} runs)" if step.estimate is not None else "no history"
+            lines.append(f"  {mark} {step.index + 1}. {step.name} — {note} — {timing}")
+        estimate = job_plan.estimate
+        total = f"~{estimate:.1f}s" if estimate is not None else "unknown (some steps have no history)"
+        pauses = f", {job_plan.pauses} manual pause(s)" if job_plan.pauses else ""
+        lines.append(f"  Estimated: {total}{pauses}")
+    pulls = [i.image for i in plan.images if i.status == "pull"]
+    if pulls:
+        lines += ["", f"{len(pulls)} image(s) to pull first; run `pipestep pull` to fetch them ahead of time."]
+    return lines
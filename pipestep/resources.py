@@ -0,0 +1,246 @@
+"""Resource limits for job containers, sized like GitHub-hosted runners.
+
+Without limits, concurrent sessions fight over the host and a single
+``make -j`` starves the rest. Each job container gets a CPU quota and
+cpuset, memory, pids and /dev/shm limits, and optionally a tmpfs at
+/tmp. They are layered, later winning:
+
+1. a runner size: by default the one ``runs-on`` names (``ubuntu-latest``
+   is a 4-CPU, 16 GB standard runner; ``*-8-cores`` a larger runner), or
+   one chosen with ``--runner-size`` (``public``, ``private``, ``<n>-core``
+   or ``none``);
+2. the job's ``container.options`` (``--cpus``, ``--cpuset-cpus``,
+   ``--memory``, ``--pids-limit``, ``--shm-size``, ``--tmpfs /tmp``);
+3. the same flags on the command line.
+
+The Docker backend applies every limit; the local backend can only pin
+steps to a cpuset (with ``taskset``).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shlex
+from dataclasses import asdict, dataclass, fields, replace
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from pipestep.models import Job
+
+# GitHub-hosted Linux runners: (CPUs, memory in GB)
+RUNNER_SIZES = {
+    "public": (4, 16),  # standard runner for public repositories
+    "private": (2, 7),  # standard runner for private repositories
+}
+# Larger runners have 4 GB of memory per core
+LARGER_RUNNER_GB_PER_CORE = 4
+
+_CORES_RE = re.compile(r"(\d+)[-_]?cores?\b", re.IGNORECASE)
+_SIZE_RE = re.compile(r"\d+(\.\d+)?[bkmg]?", re.IGNORECASE)
+_CPUSET_RE = re.compile(r"\d+(-\d+)?(,\d+(-\d+)?)*")
+
+# Docker flags understood in container.options and on the command line
+OPTION_FIELDS = {
+    "--cpus": "cpus",
+    "--cpuset-cpus": "cpuset",
+    "--memory": "memory",
+    "-m": "memory",
+    "--pids-limit": "pids",
+    "--shm-size": "shm_size",
+}
+
+
+@dataclass
+class Resources:
+    """Limits for one job container; zero or empty means unlimited."""
+
+    cpus: float = 0  # CPU quota, in cores
+    cpuset: str = ""  # cores the container may run on, e.g. "0-3,8"
+    memory: str = ""  # e.g. "16g"
+    pids: int = 0
+    shm_size: str = ""  # size of /dev/shm
+    tmp_size: str = ""  # size of a tmpfs mounted at /tmp; empty keeps the image's /tmp
+    size: str = ""  # the runner size these started from, e.g. "public" or "8-core"
+
+    @property
+    def limited(self) -> bool:
+        return any((self.cpus, self.cpuset, self.memory, self.pids, self.shm_size, self.tmp_size))
+
+    def describe(self) -> str:
+        """One line for logs and the step history, e.g. ``4 CPUs, 16g memory (public runner)``."""
+        if not self.limited:
+            return "unlimited"
+        parts = []
+        if self.cpus:
+            parts.append(f"{self.cpus:g} CPU{'s' if self.cpus != 1 else ''}")
+        if self.cpuset:
+            parts.append(f"cores {self.cpuset}")
+        if self.memory:
+            parts.append(f"{self.memory} memory")
+        if self.pids:
+            parts.append(f"{self.pids} pids")
+        if self.shm_size:
+            parts.append(f"{self.shm_size} shm")
+        if self.tmp_size:
+            parts.append(f"{self.tmp_size} tmpfs /tmp")
+        runner = f" ({self.size} runner)" if self.size else ""
+        return ", ".join(parts) + runner
+
+    def docker_options(self) -> dict:
+        """Keyword arguments for ``containers.run``."""
+        options: dict = {}
+        if self.cpus:
+            options["nano_cpus"] = int(self.cpus * 1e9)
+        if self.cpuset:
+            options["cpuset_cpus"] = self.cpuset
+        if self.memory:
+            options["mem_limit"] = self.memory
+        if self.pids:
+            options["pids_limit"] = self.pids
+        if self.shm_size:
+            options["shm_size"] = self.shm_size
+        if self.tmp_size:
+            options["tmpfs"] = {"/tmp": f"rw,exec,nosuid,size={self.tmp_size}"}
+        return options
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Resources:
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (data or {}).items() if k in known})
+
+
+def runner_size(label: str) -> Resources:
+    """The limits of a runner size or ``runs-on`` label; unlimited for ``none``, self-hosted and unknown labels."""
+    label = label.strip().lower()
+    if label in RUNNER_SIZES:
+        cpus, gb = RUNNER_SIZES[label]
+        return Resources(cpus=cpus, memory=f"{gb}g", shm_size=f"{gb // 2}g", size=label)
+    cores = _CORES_RE.search(label)
+    if cores and int(cores.group(1)) > 0 and (label[0].isdigit() or label.startswith("ubuntu")):
+        count = int(cores.group(1))
+        gb = count * LARGER_RUNNER_GB_PER_CORE
+        return Resources(cpus=count, memory=f"{gb}g", shm_size=f"{gb // 2}g", size=f"{count}-core")
+    if label.startswith("ubuntu"):
+        return runner_size("public")
+    return Resources()
+
+
+def convert(name: str, value: str):
+    """``value`` parsed for the field ``name``; raises ValueError if it's invalid."""
+    value = value.strip()
+    if name == "cpus":
+        try:
+            cpus = float(value)
+        except ValueError:
+            cpus = -1
+        if cpus < 0:
+            raise ValueError(f"CPU count must be a non-negative number, got '{value}'")
+        return cpus
+    if name == "pids":
+        if not value.lstrip("-").isdigit():
+            raise ValueError(f"pids limit must be a whole number, got '{value}'")
+        return max(0, int(value))  # Docker's -1 means unlimited
+    if name == "cpuset":
+        if value and not _CPUSET_RE.fullmatch(value):
+            raise ValueError(f"Invalid cpuset '{value}', expected e.g. 0-3,6")
+        return value
+    return parse_size(value)
+
+
+def parse_size(value: str) -> str:
+    """A Docker size such as ``512m`` or ``4g``, lowercased; raises ValueError if it isn't one."""
+    if value and not _SIZE_RE.fullmatch(value):
+        raise ValueError(f"Invalid size '{value}', expected e.g. 512m or 4g")
+    return value.lower()
+
+
+def parse_options(options: str) -> tuple[dict, list[str]]:
+    """Resource fields set by a ``container.options`` string, and the options that were ignored."""
+    values: dict = {}
+    ignored: list[str] = []
+    args = shlex.split(options)
+    i = 0
+    while i < len(args):
+        flag, eq, value = args[i].partition("=")
+        if flag in OPTION_FIELDS or flag == "--tmpfs":
+            if not eq:
+                i += 1
+                if i == len(args):
+                    raise ValueError(f"{flag} needs a value")
+                value = args[i]
+            if flag == "--tmpfs":
+                path, _, mount_options = value.partition(":")
+                if path.rstrip("/") != "/tmp":
+                    ignored.append(f"--tmpfs {value}")
+                else:
+                    size = next((o[5:] for o in mount_options.split(",") if o.startswith("size=")), "")
+                    # Docker's default tmpfs size is half the host's memory
+                    values["tmp_size"] = convert("tmp_size", size) if size else "50%"
+            else:
+                values[OPTION_FIELDS[flag]] = convert(OPTION_FIELDS[flag], value)
+        else:
+            ignored.append(args[i])
+        i += 1
+    return values, ignored
+
+
+def job_resources(job: Job, size: str = "auto", overrides: Optional[dict[str, str]] = None) -> Resources:
+    """The limits for ``job``: a runner size (``auto``: from ``runs-on``), then its container options, then ``overrides``.
+
+    ``overrides`` maps field names to unparsed values, e.g. from CLI flags.
+    """
+    resources = runner_size(job.runs_on if size == "auto" else size)
+    if size not in ("auto", "none") and not resources.limited:
+        raise ValueError(
+            f"Unknown runner size '{size}'. Choose from: auto, none, {', '.join(RUNNER_SIZES)}, <n>-core"
+        )
+    if job.container_options:
+        values, _ = parse_options(job.container_options)
+        resources = replace(resources, **values)
+    if overrides:
+        resources = replace(resources, **{name: convert(name, value) for name, value in overrides.items()})
+    return resources
+
+
+def parse_cpuset(cpuset: str) -> list[int]:
+    """The cores in a cpuset string such as ``0-3,6``."""
+    cores = []
+    for part in convert("cpuset", cpuset).split(",") if cpuset else []:
+        first, _, last = part.partition("-")
+        cores.extend(range(int(first), int(last or first) + 1))
+    return cores
+
+
+def format_cpuset(cores: list[int]) -> str:
+    """The shortest cpuset string for ``cores``, e.g. ``[0, 1, 2, 5]`` → ``0-2,5``."""
+    ranges: list[list[int]] = []
+    for core in sorted(set(cores)):
+        if ranges and core == ranges[-1][1] + 1:
+            ranges[-1][1] = core
+        else:
+            ranges.append([core, core])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def partition_cores(count: int, cores: Optional[list[int]] = None) -> list[str]:
+    """Split ``cores`` (default: those this process may use) into ``count`` cpusets.
+
+    Groups are contiguous and differ in size by at most one core; with more
+    groups than cores, cores are shared round-robin.
+    """
+    cores = sorted(cores if cores is not None else os.sched_getaffinity(0))
+    if count < 1 or not cores:
+        return []
+    if count >= len(cores):
+        return [str(cores[i % len(cores)]) for i in range(count)]
+    per, extra = divmod(len(cores), count)
+    groups, start = [], 0
+    for i in range(count):
+        end = start + per + (i < extra)
+        groups.append(format_cpuset(cores[start:end]))
+        start = end
+    return groups
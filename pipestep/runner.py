@@ -0,0 +1,87 @@
+"""Headless (non-interactive) execution of a job's steps."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from pipestep.actions import get_action_equivalent
+from pipestep.engine import PipelineEngine
+from pipestep.models import Step, StepResult
+
+
+@dataclass
+class StepRun:
+    """Outcome of one step in a headless run."""
+
+    index: int
+    name: str
+    command: str
+    exit_code: Optional[int]
+    duration: float = 0.0
+    output: str = ""
+    skipped: str = ""
+
+    @property
+    def output_hash(self) -> str:
+        return output_hash(self.output)
+
+    @property
+    def passed(self) -> bool:
+        return self.exit_code == 0
+
+
+def output_hash(output: str) -> str:
+    """Stable digest of a step's combined output."""
+    return hashlib.sha256(output.encode("utf-8", errors="replace")).hexdigest()
+
+
+def runnable_step(step: Step) -> Optional[Step]:
+    """The step to execute for ``step``: itself, its action equivalent, or None."""
+    if not step.is_action:
+        return step
+    equiv = get_action_equivalent(step.action_ref, step.action_with)
+    if equiv is None:
+        return None
+    return Step(
+        name=step.name, command=equiv[1], env=step.env, working_directory="/workspace",
+        timeout_minutes=step.timeout_minutes,
+    )
+
+
+def run_steps(
+    engine: PipelineEngine,
+    steps: list[Step],
+    stop_on_failure: bool = True,
+    on_step: Optional[Callable[[StepRun], None]] = None,
+) -> list[StepRun]:
+    """Run ``steps`` in order in an already set-up engine.
+
+    Action steps run their local equivalent, or are skipped if none is
+    known. With ``stop_on_failure``, steps after the first failure are not
+    run (like a CI job without ``continue-on-error``).
+    """
+    runs = []
+    for index, step in enumerate(steps):
+        target = runnable_step(step)
+        if target is None:
+            run = StepRun(index, step.name, "", None, skipped=f"no local equivalent for {step.action_ref}")
+        else:
+            start = time.monotonic()
+            try:
+                result = engine.run_step(target)
+            except Exception as e:
+                result = StepResult(exit_code=1, stdout="", stderr=str(e))
+            run = StepRun(
+                index, step.name, target.command, result.exit_code,
+                duration=time.monotonic() - start,
+                output=result.stdout + result.stderr,
+            )
+        runs.append(run)
+        if on_step is not None:
+            on_step(run)
+        if stop_on_failure and run.exit_code not in (0, None):
+            break
+    return runs
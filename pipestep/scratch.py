@@ -0,0 +1,111 @@
+"""RAM-backed scratch directories for RUNNER_TEMP, tool caches and build output.
+
+Heavy build steps write most of their bytes to a few directories: the
+temp dir, the tool cache, and build output such as ``build/``,
+``target/`` or ``node_modules/``. In a container those writes land in the
+overlay-backed writable layer (or a bind mount), which is slow on
+Docker Desktop. A scratch mount puts such a directory on a tmpfs instead,
+optionally with a size limit:
+
+    --scratch temp,tool-cache,build:4g,node_modules
+
+``temp`` is ``RUNNER_TEMP`` (/tmp), ``tool-cache`` is ``RUNNER_TOOL_CACHE``,
+an absolute path is used as-is, and anything else is a directory of the
+workspace.
+
+A tmpfs is gone when the container is removed. A persisted scratch mount
+also has a named volume, mounted under ``STORE_DIR``: it is copied into
+the tmpfs when the container starts and the tmpfs is copied back when
+the session cleans up, so the next session starts with a warm cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import asdict, dataclass
+
+from pipestep.resources import parse_size
+
+# Where persisted mounts' volumes are mounted in job containers
+STORE_DIR = "/.pipestep-scratch"
+
+TOOL_CACHE = "/opt/hostedtoolcache"
+
+# Named scratch directories: (path, env var that points at it)
+ALIASES = {
+    "temp": ("/tmp", "RUNNER_TEMP"),
+    "tool-cache": (TOOL_CACHE, "RUNNER_TOOL_CACHE"),
+}
+
+
+@dataclass
+class ScratchMount:
+    """A tmpfs at ``path`` in the job container."""
+
+    path: str
+    size: str = ""  # e.g. "4g"; empty for the backend's default (half the memory for Docker)
+    env: str = ""  # variable set to ``path`` in the job's environment, if any
+    volume: str = ""  # named volume it is restored from and saved to, if persisted
+
+    @property
+    def store(self) -> str:
+        """Where the volume is mounted in the container."""
+        return f"{STORE_DIR}/{self.volume}"
+
+    @property
+    def in_workspace(self) -> bool:
+        return self.path == "/workspace" or self.path.startswith("/workspace/")
+
+    def tmpfs_options(self) -> str:
+        """Mount options for Docker's ``tmpfs``."""
+        return f"rw,exec,size={self.size}" if self.size else "rw,exec"
+
+    def describe(self) -> str:
+        size = f" ({self.size})" if self.size else ""
+        kept = f", kept in volume {self.volume}" if self.volume else ""
+        return f"{self.path}{size}{kept}"
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ScratchMount:
+        return cls(**data)
+
+
+def parse_scratch(spec: str, size: str = "") -> list[ScratchMount]:
+    """Mounts for a comma-separated ``name[:size]`` list; ``size`` is the default size.
+
+    Raises ValueError for an invalid size or a path outside the workspace
+    given relative with ``..``.
+    """
+    mounts: dict[str, ScratchMount] = {}
+    for entry in spec.split(","):
+        name, _, entry_size = entry.strip().partition(":")
+        name = name.strip()
+        if not name:
+            continue
+        env = ""
+        if name in ALIASES:
+            path, env = ALIASES[name]
+        elif name.startswith("/"):
+            path = name.rstrip("/") or "/"
+        else:
+            parts = [p for p in name.strip("/").split("/") if p not in ("", ".")]
+            if not parts or ".." in parts:
+                raise ValueError(f"Scratch directory '{name}' must be a directory inside the workspace")
+            path = "/workspace/" + "/".join(parts)
+        if path in ("/", "/workspace") or path.startswith(STORE_DIR):
+            raise ValueError(f"Can't put {path} on a scratch tmpfs")
+        mounts[path] = ScratchMount(path, parse_size(entry_size.strip() or size), env)
+    return list(mounts.values())
+
+
+def persist_to_volumes(mounts: list[ScratchMount], job_name: str, workdir: str) -> None:
+    """Give each mount a named volume, the same for every session of this job in this directory."""
+    key = hashlib.sha256(f"{workdir}\0{job_name}".encode()).hexdigest()[:10]
+    job = re.sub(r"[^a-zA-Z0-9_.-]", "-", job_name)
+    for mount in mounts:
+        slug = re.sub(r"[^a-zA-Z0-9_.-]", "-", mount.path.strip("/"))
+        mount.volume = f"pipestep-scratch-{job}-{key}-{slug}"
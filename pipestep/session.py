@@ -0,0 +1,294 @@
+"""Structured session recordings and headless replay.
+
+A session file is JSON lines: a ``session`` header, then one record per
+executed step (``step``) or other user action (``event``), in order.
+Step records carry everything needed to re-execute the step — command,
+env, working directory, image — plus the recorded timing, exit code and
+a hash of the output for comparison. The header records the container's
+resource limits, and replays run under the same ones.
+"""
+
+from __future__ import annotations
+
+import difflib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from pipestep import __version__
+from pipestep.backends import Backend, DockerBackend
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step
+from pipestep.resources import Resources
+from pipestep.runner import StepRun, output_hash, run_steps
+
+FORMAT_VERSION = 1
+
+# Trailing output lines kept in each step record, for diffs on replay
+OUTPUT_TAIL_LINES = 50
+
+
+class SessionRecorder:
+    """Collects session records as the user steps through a job."""
+
+    def __init__(
+        self, workflow_name: str, job: Job, workdir: str = "", workflow_path: str = "",
+        resources: Optional[Resources] = None,
+    ) -> None:
+        self.job = job
+        self.header = {
+            "type": "session",
+            "version": FORMAT_VERSION,
+            "pipestep": __version__,
+            "workflow": workflow_name,
+            "workflow_path": workflow_path,
+            "job": job.name,
+            "image": job.docker_image,
+            "workdir": workdir,
+            "resources": (resources or Resources()).to_dict(),
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        self.records: list[dict] = []
+
+    def record_step(
+        self,
+        index: int,
+        step: Step,
+        action: str,
+        started: float,
+        duration: float,
+        exit_code: int,
+        output: str,
+    ) -> None:
+        """Record an executed step (``step`` is what actually ran, e.g. an action equivalent)."""
+        self.records.append({
+            "type": "step",
+            "index": index,
+            "step": self.job.steps[index].name if 0 <= index < len(self.job.steps) else step.name,
+            "action": action,
+            "command": step.command,
+            "env": {**self.job.env, **step.env},
+            "cwd": step.working_directory,
+            "shell": step.shell,
+            "image": self.job.docker_image,
+            "started": round(started, 3),
+            "duration": round(duration, 3),
+            "exit_code": exit_code,
+            "output_sha256": output_hash(output),
+            "output_tail": output.splitlines()[-OUTPUT_TAIL_LINES:],
+        })
+
+    def record_event(self, action: str, step_name: str) -> None:
+        """Record a non-executing action such as a skip or a shell session."""
+        self.records.append({
+            "type": "event",
+            "action": action,
+            "step": step_name,
+            "time": round(time.time(), 3),
+        })
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            for record in [self.header, *self.records]:
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+@dataclass
+class Session:
+    """A loaded session recording."""
+
+    path: str
+    header: dict
+    records: list[dict] = field(default_factory=list)
+
+    @property
+    def steps(self) -> list[dict]:
+        return [r for r in self.records if r.get("type") == "step"]
+
+    def to_job(self) -> Job:
+        """A job whose steps re-execute the recorded commands, in recorded order."""
+        steps = [
+            Step(
+                name=r["step"],
+                command=r["command"],
+                env=dict(r.get("env", {})),
+                working_directory=r.get("cwd") or "/workspace",
+                shell=r.get("shell", ""),
+            )
+            for r in self.steps
+        ]
+        return Job(
+            name=self.header.get("job", "replay"),
+            runs_on="replay",
+            docker_image=self.header.get("image", "ubuntu:22.04"),
+            steps=steps,
+        )
+
+
+def load_session(path: str) -> Session:
+    """Read a JSON-lines session recording."""
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("type") != "session":
+        raise ValueError(f"Not a pipestep session recording: {path}")
+    if lines[0].get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Session {path} uses format version {lines[0]['version']}; upgrade pipestep to replay it")
+    return Session(path=path, header=lines[0], records=lines[1:])
+
+
+def historical_durations(paths: list[str]) -> dict[tuple[str, int, str], list[float]]:
+    """Recorded durations of passing steps, keyed by (job, step index, step name).
+
+    Unreadable or foreign files are ignored, so a glob can be passed as is.
+    """
+    durations: dict[tuple[str, int, str], list[float]] = {}
+    for path in paths:
+        try:
+            session = load_session(path)
+        except (OSError, ValueError):
+            continue
+        job = session.header.get("job", "")
+        for record in session.steps:
+            if record.get("exit_code") == 0:
+                durations.setdefault((job, record.get("index", -1), record["step"]), []).append(record["duration"])
+    return durations
+
+
+@dataclass
+class StepOutcome:
+    """Replayed result of one recorded step, compared with the recording."""
+
+    record: dict
+    runs: list[StepRun] = field(default_factory=list)
+
+    @property
+    def exit_codes(self) -> list[Optional[int]]:
+        return [r.exit_code for r in self.runs]
+
+    @property
+    def exit_matches(self) -> bool:
+        return all(code == self.record["exit_code"] for code in self.exit_codes)
+
+    @property
+    def output_matches(self) -> bool:
+        return all(r.output_hash == self.record["output_sha256"] for r in self.runs)
+
+    @property
+    def nondeterministic(self) -> bool:
+        """Runs disagreed with each other (not just with the recording)."""
+        return len({(r.exit_code, r.output_hash) for r in self.runs}) > 1
+
+    def output_diff(self, limit: int = 20) -> list[str]:
+        """Unified diff of the recorded output tail against the first mismatching run."""
+        for run in self.runs:
+            if run.output_hash != self.record["output_sha256"]:
+                actual = run.output.splitlines()[-OUTPUT_TAIL_LINES:]
+                diff = difflib.unified_diff(
+                    self.record.get("output_tail", []), actual, "recorded", "replayed", lineterm="",
+                )
+                return list(diff)[:limit]
+        return []
+
+
+@dataclass
+class ReplayReport:
+    """Comparison of a session's replays with its recording."""
+
+    session: Session
+    outcomes: list[StepOutcome] = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and all(o.exit_matches and o.output_matches for o in self.outcomes)
+
+
+def replay_session(
+    session: Session,
+    workdir: str,
+    backend: Optional[Backend] = None,
+    mount_mode: str = "snapshot",
+    repeat: int = 1,
+) -> ReplayReport:
+    """Re-execute a session's steps headlessly, ``repeat`` times, in fresh containers.
+
+    Every recorded step is run even if an earlier one fails, so each
+    outcome can be compared with the recording. The workspace defaults to
+    a snapshot so replays never modify ``workdir``. Containers get the
+    resource limits the session was recorded with, except its cpuset:
+    which cores were free then says nothing about this host.
+    """
+    job = session.to_job()
+    resources = replace(Resources.from_dict(session.header.get("resources")), cpuset="")
+    report = ReplayReport(session=session, outcomes=[StepOutcome(record=r) for r in session.steps])
+    for _ in range(repeat):
+        engine = PipelineEngine(
+            job=job, workdir=workdir, backend=backend or DockerBackend(), mount_mode=mount_mode,
+            resources=resources,
+        )
+        # Replays may run in parallel within one process; keep container names unique
+        engine._container_name += f"-replay-{id(engine):x}"
+        try:
+            engine.setup()
+            runs = run_steps(engine, job.steps, stop_on_failure=False)
+        except Exception as e:
+            report.error = str(e)
+            return report
+        finally:
+            engine.cleanup()
+        for outcome, run in zip(report.outcomes, runs):
+            outcome.runs.append(run)
+    return report
+
+
+def replay_sessions(
+    paths: list[str],
+    workdir: str = "",
+    backend_factory=DockerBackend,
+    mount_mode: str = "snapshot",
+    repeat: int = 1,
+    parallel: int = 4,
+) -> list[ReplayReport]:
+    """Replay several sessions concurrently, one engine per replay.
+
+    Without ``workdir``, each session replays against the directory it was
+    recorded in.
+    """
+    def _replay(path: str) -> ReplayReport:
+        session = load_session(path)
+        source = workdir or session.header.get("workdir") or "."
+        return replay_session(session, source, backend_factory(), mount_mode, repeat)
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        return list(pool.map(_replay, paths))
+
+
+def format_report(report: ReplayReport) -> list[str]:
+    """Human-readable lines describing a replay report."""
+    header = report.session.header
+    lines = [f"{os.path.basename(report.session.path)} — {header.get('workflow')} / {header.get('job')} ({header.get('image')})"]
+    if report.error:
+        lines.append(f"  ✗ replay failed: {report.error}")
+        return lines
+    for outcome in report.outcomes:
+        record = outcome.record
+        name = f"{record['index'] + 1}. {record['step']}"
+        codes = sorted({str(c) for c in outcome.exit_codes})
+        if outcome.nondeterministic:
+            distinct = len({r.output_hash for r in outcome.runs})
+            lines.append(
+                f"  ~ {name}: nondeterministic — exit codes {', '.join(codes)}, "
+                f"{distinct} distinct outputs across {len(outcome.runs)} runs"
+            )
+        elif outcome.exit_matches and outcome.output_matches:
+            lines.append(f"  ✓ {name}: exit {record['exit_code']}, output identical")
+        elif outcome.exit_matches:
+            lines.append(f"  ≠ {name}: exit {record['exit_code']}, output differs")
+        else:
+            lines.append(f"  ✗ {name}: exit {', '.join(codes)} (recorded {record['exit_code']})")
+        if not outcome.output_matches:
+            lines.extend(f"      {line}" for line in outcome.output_diff())
+    return lines
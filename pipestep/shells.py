@@ -0,0 +1,194 @@
+"""The ``shell:`` of run steps: built-in shells, custom templates, and a warm Python interpreter.
+
+A step without a shell runs its script with ``bash -e -o pipefail -c``.
+With one, the script is written to a file in the container and run the
+way GitHub's runner does it:
+
+    bash     bash --noprofile --norc -eo pipefail {0}
+    sh       sh -e {0}
+    python   python {0}
+    pwsh     pwsh -command ". '{0}'"
+
+Any other value is a custom template, which must contain ``{0}`` where the
+script file goes, e.g. ``perl {0}`` or ``python -u {0}``. ``cmd`` and
+``powershell`` only exist on Windows runners.
+
+Many short ``shell: python`` steps spend much of their time starting the
+interpreter. With the warm interpreter (``pipestep run --warm-python``) a
+Python process started once per container forks a child for each step,
+which takes on the step's environment and working directory and runs the
+script with ``runpy``. The interpreter and its import-time settings
+(``python`` on the job's PATH, ``PYTHONHOME``) are those of the first
+Python step; steps that change them should not use it.
+"""
+
+from __future__ import annotations
+
+import shlex
+
+TEMPLATES = {
+    "bash": "bash --noprofile --norc -eo pipefail {0}",
+    "sh": "sh -e {0}",
+    "python": "python {0}",
+    "pwsh": "pwsh -command \". '{0}'\"",
+}
+
+WINDOWS_SHELLS = ("cmd", "powershell")
+
+# Script file extensions, by the program a template runs
+_SUFFIXES = {"python": ".py", "python3": ".py", "pwsh": ".ps1", "bash": ".sh", "sh": ".sh"}
+
+
+def check_shell(shell: str) -> None:
+    """Raise ValueError if ``shell`` can't run on a Linux runner."""
+    if shell in WINDOWS_SHELLS:
+        raise ValueError(f"shell '{shell}' is only available on Windows runners")
+    if shell not in TEMPLATES and "{0}" not in shell:
+        raise ValueError(
+            f"Unknown shell '{shell}'. Use one of {', '.join(TEMPLATES)}, or a command with {{0}} for the script file"
+        )
+
+
+def shell_argv(shell: str, file: str) -> list[str]:
+    """The command that runs the script in ``file`` with ``shell``; raises ValueError if it can't."""
+    check_shell(shell)
+    return [arg.replace("{0}", file) for arg in shlex.split(TEMPLATES.get(shell, shell))]
+
+
+def script_suffix(shell: str) -> str:
+    """The extension for the script file, e.g. ``.py`` for ``python -u {0}``; some interpreters need one."""
+    words = shlex.split(TEMPLATES.get(shell, shell))
+    return _SUFFIXES.get(words[0].rsplit("/", 1)[-1], "") if words else ""
+
+
+def program(shell: str) -> str:
+    """The program ``shell`` runs, for messages, e.g. ``pwsh``."""
+    words = shlex.split(TEMPLATES.get(shell, shell))
+    return words[0] if words else shell
+
+
+# The warm interpreter's server, started with its directory as argv[1]. It
+# reads "client pid, script, request dir" lines from the control FIFO and
+# forks a supervisor per request, which forks the step's process (in its own
+# process group) and reports its exit status; it kills the step if the client
+# goes away, which is how timeouts and cancels reach it.
+WARM_SERVER = r'''
+import os, runpy, signal, sys, time, traceback
+
+base = sys.argv[1]
+try:
+    os.setsid()  # keep out of the terminal's process group (local backend)
+except OSError:
+    pass
+signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # supervisors are reaped automatically
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def run(script, req):
+    os.setpgid(0, 0)
+    # The output FIFOs first, so the client's readers always see them closed
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    os.dup2(os.open(os.path.join(req, "out"), os.O_WRONLY), 1)
+    os.dup2(os.open(os.path.join(req, "err"), os.O_WRONLY), 2)
+    code = 0
+    try:
+        with open(os.path.join(req, "env"), "rb") as f:
+            env = dict(e.split(b"=", 1) for e in f.read().split(b"\0") if b"=" in e)
+        os.environ.clear()
+        os.environb.update(env)
+        with open(os.path.join(req, "cwd")) as f:
+            os.chdir(f.read().rstrip("\n"))
+        paths = [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+        sys.path[:] = [os.path.dirname(os.path.abspath(script)), *paths, *sys.path[1:]]
+        sys.argv = [script]
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    os._exit(code & 0xFF)
+
+
+def supervise(client, script, req):
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    child = os.fork()
+    if child == 0:
+        run(script, req)
+    try:
+        os.setpgid(child, child)  # as the child does, so killpg works at once
+    except OSError:
+        pass
+    while True:
+        pid, status = os.waitpid(child, os.WNOHANG)
+        if pid:
+            break
+        if not alive(client):
+            try:
+                os.killpg(child, signal.SIGKILL)
+            except OSError:
+                pass
+            os._exit(0)
+        time.sleep(0.01)
+    code = os.waitstatus_to_exitcode(status)
+    code = 128 - code if code < 0 else code
+    while alive(client):
+        try:
+            fd = os.open(os.path.join(req, "status"), os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            time.sleep(0.01)  # the client hasn't opened it yet
+            continue
+        os.write(fd, b"%d\n" % code)
+        os.close(fd)
+        break
+    os._exit(0)
+
+
+control = os.fdopen(os.open(os.path.join(base, "control"), os.O_RDWR), "r")
+open(os.path.join(base, "ready"), "w").close()
+for line in control:
+    client, script, req = line.rstrip("\n").split("\t")
+    if os.fork() == 0:
+        control.close()
+        try:
+            supervise(int(client), script, req)
+        finally:
+            os._exit(1)
+'''
+
+# The warm interpreter's client, run as ``sh client <server dir> <script>``
+# in place of ``python <script>``. Falls back to a cold interpreter if the
+# server isn't running.
+WARM_CLIENT = r'''
+base=$1 script=$2
+pid=$(cat "$base/pid" 2>/dev/null)
+if [ -z "$pid" ] || ! kill -0 "$pid" 2>/dev/null; then exec python "$script"; fi
+req=$(mktemp -d "$base/req.XXXXXX") || exit 1
+trap 'rm -rf "$req"' EXIT
+env -0 > "$req/env" && pwd > "$req/cwd" && mkfifo "$req/out" "$req/err" "$req/status" || exit 1
+printf '%s\t%s\t%s\n' "$$" "$script" "$req" > "$base/control"
+cat "$req/out" & cat "$req/err" >&2 &
+read code < "$req/status"
+wait
+exit "${code:-1}"
+'''
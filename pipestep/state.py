@@ -0,0 +1,214 @@
+"""Detached sessions: state saved so a TUI can leave its container running and reattach later.
+
+``pipestep run --detach`` (or D in the TUI) leaves the job container and
+workspace in place and writes a state file describing them — workflow,
+job, backend, container id, step statuses and breakpoints, and the
+session recording so far. ``pipestep attach <id>`` reads it back, finds
+the container and resumes the TUI where it was left. The state file is
+removed when the attached session quits and cleans up.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from pipestep.backends import OWNER_LABEL, is_orphan
+from pipestep.models import Job, StepStatus
+
+if TYPE_CHECKING:
+    from pipestep.engine import PipelineEngine
+
+STATE_VERSION = 1
+
+
+def default_dir() -> str:
+    """``$PIPESTEP_STATE_DIR``, else ``$XDG_STATE_HOME/pipestep/sessions``."""
+    if os.environ.get("PIPESTEP_STATE_DIR"):
+        return os.environ["PIPESTEP_STATE_DIR"]
+    state_home = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(state_home, "pipestep", "sessions")
+
+
+def this_process() -> str:
+    """``host:pid`` of this process, as in resource owner labels."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class SessionState:
+    """Everything needed to reattach to a detached session."""
+
+    workflow_path: str
+    job: str
+    workdir: str
+    backend: str
+    container_id: str
+    owner: str  # owner label of the container's resources, see backends.owner_labels
+    mount_mode: str = "rw"
+    docker_host: str = ""
+    workspace: dict = field(default_factory=dict)  # source, path, mode, method
+    environment: dict = field(default_factory=dict)
+    current_step: int = 0
+    steps: list[dict] = field(default_factory=list)  # name, status, breakpoint, exit_code, duration
+    session: list[dict] = field(default_factory=list)  # SessionRecorder records
+    conditions: list[dict] = field(default_factory=list)  # conditional breakpoints, see pipestep.breakpoints
+    elapsed: float = 0.0  # step run time counted against the job's timeout-minutes
+    resources: dict = field(default_factory=dict)  # the container's limits, see pipestep.resources
+    scratch: list[dict] = field(default_factory=list)  # RAM-backed directories, see pipestep.scratch
+    warm_python: bool = False  # run `shell: python` steps in a warm interpreter, see pipestep.shells
+    attached: str = ""  # host:pid of the process attached to it, if any
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    created: float = field(default_factory=time.time)
+    version: int = STATE_VERSION
+
+    @property
+    def in_use(self) -> bool:
+        """True if another live process is attached."""
+        if not self.attached or self.attached == this_process():
+            return False
+        return not is_orphan({OWNER_LABEL: self.attached})
+
+    def describe(self) -> str:
+        done = sum(1 for s in self.steps if s["status"] in ("completed", "skipped"))
+        since = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.created))
+        attached = ", attached" if self.in_use else ""
+        return (
+            f"{self.id}  {self.job} ({os.path.basename(self.workflow_path)}), "
+            f"{done}/{len(self.steps)} steps done, {self.backend}, since {since}{attached}"
+        )
+
+    def save(self, directory: str = "") -> str:
+        """Write the state file atomically and return its path."""
+        directory = directory or default_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.id}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(asdict(self), f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+        return path
+
+    def remove(self, directory: str = "") -> None:
+        try:
+            os.unlink(os.path.join(directory or default_dir(), f"{self.id}.json"))
+        except FileNotFoundError:
+            pass
+
+
+def engine_state(
+    engine: PipelineEngine,
+    workflow_path: str,
+    current_step: int = 0,
+    durations: Optional[dict[int, float]] = None,
+    session: Optional[list[dict]] = None,
+    conditions: Optional[list[dict]] = None,
+    previous: Optional[SessionState] = None,
+) -> SessionState:
+    """The state of a set-up engine, to save before ``engine.detach()``; keeps ``previous``'s id."""
+    if engine.container is None or engine.workspace is None:
+        raise RuntimeError("Engine not set up. Call setup() first.")
+    ws = engine.workspace
+    state = SessionState(
+        workflow_path=workflow_path,
+        job=engine.job.name,
+        workdir=engine.workdir,
+        backend=engine.backend.name,
+        container_id=engine.container_id,
+        owner=engine.owner,
+        mount_mode=engine.mount_mode,
+        docker_host=getattr(engine.backend, "base_url", ""),
+        workspace={"source": ws.source, "path": ws.path, "mode": ws.mode, "method": ws.method},
+        environment=dict(engine.environment),
+        current_step=current_step,
+        steps=capture_steps(engine.job, durations or {}),
+        session=list(session or []),
+        conditions=list(conditions or []),
+        elapsed=engine.elapsed,
+        resources=engine.resources.to_dict(),
+        scratch=[m.to_dict() for m in engine.scratch],
+        warm_python=engine.warm_python,
+    )
+    if previous is not None:
+        state.id = previous.id
+        state.created = previous.created
+    return state
+
+
+def load_state(path: str) -> SessionState:
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != STATE_VERSION:
+        raise ValueError(f"{path}: unsupported session state version {data.get('version')}")
+    return SessionState(**data)
+
+
+def list_states(directory: str = "") -> list[SessionState]:
+    """Every readable state file, oldest first."""
+    directory = directory or default_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    states = []
+    for name in names:
+        if name.endswith(".json"):
+            try:
+                states.append(load_state(os.path.join(directory, name)))
+            except (OSError, ValueError, TypeError):
+                pass
+    return sorted(states, key=lambda s: s.created)
+
+
+def find_state(ref: str, directory: str = "") -> SessionState:
+    """The detached session whose id starts with ``ref``."""
+    states = list_states(directory)
+    matches = [s for s in states if s.id.startswith(ref)]
+    if not matches:
+        known = ", ".join(s.id for s in states) or "none"
+        raise ValueError(f"No detached session '{ref}'. Detached sessions: {known}")
+    if len(matches) > 1:
+        raise ValueError(f"Session id '{ref}' is ambiguous: {', '.join(s.id for s in matches)}")
+    return matches[0]
+
+
+def detached_owners(directory: str = "") -> set[str]:
+    """Owners whose resources belong to a detached session, so ``pipestep gc`` keeps them."""
+    return {s.owner for s in list_states(directory)}
+
+
+def capture_steps(job: Job, durations: dict[int, float]) -> list[dict]:
+    """Step statuses, breakpoints and timings of ``job``, for a state file."""
+    return [
+        {
+            "name": step.name,
+            "status": step.status.value,
+            "breakpoint": step.breakpoint,
+            "exit_code": step.exit_code,
+            "duration": durations.get(index),
+        }
+        for index, step in enumerate(job.steps)
+    ]
+
+
+def restore_steps(job: Job, steps: list[dict]) -> dict[int, float]:
+    """Apply saved statuses and breakpoints to ``job``; return the saved durations by index.
+
+    Steps are matched by position and name, so an edited workflow restores
+    whatever still lines up.
+    """
+    durations = {}
+    for index, (step, saved) in enumerate(zip(job.steps, steps)):
+        if step.name != saved.get("name"):
+            break
+        step.status = StepStatus(saved["status"])
+        step.breakpoint = saved.get("breakpoint", False)
+        step.exit_code = saved.get("exit_code")
+        if saved.get("duration") is not None:
+            durations[index] = saved["duration"]
+    return durations
@@ -0,0 +1,144 @@
+"""Flaky-step detection: run one step many times from the same starting state.
+
+The job container is committed just before the step, then each run gets a
+fresh fork of it (with its own copy of the workspace), so every run starts
+from exactly the state the step would see in the real pipeline.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from pipestep.engine import PipelineEngine
+from pipestep.models import Step, StepResult
+from pipestep.runner import StepRun
+
+DEFAULT_RUNS = 10
+
+
+@dataclass
+class StressReport:
+    """Outcome of running one step repeatedly in parallel forks."""
+
+    step_name: str
+    runs: list[StepRun] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def passed(self) -> int:
+        return sum(1 for r in self.runs if r.passed)
+
+    @property
+    def pass_rate(self) -> float:
+        return self.passed / len(self.runs) if self.runs else 0.0
+
+    @property
+    def exit_codes(self) -> Counter:
+        return Counter(r.exit_code for r in self.runs)
+
+    @property
+    def flaky(self) -> bool:
+        return len(self.exit_codes) > 1
+
+    def durations(self) -> dict[str, float]:
+        """min / median / p90 / max of run durations, in seconds."""
+        values = sorted(r.duration for r in self.runs)
+        if not values:
+            return {}
+        return {
+            "min": values[0],
+            "median": statistics.median(values),
+            "p90": values[min(len(values) - 1, int(len(values) * 0.9))],
+            "max": values[-1],
+        }
+
+    def divergent_lines(self, limit: int = 10) -> list[tuple[str, int, int]]:
+        """Output lines that don't appear in every run, as (line, runs with it, total runs).
+
+        When some runs passed and some failed, only lines that separate the
+        two groups are returned — the ones most likely to explain the flake.
+        """
+        line_sets = [set(r.output.splitlines()) for r in self.runs]
+        counts = Counter(line for lines in line_sets for line in lines)
+        passing = [lines for r, lines in zip(self.runs, line_sets) if r.passed]
+        failing = [lines for r, lines in zip(self.runs, line_sets) if not r.passed]
+        if passing and failing:
+            only_failing = set().union(*failing) - set().union(*passing)
+            only_passing = set().union(*passing) - set().union(*failing)
+            candidates = only_failing | only_passing
+        else:
+            candidates = {line for line, n in counts.items() if n < len(self.runs)}
+        ranked = sorted(candidates, key=lambda line: (-counts[line], line))
+        return [(line, counts[line], len(self.runs)) for line in ranked[:limit]]
+
+    def summary_lines(self) -> list[str]:
+        """Human-readable summary for the log."""
+        total = len(self.runs)
+        lines = [f"{self.passed}/{total} runs passed ({self.pass_rate:.0%}) in {self.elapsed:.1f}s"]
+        codes = ", ".join(f"exit {code}: {n}" for code, n in sorted(self.exit_codes.items(), key=lambda kv: -kv[1]))
+        lines.append(f"Exit codes: {codes}")
+        d = self.durations()
+        if d:
+            lines.append(
+                f"Duration: min {d['min']:.2f}s, median {d['median']:.2f}s, "
+                f"p90 {d['p90']:.2f}s, max {d['max']:.2f}s"
+            )
+        divergent = self.divergent_lines()
+        if divergent:
+            lines.append("Divergent output:")
+            lines.extend(f"  [{n}/{of}] {line}" for line, n, of in divergent)
+        return lines
+
+
+def stress_step(
+    engine: PipelineEngine,
+    step: Step,
+    runs: int = DEFAULT_RUNS,
+    parallel: Optional[int] = None,
+    on_run: Optional[Callable[[StepRun], None]] = None,
+) -> StressReport:
+    """Run ``step`` ``runs`` times, each in a fresh fork of ``engine``'s current container.
+
+    ``engine`` itself is left untouched. ``parallel`` bounds how many forks
+    run at once (default: one per CPU, at most ``runs``).
+    """
+    if runs < 1:
+        raise ValueError("runs must be at least 1")
+    workers = max(1, min(runs, parallel or os.cpu_count() or 4))
+    start = time.monotonic()
+    image = engine.commit()
+
+    def _run(index: int) -> StepRun:
+        fork = None
+        duration = 0.0
+        try:
+            fork = engine.fork(image, f"stress-{index}")
+            began = time.monotonic()
+            result = fork.run_step(step)
+            duration = time.monotonic() - began
+        except Exception as e:
+            result = StepResult(exit_code=1, stdout="", stderr=str(e))
+        finally:
+            if fork is not None:
+                fork.cleanup()
+        run = StepRun(
+            index, step.name, step.command, result.exit_code,
+            duration=duration,
+            output=result.stdout + result.stderr,
+        )
+        if on_run is not None:
+            on_run(run)
+        return run
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, range(runs)))
+    finally:
+        engine.backend.remove_image(image)
+    return StressReport(step_name=step.name, runs=results, elapsed=time.monotonic() - start)
@@ -0,0 +1,71 @@
+"""Concurrent, deadline-bounded teardown, and reaping of orphaned resources.
+
+Every container, image, volume and network pipestep creates carries
+labels naming its kind and owning process (see
+``pipestep.backends.owner_labels``). Teardown runs removals in parallel
+and gives up waiting after a deadline, so quitting never hangs on a slow
+daemon. ``collect_garbage`` finds resources whose owning process on this
+host is gone — left behind by a crash or ``kill -9`` — and removes them,
+except those of detached sessions (see :mod:`pipestep.state`).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Collection
+
+from pipestep.backends import OWNER_LABEL, Backend, Resource, is_orphan
+
+# Seconds to wait for teardown before leaving the rest to `pipestep gc`
+DEADLINE = 5.0
+
+
+def run_concurrently(tasks: list[Callable[[], None]], deadline: float = DEADLINE) -> int:
+    """Run ``tasks`` in parallel daemon threads; return how many hadn't finished by ``deadline``.
+
+    Errors are ignored: teardown is best-effort. Unfinished tasks keep
+    running in the background but never block interpreter exit.
+    """
+    threads = []
+    for task in tasks:
+        thread = threading.Thread(target=_quietly, args=(task,), daemon=True, name="pipestep-teardown")
+        thread.start()
+        threads.append(thread)
+    end = time.monotonic() + deadline
+    for thread in threads:
+        thread.join(max(0.0, end - time.monotonic()))
+    return sum(1 for t in threads if t.is_alive())
+
+
+def _quietly(task: Callable[[], None]) -> None:
+    try:
+        task()
+    except Exception:
+        pass
+
+
+def collect_garbage(
+    backend: Backend,
+    everything: bool = False,
+    dry_run: bool = False,
+    deadline: float = 30.0,
+    keep_owners: Collection[str] = (),
+) -> list[Resource]:
+    """Remove orphaned resources (all labelled ones with ``everything``) and return them.
+
+    Shared caches such as runtime volumes belong to no process, so they are
+    only removed with ``everything``. Resources of ``keep_owners`` — those
+    of detached sessions — are kept unless ``everything`` is set.
+    """
+    resources = [
+        r for r in backend.list_resources()
+        if everything or (is_orphan(r.labels) and r.labels.get(OWNER_LABEL) not in keep_owners)
+    ]
+    # Containers first: images and volumes can't go while a container uses them
+    order = {"container": 0, "network": 1, "image": 2, "volume": 2}
+    if not dry_run:
+        for rank in sorted(set(order.values())):
+            batch = [r for r in resources if order.get(r.kind, 2) == rank]
+            run_concurrently([lambda r=r: backend.remove_resource(r) for r in batch], deadline)
+    return resources
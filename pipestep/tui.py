@@ -3,65 +3,241 @@
 from __future__ import annotations
 
 import atexit
-import subprocess
+import os
+import tempfile
+import time
+from functools import partial
+from itertools import islice
+from typing import Callable
 from textual.app import App, ComposeResult
+from textual.binding import Binding
 from textual.containers import Horizontal, Vertical
-from textual.widgets import Header, Footer, Static, RichLog, ListView, ListItem, Label
+from textual.geometry import Region, Size
+from textual.message import Message
+from textual.screen import ModalScreen
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import Header, Footer, Static, RichLog, Label, Input, Checkbox
 from textual.css.query import NoMatches
 from textual.reactive import reactive
-from textual import work
+from textual import events, work
 from rich.text import Text
 
 from pipestep.models import Step, Job, Workflow, StepStatus, StepResult
-from pipestep.engine import PipelineEngine
+from pipestep.backends import Backend
+from pipestep.breakpoints import (
+    ConditionalBreakpoint, Condition, FileCondition, StepEvent, check_breakpoints, parse_condition,
+)
+from pipestep.engine import CANCELLED_EXIT_CODE, TIMEOUT_EXIT_CODE, PipelineEngine
+from pipestep.history import History, StepRecord, StepStats
+from pipestep.images import PullProgress
 from pipestep.actions import get_action_equivalent
+from pipestep.resources import Resources
+from pipestep.runner import runnable_step
+from pipestep.scratch import ScratchMount
+from pipestep.session import SessionRecorder
+from pipestep.state import SessionState, engine_state, restore_steps, this_process
+from pipestep.stress import DEFAULT_RUNS, StressReport, stress_step
+from pipestep.workspace import RESYNC_MODES
 
 
-class StepListItem(ListItem):
-    """A single step in the step list sidebar."""
+def _fmt_seconds(seconds: float) -> str:
+    if seconds < 10:
+        return f"{seconds:.1f}s"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
 
-    def __init__(self, step: Step, index: int) -> None:
-        super().__init__()
-        self.step = step
-        self.step_index = index
 
-    def compose(self) -> ComposeResult:
-        yield Label(self._render_label())
-
-    def _render_label(self) -> str:
-        icon = self._status_icon()
-        bp = " [magenta][B][/magenta]" if self.step.breakpoint else ""
-        if self.step.is_action and self.step.status == StepStatus.SKIPPED:
-            tag = " [dim](action — skipped)[/dim]"
-        elif self.step.is_action:
-            tag = " [yellow](action)[/yellow]"
-        else:
-            tag = ""
-        return f"{icon} {self.step_index + 1}. {self.step.name}{tag}{bp}"
-
-    def _status_icon(self) -> str:
-        icons = {
-            StepStatus.PENDING: "  ",
-            StepStatus.RUNNING: "[yellow]~[/yellow]",
-            StepStatus.PAUSED: "[cyan]●[/cyan]",
-            StepStatus.COMPLETED: "[green]✓[/green]",
-            StepStatus.FAILED: "[red]✗[/red]",
-            StepStatus.SKIPPED: "[dim]⊘[/dim]",
-        }
-        return icons.get(self.step.status, " ")
-
-    def refresh_label(self) -> None:
-        try:
-            self.query_one(Label).update(self._render_label())
-        except NoMatches:
-            pass
+_STATUS_ICONS = {
+    StepStatus.PENDING: "  ",
+    StepStatus.RUNNING: "[yellow]~[/yellow]",
+    StepStatus.PAUSED: "[cyan]●[/cyan]",
+    StepStatus.COMPLETED: "[green]✓[/green]",
+    StepStatus.FAILED: "[red]✗[/red]",
+    StepStatus.SKIPPED: "[dim]⊘[/dim]",
+}
+
+
+def step_label(step: Step, index: int, timing: str = "", conditional: bool = False) -> str:
+    """One line of the step list: status, number, name, tags and timing."""
+    icon = _STATUS_ICONS.get(step.status, " ")
+    bp = " [magenta][B][/magenta]" if step.breakpoint else ""
+    if conditional:
+        bp += " [magenta][C][/magenta]"
+    if step.is_action and step.status == StepStatus.SKIPPED:
+        tag = " [dim](action — skipped)[/dim]"
+    elif step.is_action:
+        tag = " [yellow](action)[/yellow]"
+    else:
+        tag = ""
+    timing = f" {timing}" if timing else ""
+    return f"{icon} {index + 1}. {step.name}{tag}{bp}{timing}"
+
+
+class StepList(ScrollView, can_focus=True):
+    """The step sidebar, one line per step.
+
+    Only visible lines are rendered, from ``label(index)``, and each is kept
+    until ``refresh_row`` says its step changed, so jobs with thousands of
+    steps scroll and update as fast as short ones.
+    """
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+    ]
+
+    COMPONENT_CLASSES = {"step-list--cursor"}
+
+    DEFAULT_CSS = """
+    StepList > .step-list--cursor {
+        background: $block-cursor-blurred-background;
+    }
+    StepList:focus > .step-list--cursor {
+        color: $block-cursor-foreground;
+        background: $block-cursor-background;
+        text-style: $block-cursor-text-style;
+    }
+    """
+
+    # Rendered lines kept for steps off the cursor; the cache is dropped when it outgrows this
+    MAX_CACHED_ROWS = 4096
+
+    class Highlighted(Message):
+        """The cursor moved to step ``index``."""
+
+        def __init__(self, step_list: StepList, index: int) -> None:
+            super().__init__()
+            self.step_list = step_list
+            self.index = index
+
+    def __init__(self, count: int, label: Callable[[int], str], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.count = count
+        self._label = label
+        self._index = 0
+        self._rows: dict[int, Strip] = {}
+        self.virtual_size = Size(0, count)
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @index.setter
+    def index(self, index: int) -> None:
+        index = max(0, min(index, self.count - 1))
+        if index == self._index:
+            return
+        old, self._index = self._index, index
+        self.refresh_line(old)
+        self.refresh_line(index)
+        self.scroll_to_region(Region(0, index, 1, 1), animate=False, force=True, immediate=True)
+        self.post_message(self.Highlighted(self, index))
+
+    def refresh_row(self, index: int) -> None:
+        """Re-render step ``index``'s line, if it's visible."""
+        self._rows.pop(index, None)
+        top = self.scroll_offset.y
+        if top <= index < top + self.size.height:
+            self.refresh_line(index)
+
+    def refresh_rows(self) -> None:
+        """Re-render every line, e.g. when the timings they show changed."""
+        self._rows.clear()
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        index = scroll_y + y
+        width = self.scrollable_content_region.width
+        if index >= self.count:
+            return Strip.blank(width, self.rich_style)
+        cursor = index == self._index
+        strip = None if cursor else self._rows.get(index)
+        if strip is None:
+            text = Text.from_markup(self._label(index), overflow="ellipsis", end="")
+            text.no_wrap = True
+            style = self.rich_style
+            if cursor:
+                style += self.get_component_rich_style("step-list--cursor")
+            strip = Strip(text.render(self.app.console)).apply_style(style)
+            strip = strip.crop_extend(scroll_x, scroll_x + width, style)
+            if not cursor:
+                if len(self._rows) >= self.MAX_CACHED_ROWS:
+                    self._rows.clear()
+                self._rows[index] = strip
+        return strip
+
+    def on_resize(self) -> None:
+        self._rows.clear()
+
+    def on_focus(self) -> None:
+        self.refresh_line(self._index)
+
+    def on_blur(self) -> None:
+        self.refresh_line(self._index)
+
+    def on_click(self, event: events.Click) -> None:
+        offset = event.get_content_offset(self)
+        if offset is not None and self.scroll_offset.y + offset.y < self.count:
+            self.index = self.scroll_offset.y + offset.y
+
+    def action_cursor_up(self) -> None:
+        self.index -= 1
+
+    def action_cursor_down(self) -> None:
+        self.index += 1
+
+    def action_first(self) -> None:
+        self.index = 0
+
+    def action_last(self) -> None:
+        self.index = self.count - 1
+
+    def action_page_up(self) -> None:
+        self.index -= max(1, self.scrollable_content_region.height - 1)
+
+    def action_page_down(self) -> None:
+        self.index += max(1, self.scrollable_content_region.height - 1)
 
 
 class StepDetailPanel(Static):
-    """Shows details about the currently selected step."""
+    """Shows details about the currently selected step.
+
+    The step's own part (command, env, action equivalent, status) is
+    rendered once per ``version`` of the step; only the timing and break
+    conditions are redone on every update.
+    """
 
-    def update_step(self, step: Step, job: Job) -> None:
-        env_str = ", ".join(f"{k}={v}" for k, v in list(step.env.items())[:5])
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._body_key: tuple | None = None
+        self._body = ""
+        self._text = ""
+
+    def update_step(
+        self, step: Step, job: Job, timing: str = "", conditions: list[str] | None = None, version: int = 0,
+    ) -> None:
+        key = (id(step), id(job), version, step.status)
+        if key != self._body_key:
+            self._body = self._render_body(step, job)
+            self._body_key = key
+        text = self._body
+        if timing:
+            text += f"\nTiming: {timing}"
+        if conditions:
+            text += f"\nBreak when: {' | '.join(conditions)}"
+        if text != self._text:
+            self._text = text
+            self.update(text)
+
+    def _render_body(self, step: Step, job: Job) -> str:
+        env_str = ", ".join(f"{k}={v}" for k, v in islice(step.env.items(), 5))
         if len(step.env) > 5:
             env_str += f", ... (+{len(step.env) - 5} more)"
 
@@ -80,13 +256,69 @@ class StepDetailPanel(Static):
 
         text = (
             f"[bold]{step.name}[/bold]\n"
-            f"Image: {job.docker_image}\n"
+            f"Image: {step.image or job.docker_image}\n"
             f"Command:\n{cmd_display}\n"
             f"Env: {env_str}\n"
             f"Working dir: {step.working_directory}\n"
             f"Status: {step.status.value}"
         )
-        self.update(text)
+        if step.shell:
+            text += f"\nShell: {step.shell}"
+        limits = [f"step {step.timeout_minutes:g}m"] if step.timeout_minutes else []
+        if job.timeout_minutes:
+            limits.append(f"job {job.timeout_minutes:g}m")
+        if limits:
+            text += f"\nTimeout: {', '.join(limits)}"
+
+        return text
+
+
+class BreakpointScreen(ModalScreen):
+    """Asks for a conditional breakpoint; dismissed with (condition or None to clear, every step), or None."""
+
+    CSS = """
+    BreakpointScreen {
+        align: center middle;
+    }
+    #breakpoint-dialog {
+        width: 84;
+        height: auto;
+        border: thick $accent;
+        background: $surface;
+        padding: 1 2;
+    }
+    """
+
+    BINDINGS = [("escape", "cancel", "Cancel")]
+
+    def __init__(self, step_name: str, existing: list[str]) -> None:
+        super().__init__()
+        self.step_name = step_name
+        self.existing = existing
+
+    def compose(self) -> ComposeResult:
+        current = "\n".join(f"  {text}" for text in self.existing) or "  (none)"
+        with Vertical(id="breakpoint-dialog"):
+            yield Label(f"Stop auto-run after [bold]{self.step_name}[/bold] when:")
+            yield Input(placeholder="duration > 2m | output ~ ERROR | changed dist/app.js | step.exit_code == 3")
+            yield Checkbox("After any step")
+            yield Static(f"[dim]Current:\n{current}\nSubmit an empty condition to clear them. Esc cancels.[/dim]")
+            yield Static("", id="breakpoint-error")
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        every = self.query_one(Checkbox).value
+        if not event.value.strip():
+            self.dismiss((None, every))
+            return
+        try:
+            condition = parse_condition(event.value)
+        except ValueError as e:
+            self.query_one("#breakpoint-error", Static).update(f"[red]{e}[/red]")
+            return
+        self.dismiss((condition, every))
+
+    def action_cancel(self) -> None:
+        self.dismiss(None)
 
 
 class PipeStepApp(App):
@@ -102,7 +334,7 @@ class PipeStepApp(App):
         width: 1fr;
     }
     #step-detail {
-        height: 11;
+        height: 12;
         border: solid $accent;
         padding: 1;
     }
@@ -121,9 +353,14 @@ class PipeStepApp(App):
     BINDINGS = [
         ("r", "run_step", "Run"),
         ("s", "skip_step", "Skip"),
+        ("x", "cancel_step", "Cancel"),
         ("i", "shell_in", "Shell In"),
         ("b", "toggle_breakpoint", "Breakpoint"),
+        ("c", "conditional_breakpoint", "Break When"),
         ("n", "run_to_breakpoint", "Run to BP"),
+        ("w", "sync_workspace", "Sync"),
+        ("f", "stress_step", "Flake Hunt"),
+        ("d", "detach", "Detach"),
         ("q", "quit_app", "Quit"),
     ]
 
@@ -131,30 +368,69 @@ class PipeStepApp(App):
     current_step_index = reactive(0)
     running = reactive(False)
 
-    def __init__(self, workflow: Workflow, job: Job, workdir: str = "."):
+    def __init__(
+        self,
+        workflow: Workflow,
+        job: Job,
+        workdir: str = ".",
+        backend: Backend | None = None,
+        mount_mode: str = "rw",
+        stress_runs: int = DEFAULT_RUNS,
+        history: History | None = None,
+        state: SessionState | None = None,
+        resources: Resources | None = None,
+        scratch: list[ScratchMount] | None = None,
+        warm_python: bool = False,
+    ):
         super().__init__()
         self.workflow = workflow
         self.job = job
         self.workdir = workdir
-        self.engine = PipelineEngine(job=job, workdir=workdir)
+        if state is not None:
+            resources = Resources.from_dict(state.resources)
+            scratch = [ScratchMount.from_dict(m) for m in state.scratch]
+            warm_python = state.warm_python
+        self.engine = PipelineEngine(
+            job=job, workdir=workdir, backend=backend, mount_mode=mount_mode, resources=resources, scratch=scratch,
+            warm_python=warm_python,
+        )
         atexit.register(self.engine.cleanup)
         self.title = f"PipeStep — {workflow.name} → {job.name}"
         self._auto_running = False
         self._quit_pending = False
-        self.session_log: list[dict] = []
+        self.stress_runs = stress_runs
+        self.session = SessionRecorder(
+            workflow.name, job, workdir=os.path.abspath(workdir), workflow_path=workflow.path,
+            resources=self.engine.resources,
+        )
+        self.history = history
+        self.step_stats: dict[tuple[int, str], StepStats] = {}
+        self.step_durations: dict[int, float] = {}
+        self._running_index: int | None = None
+        self._step_started = 0.0
+        # Bumped whenever a step changes, invalidating its cached renders
+        self._versions = [0] * len(job.steps)
+        # Rows and detail panel to redraw, coalesced into one update per frame
+        self._dirty_rows: set[int] = set()
+        self._detail_index: int | None = None
+        self._flush_pending = False
+        # Set when reattaching to a detached session (see pipestep.state)
+        self.state = state
+        self.conditional: list[ConditionalBreakpoint] = []
+        if state is not None:
+            self.step_durations = restore_steps(job, state.steps)
+            self.session.records = list(state.session)
+            self.conditional = [ConditionalBreakpoint.from_dict(c) for c in state.conditions]
 
     def compose(self) -> ComposeResult:
         yield Header()
         with Horizontal():
-            yield ListView(
-                *[StepListItem(step, i) for i, step in enumerate(self.job.steps)],
-                id="step-list",
-            )
+            yield StepList(len(self.job.steps), self._step_label, id="step-list")
             with Vertical(id="right-pane"):
                 yield StepDetailPanel(id="step-detail")
                 yield RichLog(highlight=True, markup=True, auto_scroll=True, id="output-log")
                 yield Static(
-                    "[R]un / Run Equivalent  [S]kip  [I]nspect Shell  [B]reakpoint  [N] Run to BP  [Q]uit",
+                    "[R]un / Run Equivalent  [S]kip  [X] Cancel  [I]nspect Shell  [B]reakpoint  [C]ondition  [N] Run to BP  [W] Sync  [F]lake Hunt  [D]etach  [Q]uit",
                     id="help-bar",
                 )
         yield Footer()
@@ -163,33 +439,153 @@ class PipeStepApp(App):
         self._log("[bold]PipeStep[/bold] — Interactive CI Pipeline Debugger")
         self._log(f"Workflow: {self.workflow.name}")
         self._log(f"Job: {self.job.name} ({self.job.docker_image})")
+        self._log(f"Resources: {self.engine.resources.describe()}")
+        if self.engine.scratch:
+            self._log(f"Scratch (tmpfs): {', '.join(m.describe() for m in self.engine.scratch)}")
+        if self.engine.warm_python:
+            self._log("Python steps: warm interpreter")
 
         # Show parser warnings in the TUI (e.g., unmapped runs-on)
         for warn in self.workflow.warnings:
             self._log(f"[yellow]  ⚠ {warn}[/yellow]")
 
         self._log("")
-        self._log("Setting up Docker container...")
-        self._setup_engine()
+        self.set_interval(0.5, self._tick_progress)
+        if self.state is not None:
+            self._log(f"Reattaching to session {self.state.id} ({self.engine.backend.name} backend)...")
+            self._attach_engine()
+        else:
+            self._log(f"Setting up container ({self.engine.backend.name} backend)...")
+            self._setup_engine()
 
     @work(thread=True)
     def _setup_engine(self) -> None:
         try:
-            self.engine.setup()
+            if self.history is not None:
+                self.call_from_thread(self._apply_stats, self._job_stats())
+            self.engine.setup(on_pull_progress=lambda p: self.call_from_thread(self._show_pull_progress, p))
+            self.call_from_thread(self._log, f"[dim]Workspace: {self.engine.workspace.describe()}[/dim]")
+            if self.engine.initial_sync is not None:
+                self.call_from_thread(self._log, f"[dim]Initial {self.engine.initial_sync.describe()}[/dim]")
+            self._prime_watches(self.conditional)
             self.call_from_thread(self._log, "[green]Container ready.[/green]\n")
             self.call_from_thread(self._advance_to_first_runnable)
         except Exception as e:
             self.call_from_thread(self._log, f"[red]Setup failed: {e}[/red]")
 
+    @work(thread=True)
+    def _attach_engine(self) -> None:
+        state = self.state
+        try:
+            if self.history is not None:
+                self.call_from_thread(self._apply_stats, self._job_stats())
+            self.engine.attach(state.container_id, state.workspace, state.environment, state.owner)
+            self.engine.elapsed = state.elapsed
+            state.attached = this_process()
+            state.save()
+            self._prime_watches(self.conditional)
+            self.call_from_thread(self._log, f"[dim]Workspace: {self.engine.workspace.describe()}[/dim]")
+            self.call_from_thread(self._log, f"[green]Reattached to container {state.container_id[:12]}.[/green]\n")
+            self.call_from_thread(self._resume_at, state.current_step)
+        except Exception as e:
+            self.call_from_thread(self._log, f"[red]Attach failed: {e}[/red]")
+            self.call_from_thread(
+                self._log, f"  Run [bold]pipestep attach {state.id} --discard[/bold] to forget this session.",
+            )
+
+    def _job_stats(self) -> dict[tuple[int, str], StepStats]:
+        """Step timings from runs under this container's limits, or from any runs if there are none yet."""
+        stats = self.history.job_stats(self.workflow.path, self.job.name, resources=self.engine.resources.describe())
+        return stats or self.history.job_stats(self.workflow.path, self.job.name)
+
+    def _apply_stats(self, stats: dict[tuple[int, str], StepStats]) -> None:
+        self.step_stats = stats
+        try:
+            self.query_one("#step-list", StepList).refresh_rows()
+        except NoMatches:
+            pass
+        self._update_detail_panel()
+
+    def _tick_progress(self) -> None:
+        """Refresh the elapsed time / ETA of the running step."""
+        if self._running_index is None:
+            return
+        self._refresh_step(self._running_index)
+        if self.current_step_index == self._running_index:
+            self._update_detail_panel()
+
+    def _timing_label(self, index: int) -> str:
+        """Short timing for the step list: expected, live elapsed, or actual duration."""
+        stats = self.step_stats.get((index, self.job.steps[index].name))
+        if index == self._running_index:
+            elapsed = time.monotonic() - self._step_started
+            expected = f" / ~{_fmt_seconds(stats.median)}" if stats else ""
+            return f"[yellow]{_fmt_seconds(elapsed)}{expected}[/yellow]"
+        if index in self.step_durations:
+            duration = self.step_durations[index]
+            flag = " [red]▲[/red]" if stats and stats.is_regression(duration) else ""
+            return f"[dim]{_fmt_seconds(duration)}[/dim]{flag}"
+        if stats:
+            return f"[dim]~{_fmt_seconds(stats.median)}[/dim]"
+        return ""
+
+    def _timing_detail(self, index: int) -> str:
+        """Timing line for the detail panel, with a progress bar while running."""
+        stats = self.step_stats.get((index, self.job.steps[index].name))
+        if index == self._running_index:
+            elapsed = time.monotonic() - self._step_started
+            if stats is None:
+                return f"running for {_fmt_seconds(elapsed)} (no history)"
+            filled = min(20, int(20 * elapsed / stats.median)) if stats.median else 20
+            bar = "█" * filled + "░" * (20 - filled)
+            if elapsed <= stats.median:
+                return f"{bar} {_fmt_seconds(elapsed)}, ETA {_fmt_seconds(stats.eta(elapsed))}"
+            return f"{bar} {_fmt_seconds(elapsed)}, [yellow]{_fmt_seconds(elapsed - stats.median)} over the median[/yellow]"
+        if index in self.step_durations:
+            duration = self.step_durations[index]
+            text = f"took {_fmt_seconds(duration)}"
+            if stats:
+                text += f" (median {_fmt_seconds(stats.median)} over {stats.count} runs)"
+                if stats.is_regression(duration):
+                    text += f" [red]▲ {duration / stats.median:.1f}× slower[/red]"
+            return text
+        if stats:
+            return f"expected ~{_fmt_seconds(stats.median)} (median of {stats.count} runs, last {_fmt_seconds(stats.last)})"
+        return "no history yet" if self.history is not None else ""
+
+    def _show_pull_progress(self, progress: PullProgress) -> None:
+        if progress.status == "pulling":
+            self.sub_title = f"Pulling {progress.describe()}"
+            return
+        self.sub_title = ""
+        if progress.status == "pulled":
+            self._log(f"[dim]Image {progress.describe()}[/dim]")
+
     def _advance_to_first_runnable(self) -> None:
         if len(self.job.steps) == 0:
             self._log("[yellow]No steps found in this job.[/yellow]")
             return
-        step = self.job.steps[0]
-        self.current_step_index = 0
-        step.status = StepStatus.PAUSED
-        self._refresh_step(0)
-        self._select_step(0)
+        self._pause_at(0)
+
+    def _resume_at(self, index: int) -> None:
+        """Pick up a reattached session at the step it was detached on."""
+        try:
+            self.query_one("#step-list", StepList).refresh_rows()
+        except NoMatches:
+            pass
+        if index >= len(self.job.steps):
+            self.current_step_index = len(self.job.steps)
+            self._log("[bold green]━━━ All steps complete! ━━━[/bold green]")
+            return
+        self._pause_at(index)
+
+    def _pause_at(self, index: int) -> None:
+        step = self.job.steps[index]
+        self.current_step_index = index
+        if step.status == StepStatus.PENDING:
+            step.status = StepStatus.PAUSED
+        self._refresh_step(index)
+        self._select_step(index)
         if step.is_action:
             equiv = get_action_equivalent(step.action_ref, step.action_with)
             self._log(f"[cyan]● Paused at action: {step.name}[/cyan]")
@@ -212,12 +608,10 @@ class PipeStepApp(App):
         self._update_detail_panel()
 
     def _update_detail_panel(self) -> None:
-        step = self._current_step()
-        if step:
-            try:
-                self.query_one(StepDetailPanel).update_step(step, self.job)
-            except NoMatches:
-                pass
+        """Show the current step in the detail panel, at the next frame."""
+        if self._current_step() is not None:
+            self._detail_index = self.current_step_index
+            self._schedule_flush()
 
     def _log(self, message: str) -> None:
         try:
@@ -225,24 +619,50 @@ class PipeStepApp(App):
         except NoMatches:
             pass
 
+    def _step_label(self, index: int) -> str:
+        conditional = any(bp.step == index for bp in self.conditional)
+        return step_label(self.job.steps[index], index, self._timing_label(index), conditional)
+
     def _refresh_step(self, index: int) -> None:
+        """Mark step ``index`` as changed; its row and detail are redrawn at the next frame."""
+        if 0 <= index < len(self.job.steps):
+            self._versions[index] += 1
+            self._dirty_rows.add(index)
+            if index == self.current_step_index:
+                self._detail_index = index
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.call_after_refresh(self._flush)
+
+    def _flush(self) -> None:
+        """Redraw the rows and detail panel changed since the last frame."""
+        self._flush_pending = False
+        rows, self._dirty_rows = self._dirty_rows, set()
+        index, self._detail_index = self._detail_index, None
         try:
-            items = self.query_one("#step-list", ListView).children
-            if 0 <= index < len(items):
-                items[index].refresh_label()
+            step_list = self.query_one("#step-list", StepList)
+            for row in rows:
+                step_list.refresh_row(row)
+            if index is not None and 0 <= index < len(self.job.steps):
+                self.query_one(StepDetailPanel).update_step(
+                    self.job.steps[index], self.job, self._timing_detail(index), self._conditions_for(index),
+                    version=self._versions[index],
+                )
         except NoMatches:
             pass
 
     def _select_step(self, index: int) -> None:
         try:
-            list_view = self.query_one("#step-list", ListView)
-            list_view.index = index
+            self.query_one("#step-list", StepList).index = index
         except NoMatches:
             pass
 
-    def on_list_view_highlighted(self, event: ListView.Highlighted) -> None:
-        if event.item and isinstance(event.item, StepListItem):
-            self.query_one(StepDetailPanel).update_step(event.item.step, self.job)
+    def on_step_list_highlighted(self, event: StepList.Highlighted) -> None:
+        self._detail_index = event.index
+        self._schedule_flush()
 
     # --- Actions ---
 
@@ -276,9 +696,10 @@ class PipeStepApp(App):
                 command=equiv[1],
                 env=step.env,
                 working_directory="/workspace",
+                timeout_minutes=step.timeout_minutes,
             )
-            self._record_action("run_equivalent", step.name, equiv[1])
-            self._execute_step(equiv_step, self.current_step_index)
+            self._start_timing(self.current_step_index)
+            self._execute_step(equiv_step, self.current_step_index, "run_equivalent")
             return
 
         self.running = True
@@ -286,28 +707,59 @@ class PipeStepApp(App):
         self._refresh_step(self.current_step_index)
         self._update_detail_panel()
         self._log(f"\n[bold]> Running: {step.name}[/bold]")
-        self._record_action("run", step.name, step.command)
-        self._execute_step(step, self.current_step_index)
+        self._start_timing(self.current_step_index)
+        self._execute_step(step, self.current_step_index, "run")
+
+    def _start_timing(self, index: int) -> None:
+        self._running_index = index
+        self._step_started = time.monotonic()
+        self.step_durations.pop(index, None)
+        self._refresh_step(index)
 
     @work(thread=True)
-    def _execute_step(self, step: Step, index: int) -> None:
+    def _execute_step(self, step: Step, index: int, action: str) -> None:
+        started = time.time()
         try:
             result = self.engine.run_step(step)
-            self.call_from_thread(self._on_step_complete, step, index, result)
         except Exception as e:
-            self.call_from_thread(
-                self._on_step_complete,
-                step,
-                index,
-                StepResult(exit_code=1, stdout="", stderr=str(e)),
+            result = StepResult(exit_code=1, stdout="", stderr=str(e))
+        duration = time.time() - started
+        hits = []
+        if self.conditional:
+            # Checked here, off the UI thread, since a file watch may exec in the container
+            event = StepEvent(
+                index, self.job.steps[index], result.exit_code, result.stdout + result.stderr, duration,
+                env={**self.job.env, **step.env}, engine=self.engine,
             )
+            hits = check_breakpoints(list(self.conditional), event)
+        self.session.record_step(
+            index, step, action, started, duration,
+            result.exit_code, result.stdout + result.stderr,
+        )
+        if self.history is not None:
+            self.history.record(StepRecord(
+                workflow=self.workflow.path,
+                job=self.job.name,
+                step=self.job.steps[index].name,
+                image=self.job.docker_image,
+                backend=self.engine.backend.name,
+                duration=duration,
+                exit_code=result.exit_code,
+                resources=self.engine.resources.describe(),
+                index=index,
+            ))
+        self.call_from_thread(self._on_step_complete, step, index, result, duration, hits)
 
-    def _on_step_complete(self, step: Step, index: int, result: StepResult) -> None:
+    def _on_step_complete(
+        self, step: Step, index: int, result: StepResult, duration: float = 0.0, hits: list[str] | None = None,
+    ) -> None:
         # Always update the real job step (step might be a temp equiv_step)
         real_step = self.job.steps[index]
         real_step.exit_code = result.exit_code
         real_step.output = result.stdout + result.stderr
         step = real_step
+        self._running_index = None
+        self.step_durations[index] = duration
 
         if result.stdout:
             for line in result.stdout.rstrip().split("\n"):
@@ -319,11 +771,28 @@ class PipeStepApp(App):
         if result.exit_code == 0:
             step.status = StepStatus.COMPLETED
             self._log(f"[green]  ✓ Step passed (exit code 0)[/green]")
+            stats = self.step_stats.get((index, step.name))
+            if stats is not None and stats.is_regression(duration):
+                self._log(
+                    f"[yellow]  ▲ Took {_fmt_seconds(duration)}, {duration / stats.median:.1f}× the "
+                    f"median of {_fmt_seconds(stats.median)} over {stats.count} runs[/yellow]"
+                )
         else:
             step.status = StepStatus.FAILED
-            self._log(f"[red]  ✗ Step failed (exit code {result.exit_code})[/red]")
+            if result.exit_code == TIMEOUT_EXIT_CODE:
+                self._log(f"[red]  ⏱ Step timed out after {_fmt_seconds(duration)} and was killed[/red]")
+            elif result.exit_code == CANCELLED_EXIT_CODE:
+                self._log("[red]  ✗ Step cancelled[/red]")
+            else:
+                self._log(f"[red]  ✗ Step failed (exit code {result.exit_code})[/red]")
             self._log("[yellow]  [R]etry  [I]nspect Shell  [S]kip  [Q]uit[/yellow]")
 
+        for reason in hits or []:
+            self._log(f"[magenta]  ◆ Break condition met: {reason}[/magenta]")
+        if hits and self._auto_running:
+            self._auto_running = False
+            self._log("[magenta]  Auto-run stopped. Press N to continue.[/magenta]")
+
         self._refresh_step(index)
         self._update_detail_panel()
         self.running = False
@@ -402,40 +871,40 @@ class PipeStepApp(App):
         step.status = StepStatus.SKIPPED
         self._refresh_step(self.current_step_index)
         self._log(f"[dim]  ⊘ Skipped: {step.name}[/dim]")
-        self._record_action("skip", step.name)
+        self.session.record_event("skip", step.name)
         self._advance_to_next()
 
+    def action_cancel_step(self) -> None:
+        if not self.running:
+            self.notify("No step is running.", severity="information")
+            return
+        if self.engine.cancel_step():
+            self._auto_running = False
+            self._log("[yellow]  Cancelling: killing the step's processes...[/yellow]")
+        else:
+            self.notify("Flake hunts run in forks and can't be cancelled.", severity="information")
+
     def action_shell_in(self) -> None:
         if self.engine.container is None:
             self.notify("No container running", severity="error")
             return
-        container_id = self.engine.container_id
         step = self._current_step()
 
-        # Build docker exec command with step's env vars and working directory
-        cmd = ["docker", "exec", "-it"]
-        if step:
-            for k, v in step.env.items():
-                cmd.extend(["-e", f"{k}={v}"])
-            workdir = step.working_directory or "/workspace"
-            cmd.extend(["-w", workdir])
-        else:
-            cmd.extend(["-w", "/workspace"])
+        # Open the shell with the step's env vars and working directory
+        env = dict(step.env) if step else {}
+        workdir = (step.working_directory if step else "") or "/workspace"
 
         self._log("\n[cyan]Launching interactive shell... (type 'exit' to return)[/cyan]")
         with self.suspend():
-            ret = subprocess.call(cmd + [container_id, "/bin/bash"])
-            if ret != 0:
-                subprocess.call(cmd + [container_id, "/bin/sh"])
-        self._record_action("shell_in", step.name if step else "unknown")
+            self.engine.shell(env, workdir)
+        self.session.record_event("shell_in", step.name if step else "unknown")
         self._log("[cyan]Returned from shell.[/cyan]\n")
 
     def action_toggle_breakpoint(self) -> None:
         try:
-            list_view = self.query_one("#step-list", ListView)
+            highlighted = self.query_one("#step-list", StepList).index
         except NoMatches:
             return
-        highlighted = list_view.index
         if highlighted is not None and 0 <= highlighted < len(self.job.steps):
             step = self.job.steps[highlighted]
             step.breakpoint = not step.breakpoint
@@ -445,6 +914,51 @@ class PipeStepApp(App):
                 self._log("[dim]  Press N to auto-run all steps until this breakpoint.[/dim]")
             self._refresh_step(highlighted)
 
+    def action_conditional_breakpoint(self) -> None:
+        try:
+            highlighted = self.query_one("#step-list", StepList).index
+        except NoMatches:
+            return
+        if highlighted is None or not 0 <= highlighted < len(self.job.steps):
+            return
+        existing = [bp.describe() for bp in self.conditional if bp.step in (None, highlighted)]
+        self.push_screen(
+            BreakpointScreen(self.job.steps[highlighted].name, existing),
+            partial(self._on_breakpoint_dialog, highlighted),
+        )
+
+    def _on_breakpoint_dialog(self, index: int, result: tuple[Condition | None, bool] | None) -> None:
+        if result is None:
+            return
+        condition, every = result
+        scope = None if every else index
+        if condition is None:
+            self.conditional = [bp for bp in self.conditional if bp.step != scope]
+            where = "every step" if every else self.job.steps[index].name
+            self._log(f"[magenta]  Conditional breakpoints cleared: {where}[/magenta]")
+        else:
+            bp = ConditionalBreakpoint(condition, scope)
+            self.conditional.append(bp)
+            self._log(f"[magenta]  Break when {bp.describe()}[/magenta]")
+            self._log("[dim]  Press N to auto-run; it stops when the condition holds.[/dim]")
+            if self.engine.container is not None:
+                self.run_worker(partial(self._prime_watches, [bp]), thread=True)
+        self._refresh_step(index)
+        self._update_detail_panel()
+
+    def _prime_watches(self, breakpoints: list[ConditionalBreakpoint]) -> None:
+        """Record the current state of watched files, so later changes are hits."""
+        for bp in breakpoints:
+            if isinstance(bp.condition, FileCondition):
+                try:
+                    bp.condition.prime(self.engine)
+                except Exception:
+                    pass  # primed on the first check instead
+
+    def _conditions_for(self, index: int) -> list[str]:
+        return [bp.text if bp.step is not None else f"{bp.text} (any step)"
+                for bp in self.conditional if bp.step in (None, index)]
+
     def action_run_to_breakpoint(self) -> None:
         if self.running:
             self.notify("Step is still running...", severity="information")
@@ -457,32 +971,95 @@ class PipeStepApp(App):
         self._log("\n[dim]Auto-running to next breakpoint...[/dim]")
         self.action_run_step()
 
-    def _record_action(self, action: str, step_name: str, command: str = "") -> None:
-        import time
-        self.session_log.append({
-            "time": time.strftime("%H:%M:%S"),
-            "action": action,
-            "step": step_name,
-            "command": command,
-        })
-
-    def _save_session(self, path: str) -> None:
-        lines = [
-            "#!/usr/bin/env bash",
-            f"# PipeStep session recording — {self.workflow.name} / {self.job.name}",
-            f"# Image: {self.job.docker_image}",
-            f"# Recorded: {__import__('time').strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-        ]
-        for entry in self.session_log:
-            lines.append(f"# [{entry['time']}] {entry['action']}: {entry['step']}")
-            if entry["command"]:
-                lines.append(entry["command"])
-            lines.append("")
-        import os
-        with open(path, "w") as f:
-            f.write("\n".join(lines))
-        os.chmod(path, 0o755)
+    def action_sync_workspace(self) -> None:
+        if self.running:
+            self.notify("Step is still running...", severity="information")
+            return
+        if self.engine.container is None:
+            self.notify("No container running", severity="error")
+            return
+        if self.engine.mount_mode not in RESYNC_MODES:
+            self.notify(f"Workspace is a live {self.engine.mount_mode} mount; edits are already visible.")
+            return
+        self._sync_workspace()
+
+    @work(thread=True, exclusive=True, group="sync")
+    def _sync_workspace(self) -> None:
+        try:
+            result = self.engine.sync_workspace()
+            self.call_from_thread(self._log, f"[cyan]  ⇄ {result.describe()}[/cyan]")
+        except Exception as e:
+            self.call_from_thread(self._log, f"[red]  Workspace sync failed: {e}[/red]")
+
+    def action_stress_step(self) -> None:
+        if self.running:
+            self.notify("Step is still running...", severity="information")
+            return
+        if self.engine.container is None:
+            self.notify("No container running", severity="error")
+            return
+        step = self._current_step()
+        if step is None or step.status not in (StepStatus.PAUSED, StepStatus.PENDING, StepStatus.FAILED):
+            return
+        target = runnable_step(step)
+        if target is None:
+            self._log(f"[yellow]No local equivalent for {step.action_ref}; nothing to stress-test[/yellow]")
+            return
+        self._quit_pending = False
+        self.running = True
+        self._log(f"\n[bold]> Flake hunt: {step.name} × {self.stress_runs} in parallel forks[/bold]")
+        self._log("[dim]  Forks start from the current container state; this container is not changed.[/dim]")
+        self.session.record_event("stress", step.name)
+        self._stress_step(target)
+
+    @work(thread=True)
+    def _stress_step(self, step: Step) -> None:
+        def _on_run(run) -> None:
+            mark = "[green]✓[/green]" if run.passed else "[red]✗[/red]"
+            self.call_from_thread(self._log, f"  {mark} run {run.index + 1}: exit {run.exit_code} in {run.duration:.2f}s")
+
+        try:
+            report = stress_step(self.engine, step, runs=self.stress_runs, on_run=_on_run)
+            self.call_from_thread(self._on_stress_complete, report)
+        except Exception as e:
+            self.call_from_thread(self._log, f"[red]  Flake hunt failed: {e}[/red]")
+            self.call_from_thread(setattr, self, "running", False)
+
+    def _on_stress_complete(self, report: StressReport) -> None:
+        color = "yellow" if report.flaky else ("green" if report.passed else "red")
+        lines = report.summary_lines()
+        self._log(f"[bold {color}]  {lines[0]}[/bold {color}]")
+        for line in lines[1:]:
+            self._log(Text(f"  {line}"))
+        if report.flaky:
+            self._log("[yellow]  Step is flaky: runs from the same state disagree.[/yellow]")
+        self.running = False
+
+    def action_detach(self) -> None:
+        if self.running:
+            self.notify("Step is still running; detach once it finishes.", severity="information")
+            return
+        if self.engine.container is None:
+            self.notify("No container running", severity="error")
+            return
+        state = engine_state(
+            self.engine,
+            self.workflow.path,
+            current_step=self.current_step_index,
+            durations=self.step_durations,
+            session=self.session.records,
+            conditions=[bp.to_dict() for bp in self.conditional],
+            previous=self.state,
+        )
+        try:
+            state.save()
+        except OSError as e:
+            self.notify(f"Could not save session state: {e}", severity="error")
+            return
+        if self.history is not None:
+            self.history.flush()
+        self.engine.detach()
+        self.exit(state)
 
     def action_quit_app(self) -> None:
         if self.running:
@@ -499,20 +1076,26 @@ class PipeStepApp(App):
         self._do_quit()
 
     def _do_quit(self) -> None:
-        if self.session_log:
-            import tempfile
-            session_name = f"pipestep-session-{__import__('time').strftime('%Y%m%d-%H%M%S')}.sh"
+        if self.history is not None:
+            self.history.flush()
+        if self.session.records:
+            session_name = f"pipestep-session-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
             try:
-                self._save_session(session_name)
+                self.session.save(session_name)
                 self._log(f"\n[green]Session saved to {session_name}[/green]")
             except OSError:
                 # Fall back to temp dir if cwd is read-only
-                fallback = __import__('os').path.join(tempfile.gettempdir(), session_name)
+                fallback = os.path.join(tempfile.gettempdir(), session_name)
                 try:
-                    self._save_session(fallback)
+                    self.session.save(fallback)
                     self._log(f"\n[green]Session saved to {fallback}[/green]")
                 except OSError:
                     self._log("\n[yellow]Could not save session recording.[/yellow]")
         self._log("\nCleaning up container...")
+        if any(m.volume for m in self.engine.scratch):
+            self._log("Saving scratch directories to their volumes...")
+        self.engine.cancel_step()
         self.engine.cleanup()
+        if self.state is not None and self.state.attached == this_process():
+            self.state.remove()  # the session ended here; a failed attach keeps it for --discard
         self.exit()
@@ -0,0 +1,99 @@
+import shutil
+import textwrap
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.engine import PipelineEngine
+from pipestep.local_actions import expand_action
+from pipestep.models import Job, Step
+
+
+def _uses(ref, **inputs):
+    return Step(name="Act", command="", is_action=True, action_ref=ref, action_with=inputs)
+
+
+def _mirror_action(mirror, name, body, files=None):
+    directory = mirror / name
+    directory.mkdir(parents=True)
+    (directory / "action.yml").write_text(textwrap.dedent(body))
+    for filename, content in (files or {}).items():
+        (directory / filename).write_text(content)
+    return directory
+
+
+JS_ACTION = """\
+    inputs:
+      Who Am I: {default: nobody}
+    runs:
+      using: node20
+      pre: setup.js
+      main: dist/index.js
+"""
+
+
+def test_node_action_step(tmp_path):
+    action = _mirror_action(tmp_path, "acme/greet@v1", JS_ACTION)
+    [step] = expand_action(_uses("acme/greet@v1", **{"Who Am I": "me"}), str(tmp_path), [str(tmp_path)])
+    assert not step.is_action
+    assert step.runtime == "node20"
+    assert step.env["INPUT_WHO_AM_I"] == "me"
+    assert step.action_source == str(action)
+    assert step.command == (
+        '"${PIPESTEP_NODE20:-node}" /tmp/pipestep-actions/acme/greet@v1/setup.js && '
+        '"${PIPESTEP_NODE20:-node}" /tmp/pipestep-actions/acme/greet@v1/dist/index.js'
+    )
+
+
+def test_node_action_needs_main(tmp_path):
+    _mirror_action(tmp_path, "acme/broken@v1", "runs: {using: node20}")
+    with pytest.raises(ValueError, match="needs 'runs.main'"):
+        expand_action(_uses("acme/broken@v1"), str(tmp_path), [str(tmp_path)])
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node on the host")
+def test_node_action_runs_on_local_backend(tmp_path):
+    mirror = tmp_path / "mirror"
+    _mirror_action(mirror, "acme/greet@v1", "runs: {using: node20, main: index.js}\ninputs: {who: {}}\n", {
+        "index.js": "console.log(`hi ${process.env.INPUT_WHO} in ${process.cwd()}`)\n",
+    })
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    [step] = expand_action(_uses("acme/greet@v1", who="there"), str(workdir), [str(mirror)])
+    job = Job(name="js", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[step])
+    with PipelineEngine(job=job, workdir=str(workdir), backend=LocalBackend()) as engine:
+        engine.setup()
+        result = engine.run_step(step)
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout.strip() == f"hi there in {workdir}"
+
+
+def test_container_actions(tmp_path):
+    _mirror_action(tmp_path, "acme/lint@v2", """\
+        inputs: {level: {default: warn}}
+        runs:
+          using: docker
+          image: docker://alpine:3.19
+          entrypoint: /bin/sh
+          args: ["-c", "lint --level ${{ inputs.level }}"]
+          env: {LEVEL: "${{ inputs.level }}"}
+    """)
+    [step] = expand_action(_uses("acme/lint@v2"), str(tmp_path), [str(tmp_path)])
+    assert step.image == "alpine:3.19"
+    assert step.entrypoint == "/bin/sh"
+    assert step.command == "-c 'lint --level warn'"
+    assert step.env["LEVEL"] == "warn" and step.env["INPUT_LEVEL"] == "warn"
+
+    [step] = expand_action(_uses("docker://busybox:1", args="echo hi"), str(tmp_path), [])
+    assert (step.image, step.command, step.entrypoint) == ("busybox:1", "echo hi", "")
+
+    _mirror_action(tmp_path, "acme/built@v1", "runs: {using: docker, image: Dockerfile}")
+    with pytest.raises(ValueError, match="Dockerfile"):
+        expand_action(_uses("acme/built@v1"), str(tmp_path), [str(tmp_path)])
+
+
+def test_container_step_needs_docker(tmp_path):
+    step = Step(name="c", command="true", image="alpine:3.19")
+    job = Job(name="c", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[step])
+    with PipelineEngine(job=job, workdir=str(tmp_path), backend=LocalBackend()) as engine:
+        engine.setup()
+        with pytest.raises(RuntimeError, match="can't run container actions"):
+            engine.run_step(step)
@@ -1,4 +1,6 @@
-from pipestep.actions import get_action_equivalent
+from importlib.metadata import EntryPoint
+from pipestep import actions
+from pipestep.actions import ActionRegistry, get_action_equivalent
 
 
 def test_checkout_has_equivalent():
@@ -90,3 +92,51 @@ def test_setup_node_without_version_is_generic():
 def test_with_inputs_ignored_for_noop_actions():
     desc, cmd = get_action_equivalent("actions/cache@v3", {"path": "node_modules", "key": "abc"})
     assert "no-op" in desc.lower()
+
+
+# --- registry ---
+
+
+def test_registry_exact_names_and_globs():
+    registry = ActionRegistry()
+    registry.register("MyOrg/Deploy", lambda inputs: ("deploy", "make deploy"))
+    registry.register("myorg/*", lambda inputs: ("any", "true"))
+    registry.register("other/*-lint", lambda inputs: ("lint", "make lint"))
+    assert registry.equivalent("myorg/deploy@v1")[0] == "deploy"
+    assert registry.equivalent("myorg/deploy/sub@v1")[0] == "deploy"
+    assert registry.equivalent("myorg/build@main")[0] == "any"
+    assert registry.equivalent("other/py-lint@v2")[0] == "lint"
+    assert registry.equivalent("other/py-test@v2") is None
+
+
+def test_registry_memoizes_per_ref_and_inputs():
+    calls = []
+    registry = ActionRegistry()
+    registry.register("acme/setup", lambda inputs: calls.append(inputs) or ("setup", inputs.get("v", "")))
+    for _ in range(3):
+        registry.equivalent("acme/setup@v1", {"v": "1"})
+    registry.equivalent("acme/setup@v1", {"v": "2"})
+    assert len(calls) == 2
+    registry.register("acme/setup", lambda inputs: ("replaced", ""))
+    assert registry.equivalent("acme/setup@v1", {"v": "1"})[0] == "replaced"
+
+
+def _plugin(registry):
+    registry.register("plugin-org/tool", lambda inputs: ("from plugin", "tool --version"))
+
+
+def _broken_plugin(registry):
+    raise ImportError("missing dependency")
+
+
+def test_registry_loads_entry_point_plugins(monkeypatch, capsys):
+    group = actions.ENTRY_POINT_GROUP
+    entry_points = [
+        EntryPoint("good", "tests.test_actions:_plugin", group),
+        EntryPoint("broken", "tests.test_actions:_broken_plugin", group),
+    ]
+    monkeypatch.setattr(actions.importlib.metadata, "entry_points", lambda group: entry_points)
+    registry = ActionRegistry()
+    registry.load_plugins()
+    assert registry.equivalent("plugin-org/tool@v3") == ("from plugin", "tool --version")
+    assert "action plugin 'broken' failed to load" in capsys.readouterr().err
@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+import pytest
+from pipestep import backends
+from pipestep.backends import Backend, DockerBackend, LocalBackend, get_backend, is_remote_docker_host
+from pipestep.engine import CANCELLED_EXIT_CODE, TIMEOUT_EXIT_CODE, PipelineEngine
+from pipestep.models import Step, Job
+
+
+@pytest.fixture
+def sample_job():
+    return Job(
+        name="test-job",
+        runs_on="ubuntu-latest",
+        docker_image="ubuntu:22.04",
+        steps=[
+            Step(name="Echo hello", command='echo "hello world"'),
+            Step(name="Create file", command="touch /workspace/testfile.txt"),
+            Step(name="Failing step", command="exit 1"),
+        ],
+        env={"JOB_VAR": "from_job"},
+    )
+
+
+@pytest.fixture
+def engine(sample_job, tmp_path):
+    eng = PipelineEngine(job=sample_job, workdir=str(tmp_path), backend=LocalBackend())
+    eng.setup()
+    yield eng
+    eng.cleanup()
+
+
+def test_get_backend_unknown():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        get_backend("podman-ish")
+
+
+def test_setup_creates_local_container(engine):
+    assert engine.container is not None
+    assert engine.container.status == "running"
+    assert engine.container_id.startswith("local-")
+
+
+def test_run_step_success(engine, sample_job):
+    result = engine.run_step(sample_job.steps[0])
+    assert result.exit_code == 0
+    assert "hello world" in result.stdout
+
+
+def test_run_step_failure(engine, sample_job):
+    result = engine.run_step(sample_job.steps[2])
+    assert result.exit_code == 1
+
+
+def test_workspace_paths_mapped_to_workdir(engine, sample_job, tmp_path):
+    engine.run_step(sample_job.steps[1])
+    assert (tmp_path / "testfile.txt").exists()
+
+
+def test_working_directory_mapped(engine, tmp_path):
+    (tmp_path / "subdir").mkdir()
+    step = Step(name="Workdir test", command="pwd", working_directory="/workspace/subdir")
+    result = engine.run_step(step)
+    assert result.stdout.strip() == str(tmp_path / "subdir")
+
+
+def test_missing_working_directory_fails(engine):
+    step = Step(name="Missing dir", command="pwd", working_directory="/workspace/nope")
+    result = engine.run_step(step)
+    assert result.exit_code == 126
+
+
+def test_env_layers(engine):
+    step = Step(name="Env test", command='echo "$JOB_VAR $MY_VAR $GITHUB_WORKSPACE"', env={"MY_VAR": "hello123"})
+    result = engine.run_step(step)
+    assert result.stdout.split() == ["from_job", "hello123", engine.workdir]
+
+
+def test_similar_paths_not_rewritten(engine):
+    step = Step(name="Paths", command="echo /workspaces /workspace-x /workspace")
+    result = engine.run_step(step)
+    assert result.stdout.split() == ["/workspaces", "/workspace-x", engine.workdir]
+
+
+def test_home_is_private(engine):
+    result = engine.run_step(Step(name="Home", command='echo "$HOME"'))
+    assert result.stdout.strip() != os.path.expanduser("~")
+    assert os.path.isdir(result.stdout.strip())
+
+
+def test_get_env_and_files(engine, tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    assert "PATH" in engine.get_env()
+    assert engine.get_files() == ["a.txt"]
+
+
+def test_cleanup_removes_root(engine):
+    root = engine.container.root
+    engine.cleanup()
+    assert engine.container is None
+    assert not os.path.exists(root)
+
+
+def test_snapshot_mount_leaves_workdir_untouched(sample_job, tmp_path):
+    (tmp_path / "keep.txt").write_text("original")
+    eng = PipelineEngine(job=sample_job, workdir=str(tmp_path), backend=LocalBackend(), mount_mode="snapshot")
+    eng.setup()
+    try:
+        result = eng.run_step(Step(name="Write", command="echo changed > /workspace/keep.txt && cat /workspace/keep.txt"))
+        assert result.stdout.strip() == "changed"
+        assert eng.workspace.path != str(tmp_path)
+    finally:
+        eng.cleanup()
+    assert (tmp_path / "keep.txt").read_text() == "original"
+
+
+def test_sync_mount_pushes_files_and_resyncs(sample_job, tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "app.txt").write_text("v1")
+    eng = PipelineEngine(job=sample_job, workdir=str(src), backend=LocalBackend(), mount_mode="sync")
+    eng.setup()
+    try:
+        assert eng.initial_sync.sent == 1
+        assert eng.run_step(Step(name="Read", command="cat /workspace/app.txt")).stdout == "v1"
+        (src / "app.txt").write_text("v2")
+        assert eng.run_step(Step(name="Read", command="cat /workspace/app.txt")).stdout == "v1"
+        assert eng.sync_workspace().sent == 1
+        assert eng.run_step(Step(name="Read", command="cat /workspace/app.txt")).stdout == "v2"
+    finally:
+        eng.cleanup()
+
+
+def test_sync_workspace_rejected_for_live_mounts(engine):
+    with pytest.raises(RuntimeError, match="nothing to sync"):
+        engine.sync_workspace()
+
+
+@pytest.mark.parametrize("url, remote", [
+    ("unix:///var/run/docker.sock", False),
+    ("tcp://127.0.0.1:2375", False),
+    ("tcp://buildbox.internal:2376", True),
+    ("ssh://ci@buildbox", True),
+])
+def test_is_remote_docker_host(url, remote):
+    assert is_remote_docker_host(url) is remote
+
+
+def test_remote_host_requires_sync_mount(sample_job, tmp_path):
+    backend = DockerBackend(base_url="ssh://ci@buildbox")
+    with pytest.raises(ValueError, match="sync"):
+        PipelineEngine(job=sample_job, workdir=str(tmp_path), backend=backend)
+    eng = PipelineEngine(job=sample_job, workdir=str(tmp_path), backend=backend, mount_mode="sync")
+    assert eng.mount_mode == "sync"
+
+
+def test_docker_clients_shared_per_endpoint(monkeypatch):
+    created = []
+
+    class FakeClient:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+        def ping(self):
+            return True
+
+    monkeypatch.setattr(backends, "_clients", {})
+    monkeypatch.setattr(backends.docker, "DockerClient", FakeClient)
+    a = DockerBackend(base_url="tcp://buildbox:2376").client
+    b = DockerBackend(base_url="tcp://buildbox:2376").client
+    c = DockerBackend(base_url="ssh://ci@buildbox").client
+    assert a is b
+    assert a is not c
+    assert len(created) == 2
+    assert created[1]["use_ssh_client"] is True
+
+
+def test_fork_copies_container_and_workspace(engine):
+    engine.run_step(Step(name="state", command="echo home > $HOME/marker && echo ws > /workspace/w.txt"))
+    image = engine.commit()
+    fork = engine.fork(image, "f1")
+    try:
+        assert fork.container_id != engine.container_id
+        result = fork.run_step(Step(name="read", command="cat $HOME/marker /workspace/w.txt; echo x > /workspace/w.txt"))
+        assert result.stdout == "home\nws\n"
+        assert open(os.path.join(engine.workdir, "w.txt")).read() == "ws\n"
+    finally:
+        fork.cleanup()
+        engine.backend.remove_image(image)
+    assert engine.backend.images == {}
+
+
+def _alive(pid_file):
+    """True if any process whose pid the step wrote to ``pid_file`` is still running."""
+    for pid in pid_file.read_text().split():
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().split(") ")[1][0] != "Z":
+                    return True
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def test_step_timeout_kills_process_group(engine, tmp_path):
+    step = Step(
+        name="Hang",
+        command="echo started; sleep 300 & echo $! > pids; sleep 300 & echo $! >> pids; wait",
+        timeout_minutes=0.01,
+    )
+    start = time.monotonic()
+    result = engine.run_step(step)
+    assert time.monotonic() - start < 5
+    assert result.exit_code == TIMEOUT_EXIT_CODE
+    assert result.stdout == "started\n"
+    assert "step's timeout-minutes" in result.stderr
+    time.sleep(0.2)
+    assert not _alive(tmp_path / "pids")
+
+
+def test_job_timeout_counts_step_time(engine, sample_job):
+    sample_job.timeout_minutes = 0.01
+    assert engine.run_step(Step(name="Hang", command="sleep 300")).exit_code == TIMEOUT_EXIT_CODE
+    result = engine.run_step(sample_job.steps[0])
+    assert result.exit_code == TIMEOUT_EXIT_CODE
+    assert "job's timeout-minutes (0.01) was already used up" in result.stderr
+
+
+def test_cancel_step_escalates_to_kill(engine, tmp_path):
+    assert not engine.cancel_step()
+    threading.Timer(0.3, engine.cancel_step).start()
+    result = engine.run_step(Step(name="Stubborn", command="trap '' TERM; sleep 300 & echo $! > pids; wait"))
+    assert result.exit_code == CANCELLED_EXIT_CODE
+    time.sleep(0.2)
+    assert not _alive(tmp_path / "pids")
+
+
+def test_incomplete_backend_fails_when_created():
+    class HalfBackend(Backend):
+        name = "half"
+
+        def ensure_image(self, image, on_progress=None):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        HalfBackend()
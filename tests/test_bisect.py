@@ -0,0 +1,121 @@
+import subprocess
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.bisect import _probes, bisect, candidate_revisions, workspace_key
+
+WORKFLOW = """
+name: CI
+on: push
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    steps:
+      - name: Setup
+        run: echo setup >> {counter}
+      - name: Check
+        run: test -f ok.txt
+"""
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(repo, message):
+    _git(repo, "add", "-A")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", message)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Ten commits; ok.txt (which the job checks for) is deleted in commit 6."""
+    repo = tmp_path / "repo"
+    (repo / ".github" / "workflows").mkdir(parents=True)
+    counter = tmp_path / "setup-runs"
+    (repo / ".github" / "workflows" / "ci.yml").write_text(WORKFLOW.format(counter=counter))
+    (repo / "ok.txt").write_text("ok")
+    _git(repo, "init", "-q")
+    revs = [_commit(repo, "initial")]
+    for i in range(1, 10):
+        (repo / "notes.txt").write_text(str(i))
+        if i == 6:
+            (repo / "ok.txt").unlink()
+        revs.append(_commit(repo, f"change {i}"))
+    return repo, revs, counter
+
+
+def test_candidate_revisions(history):
+    repo, revs, _ = history
+    assert candidate_revisions(str(repo), revs[0], revs[-1]) == revs[1:]
+    with pytest.raises(ValueError, match="No commits"):
+        candidate_revisions(str(repo), revs[-1], revs[0])
+
+
+@pytest.mark.parametrize("parallel", [1, 3])
+def test_bisect_finds_first_bad_commit(history, parallel):
+    repo, revs, _ = history
+    result = bisect(str(repo), revs[0], revs[-1], ".github/workflows/ci.yml", "build", LocalBackend(), parallel=parallel)
+    assert result.first_bad.rev == revs[6]
+    assert result.first_bad.failing_step.name == "Check"
+    assert len(result.tested) < result.candidates
+    assert _git(repo, "worktree", "list").count("\n") == 0
+
+
+def test_bisect_reports_passing_bad(history):
+    repo, revs, _ = history
+    result = bisect(str(repo), revs[0], revs[3], ".github/workflows/ci.yml", "build", LocalBackend())
+    assert result.first_bad is None
+
+
+def test_workflow_only_edits_reuse_cached_steps(tmp_path):
+    repo = tmp_path / "repo"
+    workflow = repo / ".github" / "workflows" / "ci.yml"
+    workflow.parent.mkdir(parents=True)
+    counter = tmp_path / "setup-runs"
+    workflow.write_text(WORKFLOW.format(counter=counter))
+    (repo / "ok.txt").write_text("ok")
+    _git(repo, "init", "-q")
+    good = _commit(repo, "initial")
+    for i in range(4):
+        workflow.write_text(workflow.read_text() + f"      - run: echo extra {i}\n")
+        _commit(repo, f"workflow edit {i}")
+    workflow.write_text(workflow.read_text() + "      - run: exit 1\n")
+    bad = _commit(repo, "break it")
+    assert workspace_key(str(repo), good, ".github/workflows/ci.yml") == workspace_key(
+        str(repo), bad, ".github/workflows/ci.yml"
+    )
+
+    result = bisect(str(repo), good, bad, ".github/workflows/ci.yml", "build", LocalBackend())
+    assert result.first_bad.rev == bad
+    assert counter.read_text().count("setup") == 1
+    assert all(r.cached >= 2 for r in result.tested[:-1])
+
+
+def test_script_edits_under_github_are_not_replayed(tmp_path):
+    repo = tmp_path / "repo"
+    workflow = repo / ".github" / "workflows" / "ci.yml"
+    script = repo / ".github" / "scripts" / "test.sh"
+    workflow.parent.mkdir(parents=True)
+    script.parent.mkdir()
+    workflow.write_text(WORKFLOW.replace("test -f ok.txt", "sh .github/scripts/test.sh").format(counter=tmp_path / "runs"))
+    (repo / "ok.txt").write_text("ok")
+    script.write_text("exit 0\n")
+    _git(repo, "init", "-q")
+    revs = [_commit(repo, "initial")]
+    for i in range(1, 6):
+        script.write_text(f"# {i}\n" + ("exit 1\n" if i >= 3 else "exit 0\n"))
+        revs.append(_commit(repo, f"script {i}"))
+    assert workspace_key(str(repo), revs[1], ".github/workflows/ci.yml") != workspace_key(
+        str(repo), revs[2], ".github/workflows/ci.yml"
+    )
+
+    result = bisect(str(repo), revs[0], revs[-1], ".github/workflows/ci.yml", "build", LocalBackend())
+    assert result.first_bad.rev == revs[3]
+    assert all(r.ok for r in result.tested if r.rev in revs[1:3])
+
+
+def test_probes_spread_over_range():
+    assert _probes(-1, 9, 1) == [4]
+    assert _probes(-1, 9, 3) == [1, 4, 6]
+    assert _probes(3, 5, 4) == [4]
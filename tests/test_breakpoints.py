@@ -0,0 +1,83 @@
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.breakpoints import (
+    ConditionalBreakpoint, DurationCondition, ExpressionCondition, FileCondition, OutputCondition, StepEvent,
+    check_breakpoints, parse_condition,
+)
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step
+
+
+def _event(index=0, exit_code=0, output="", duration=1.0, env=None, engine=None):
+    return StepEvent(index, Step(name="build", command="make"), exit_code, output, duration, env or {}, engine)
+
+
+def test_parse_condition_kinds():
+    assert isinstance(parse_condition("duration > 90"), DurationCondition)
+    assert parse_condition("duration > 1.5m").seconds == 90
+    assert parse_condition("duration>2h").seconds == 7200
+    assert isinstance(parse_condition("output ~ ERROR: .*"), OutputCondition)
+    assert parse_condition("changed dist/app.js").path == "/workspace/dist/app.js"
+    assert parse_condition("changed /etc/hosts").path == "/etc/hosts"
+    assert isinstance(parse_condition("step.exit_code == 3"), ExpressionCondition)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Empty"),
+    ("output ~ (", "Invalid regex"),
+    ("secrets.TOKEN == 'x'", "can read step and env"),
+    ("step.exit_code ==", "Unexpected|Expected"),
+])
+def test_invalid_conditions(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_condition(text)
+
+
+def test_duration_output_and_expression_checks():
+    assert parse_condition("duration > 5").check(_event(duration=6)) == "took 6.0s (> 5s)"
+    assert parse_condition("duration > 5").check(_event(duration=4)) == ""
+
+    output = parse_condition("output ~ ^FAIL")
+    assert output.check(_event(output="ok\nFAIL test_x\nmore")) == "output matched /^FAIL/: FAIL test_x"
+    assert output.check(_event(output="no failures")) == ""
+
+    expression = parse_condition("failure() && env.TARGET == 'prod'")
+    assert expression.check(_event(exit_code=1, env={"TARGET": "prod"})) != ""
+    assert expression.check(_event(exit_code=0, env={"TARGET": "prod"})) == ""
+    assert parse_condition("step.duration > 2").check(_event(duration=3)) == "step.duration > 2 is true"
+    # A condition that fails at runtime stops the run rather than being ignored
+    assert "could not be evaluated" in parse_condition("fromJSON('{')").check(_event())
+
+
+def test_scoped_breakpoints():
+    breakpoints = [
+        ConditionalBreakpoint(parse_condition("duration > 1"), step=1),
+        ConditionalBreakpoint(parse_condition("step.exit_code != 0")),
+    ]
+    assert check_breakpoints(breakpoints, _event(index=0, duration=5)) == []
+    assert len(check_breakpoints(breakpoints, _event(index=1, duration=5, exit_code=2))) == 2
+    restored = ConditionalBreakpoint.from_dict(breakpoints[0].to_dict())
+    assert restored.step == 1 and restored.text == "duration > 1"
+
+
+@pytest.mark.parametrize("mount_mode", ["rw", "sync"])
+def test_file_watch(tmp_path, mount_mode):
+    job = Job(name="j", runs_on="ubuntu-latest", docker_image="ubuntu:22.04")
+    with PipelineEngine(job=job, workdir=str(tmp_path), backend=LocalBackend(), mount_mode=mount_mode) as engine:
+        engine.setup()
+        watch = parse_condition("changed out/result.txt")
+        watch.prime(engine)
+        assert watch.check(_event(engine=engine)) == ""
+        engine.run_step(Step(name="write", command="mkdir -p out && echo 1 > out/result.txt"))
+        assert watch.check(_event(engine=engine)) == "/workspace/out/result.txt was created"
+        assert watch.check(_event(engine=engine)) == ""
+        engine.run_step(Step(name="write", command="echo 22 > out/result.txt"))
+        assert watch.check(_event(engine=engine)) == "/workspace/out/result.txt changed"
+        engine.run_step(Step(name="rm", command="rm out/result.txt"))
+        assert watch.check(_event(engine=engine)) == "/workspace/out/result.txt was deleted"
+
+
+def test_file_watch_primes_on_first_check():
+    watch = FileCondition("changed x", "x")
+    assert watch.check(_event()) == ""  # no engine: nothing to look at
+    assert not watch.primed
@@ -0,0 +1,71 @@
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.cache import StepCache, prefix_keys, run_cached
+from pipestep.history import History
+from pipestep.models import Job, Step
+
+
+def _job(*commands, image="ubuntu:22.04"):
+    return Job(
+        name="cached",
+        runs_on="ubuntu-latest",
+        docker_image=image,
+        steps=[Step(name=f"step {i}", command=c) for i, c in enumerate(commands)],
+    )
+
+
+@pytest.fixture
+def backend():
+    return LocalBackend()
+
+
+def test_prefix_keys_share_leading_steps():
+    a = prefix_keys(_job("echo 1", "echo 2", "echo 3"), "ws")
+    b = prefix_keys(_job("echo 1", "echo 2", "echo changed"), "ws")
+    assert a[:2] == b[:2]
+    assert a[2] != b[2]
+    assert prefix_keys(_job("echo 1"), "other-ws")[0] != a[0]
+    assert prefix_keys(_job("echo 1", image="debian:12"), "ws")[0] != a[0]
+
+
+def test_cached_prefix_is_not_rerun(backend, tmp_path):
+    cache = StepCache(backend)
+    counter = tmp_path / "count"
+    first = _job(f"echo x >> {counter} && echo state > /workspace/state", "cat /workspace/state")
+    runs = run_cached(first, str(tmp_path), backend, cache, "ws")
+    assert [r.exit_code for r in runs] == [0, 0]
+    assert len(cache) == 2
+
+    seen = []
+    second = _job(first.steps[0].command, "cat /workspace/state && echo more")
+    runs = run_cached(second, str(tmp_path), backend, cache, "ws", on_step=lambda r, c: seen.append(c))
+    assert seen == [True, False]
+    assert runs[1].output == "state\nmore\n"
+    assert counter.read_text() == "x\n"
+    cache.clear()
+    assert backend.images == {}
+
+
+def test_cached_failure_short_circuits(backend, tmp_path):
+    cache = StepCache(backend)
+    job = _job("exit 4", "echo never")
+    assert [r.exit_code for r in run_cached(job, str(tmp_path), backend, cache, "ws")] == [4]
+    runs = run_cached(job, str(tmp_path), backend, cache, "ws")
+    assert [r.exit_code for r in runs] == [4]
+    assert cache.hits == 1
+
+
+def test_runs_are_recorded_with_cache_state(backend, tmp_path):
+    cache = StepCache(backend)
+    history = History(str(tmp_path / "history.db"))
+    try:
+        job = _job("echo one", "echo two")
+        run_cached(job, str(tmp_path), backend, cache, "ws", history=history, workflow="/repo/ci.yml")
+        run_cached(job, str(tmp_path), backend, cache, "ws", history=history, workflow="/repo/ci.yml")
+        assert history.flush()
+        rows = history._reader.execute("SELECT step_index, cached FROM step_runs ORDER BY id").fetchall()
+        assert rows == [(0, 0), (1, 0), (0, 1), (1, 1)]
+        assert history.job_stats("/repo/ci.yml", "cached")[(1, "step 1")].count == 1
+    finally:
+        history.close()
+        cache.clear()
@@ -0,0 +1,71 @@
+import pytest
+from pipestep.expressions import (
+    ExpressionError, evaluate, evaluate_condition, interpolate, parse_expression,
+)
+
+CONTEXT = {
+    "github": {"event_name": "push", "ref": "refs/heads/main"},
+    "env": {"MODE": "Release", "COUNT": "3"},
+    "matrix": {"os": "ubuntu-latest", "node": 20, "flags": ["a", "b"]},
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("'it''s'", "it's"),
+    ("1.5", 1.5),
+    ("0xff", 255),
+    ("null", None),
+    ("github.event_name", "push"),
+    ("github['ref']", "refs/heads/main"),
+    ("github.missing.deeper", None),
+    ("env.MODE == 'release'", True),
+    ("env.COUNT == 3", True),
+    ("env.COUNT > 2 && env.COUNT < 4", True),
+    ("matrix.node >= 20", True),
+    ("!matrix.os", False),
+    ("env.MISSING || 'default'", "default"),
+    ("env.MODE && 'yes'", "yes"),
+    ("contains(matrix.flags, 'b')", True),
+    ("contains(github.ref, 'MAIN')", True),
+    ("startsWith(github.ref, 'refs/heads/')", True),
+    ("endsWith(matrix.os, '-latest')", True),
+    ("format('{0}-{1} {{x}}', matrix.os, matrix.node)", "ubuntu-latest-20 {x}"),
+    ("join(matrix.flags, '+')", "a+b"),
+    ("fromJSON('{\"a\": [1, 2]}').a[1]", 2),
+    ("(1 == 1) && (2 != 2)", False),
+])
+def test_evaluate(text, expected):
+    assert evaluate(text, CONTEXT) == expected
+
+
+def test_wrapper_is_optional():
+    assert evaluate("${{ matrix.node }}", CONTEXT) == 20
+
+
+def test_contexts_are_reported():
+    expr = parse_expression("secrets.TOKEN != '' && steps.build.outputs.ok == 'true'")
+    assert expr.contexts() == {"secrets", "steps"}
+
+
+@pytest.mark.parametrize("text", ["a ==", "(a", "a b", "'open", "a @ b", "nope(1)"])
+def test_invalid_expressions(text):
+    with pytest.raises(ExpressionError):
+        evaluate(text, CONTEXT)
+
+
+def test_conditions_use_job_status():
+    assert evaluate_condition("", CONTEXT) is True
+    assert evaluate_condition("", CONTEXT, status="failure") is False
+    assert evaluate_condition("github.event_name == 'push'", CONTEXT, status="failure") is False
+    assert evaluate_condition("failure()", CONTEXT, status="failure") is True
+    assert evaluate_condition("always() && github.event_name == 'push'", CONTEXT, status="failure") is True
+    assert evaluate_condition("${{ cancelled() }}", CONTEXT) is False
+
+
+def test_interpolate():
+    assert interpolate("node ${{ matrix.node }} on ${{ matrix.os }}", CONTEXT) == "node 20 on ubuntu-latest"
+
+
+def test_interpolate_partial_leaves_unknown_contexts():
+    text = "${{ matrix.os }} ${{ secrets.TOKEN }} ${{ bad ( }}"
+    assert interpolate(text, CONTEXT, partial=True) == "ubuntu-latest ${{ secrets.TOKEN }} ${{ bad ( }}"
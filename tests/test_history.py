@@ -0,0 +1,128 @@
+import threading
+import time
+from pipestep import history as history_module
+from pipestep.history import History, StepRecord, StepStats, default_path
+
+
+def _record(step="Build", duration=1.0, exit_code=0, cached=False, job="build", recorded=0.0, index=0):
+    return StepRecord(
+        workflow="/repo/ci.yml", job=job, step=step, image="ubuntu:22.04", backend="docker",
+        duration=duration, exit_code=exit_code, cached=cached, recorded=recorded, index=index,
+    )
+
+
+def test_default_path_honours_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPESTEP_HISTORY", str(tmp_path / "h.db"))
+    assert default_path() == str(tmp_path / "h.db")
+    monkeypatch.delenv("PIPESTEP_HISTORY")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path))
+    assert default_path() == str(tmp_path / "pipestep" / "history.db")
+
+
+def test_stats_use_recent_passing_uncached_runs(tmp_path):
+    history = History(str(tmp_path / "history.db"))
+    try:
+        for i, duration in enumerate([5.0, 1.0, 2.0, 3.0]):
+            history.record(_record(duration=duration, recorded=100.0 + i))
+        history.record(_record(duration=60.0, exit_code=1, recorded=200.0))
+        history.record(_record(duration=0.1, cached=True, recorded=201.0))
+        history.record(_record(step="Test", duration=7.0, recorded=202.0, index=1))
+        assert history.flush()
+        stats = history.job_stats("/repo/ci.yml", "build")
+        assert stats[(0, "Build")] == StepStats(median=2.5, count=4, last=3.0)
+        assert stats[(1, "Test")].count == 1
+        assert history.job_stats("/repo/ci.yml", "build", window=2)[(0, "Build")].median == 2.5
+        assert history.durations("/repo/ci.yml")[("build", 1, "Test")] == [7.0]
+    finally:
+        history.close()
+
+
+def test_history_persists_across_instances(tmp_path):
+    path = str(tmp_path / "history.db")
+    first = History(path)
+    first.record(_record(duration=4.0))
+    first.close()
+    second = History(path)
+    try:
+        assert second.job_stats("/repo/ci.yml", "build")[(0, "Build")].median == 4.0
+    finally:
+        second.close()
+
+
+def test_steps_with_the_same_name_keep_separate_stats(tmp_path):
+    history = History(str(tmp_path / "history.db"))
+    try:
+        for i in range(3):
+            history.record(_record(step="Run make", duration=1.0, index=1, recorded=100.0 + i))
+            history.record(_record(step="Run make", duration=30.0, index=3, recorded=100.5 + i))
+        assert history.flush()
+        stats = history.job_stats("/repo/ci.yml", "build")
+        assert stats[(1, "Run make")].median == 1.0
+        assert stats[(3, "Run make")].median == 30.0
+        assert not stats[(3, "Run make")].is_regression(30.0)
+        assert history.durations("/repo/ci.yml")[("build", 3, "Run make")] == [30.0] * 3
+    finally:
+        history.close()
+
+
+def test_writes_are_batched_off_the_caller_thread(tmp_path, monkeypatch):
+    writes = []
+    original = History._write
+
+    def _tracking_write(self, conn, batch):
+        writes.append((threading.current_thread().name, len(batch)))
+        original(self, conn, batch)
+
+    monkeypatch.setattr(History, "_write", _tracking_write)
+    monkeypatch.setattr(history_module, "FLUSH_INTERVAL", 0.2)
+    history = History(str(tmp_path / "history.db"))
+    try:
+        start = time.perf_counter()
+        for i in range(250):
+            history.record(_record(duration=float(i)))
+        assert time.perf_counter() - start < 0.5
+        assert history.flush()
+        assert sum(n for _, n in writes) == 250
+        assert len(writes) <= 5
+        assert all(name == "pipestep-history" for name, _ in writes)
+    finally:
+        history.close()
+
+
+def test_regression_needs_history_and_margin():
+    stats = StepStats(median=10.0, count=5, last=9.0)
+    assert stats.is_regression(20.0)
+    assert not stats.is_regression(14.0)
+    assert not StepStats(median=0.2, count=5, last=0.2).is_regression(0.5)
+    assert not StepStats(median=10.0, count=2, last=10.0).is_regression(30.0)
+    assert stats.eta(4.0) == 6.0
+    assert stats.eta(12.0) == 0.0
+
+
+def test_stats_by_resources_and_old_databases(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE step_runs (id INTEGER PRIMARY KEY, workflow TEXT NOT NULL, job TEXT NOT NULL, "
+        "step TEXT NOT NULL, image TEXT NOT NULL, backend TEXT NOT NULL, duration REAL NOT NULL, "
+        "exit_code INTEGER, cached INTEGER NOT NULL DEFAULT 0, recorded REAL NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO step_runs (workflow, job, step, image, backend, duration, exit_code, recorded) "
+        "VALUES ('/repo/ci.yml', 'build', 'Build', 'ubuntu:22.04', 'docker', 1.0, 0, 1.0)"
+    )
+    conn.commit()
+    conn.close()
+    history = History(path)
+    try:
+        small = _record(duration=9.0, recorded=2.0)
+        small.resources = "2 CPUs, 7g memory, 3g shm (private runner)"
+        history.record(small)
+        assert history.flush()
+        assert history.job_stats("/repo/ci.yml", "build", resources=small.resources)[(0, "Build")].median == 9.0
+        assert history.job_stats("/repo/ci.yml", "build", resources="") == {(-1, "Build"): StepStats(1.0, 1, 1.0)}
+        assert history.job_stats("/repo/ci.yml", "build")[(0, "Build")].count == 1
+    finally:
+        history.close()
@@ -0,0 +1,98 @@
+import threading
+from docker.errors import ImageNotFound
+from pipestep.images import collect_images, pull_image, pull_images, summarize
+from pipestep.models import Job, Step, Workflow
+
+
+class FakeImages:
+    def __init__(self, present):
+        self.present = set(present)
+
+    def get(self, image):
+        if image not in self.present:
+            raise ImageNotFound(image)
+        return image
+
+
+class FakeAPI:
+    def __init__(self, layers, gate=None):
+        self.layers = layers
+        self.gate = gate
+        self.pulls = []
+
+    def pull(self, image, stream=True, decode=True):
+        self.pulls.append(image)
+        if self.gate is not None:
+            self.gate.wait()
+        if image == "broken:1":
+            yield {"error": "manifest unknown"}
+            return
+        for layer_id in self.layers[image]:
+            yield {"status": "Pulling fs layer", "progressDetail": {}, "id": layer_id}
+            yield {"status": "Downloading", "progressDetail": {"current": 50, "total": 100}, "id": layer_id}
+            yield {"status": "Pull complete", "progressDetail": {}, "id": layer_id}
+
+
+class FakeClient:
+    def __init__(self, layers=None, present=(), gate=None):
+        self.images = FakeImages(present)
+        self.api = FakeAPI(layers or {}, gate)
+
+
+def test_collect_images_dedupes_and_includes_services():
+    wf = Workflow(name="CI", trigger="push", jobs=[
+        Job(name="a", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", services=["postgres:16"]),
+        Job(name="b", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[
+            Step(name="lint", command="", is_action=True, action_ref="docker://hadolint/hadolint:2"),
+        ]),
+    ])
+    assert collect_images(wf) == ["ubuntu:22.04", "postgres:16", "hadolint/hadolint:2"]
+
+
+def test_present_image_not_pulled():
+    client = FakeClient(present=["ubuntu:22.04"])
+    progress = pull_image(client, "ubuntu:22.04")
+    assert progress.status == "present"
+    assert client.api.pulls == []
+
+
+def test_pull_records_layers():
+    client = FakeClient(layers={"node:20": ["l1", "l2"]})
+    progress = pull_image(client, "node:20")
+    assert progress.status == "pulled"
+    assert set(progress.layers) == {"l1", "l2"}
+    assert all(layer.done for layer in progress.layers.values())
+
+
+def test_pull_error_reported():
+    client = FakeClient()
+    progress = pull_image(client, "broken:1")
+    assert progress.status == "failed"
+    assert "manifest unknown" in progress.error
+
+
+def test_concurrent_requests_share_one_pull():
+    gate = threading.Event()
+    client = FakeClient(layers={"node:20": ["l1"]}, gate=gate)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pull_image(client, "node:20"))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while not client.api.pulls:
+        pass
+    gate.set()
+    for t in threads:
+        t.join()
+    assert client.api.pulls == ["node:20"]
+    assert [r.status for r in results] == ["pulled"] * 3
+
+
+def test_pull_images_summary_counts_shared_layers():
+    client = FakeClient(layers={"a:1": ["base", "a"], "b:1": ["base", "b"]})
+    seen = []
+    results = pull_images(client, ["a:1", "b:1"], on_progress=seen.append)
+    assert [r.status for r in results] == ["pulled", "pulled"]
+    summary = summarize(results)
+    assert "2/2 images" in summary
+    assert "3 layers (1 shared)" in summary
+    assert seen
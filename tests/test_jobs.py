@@ -0,0 +1,41 @@
+from pipestep.backends import LocalBackend
+from pipestep.jobs import run_jobs, shared_prefixes
+from pipestep.models import Job, Step
+
+
+def _job(name, *commands):
+    return Job(
+        name=name,
+        runs_on="ubuntu-latest",
+        docker_image="ubuntu:22.04",
+        steps=[Step(name=f"step {i}", command=c) for i, c in enumerate(commands)],
+    )
+
+
+def test_shared_prefixes():
+    jobs = [
+        _job("a", "setup", "install", "test a"),
+        _job("b", "setup", "install", "test b"),
+        _job("c", "setup", "lint"),
+        _job("d", "other"),
+    ]
+    assert shared_prefixes(jobs, "ws") == {"a": 2, "b": 2, "c": 1, "d": 0}
+
+
+def test_shared_steps_run_once(tmp_path):
+    counter = tmp_path / "count"
+    setup = f"echo x >> {counter} && echo ready > /workspace/state"
+    jobs = [
+        _job("a", setup, "grep ready /workspace/state && echo a > /workspace/mine"),
+        _job("b", setup, "grep ready /workspace/state && test ! -e /workspace/mine"),
+        _job("c", "exit 3"),
+    ]
+    seen = []
+    results = run_jobs(jobs, str(tmp_path), LocalBackend(), parallel=3, on_job=seen.append)
+    assert counter.read_text() == "x\n"  # the shared step ran once, in the base
+    by_name = {r.job.name: r for r in results}
+    assert by_name["a"].ok and by_name["b"].ok
+    assert by_name["a"].cached == by_name["b"].cached == 1
+    assert not by_name["c"].ok and "failed at step 1" in by_name["c"].describe()
+    assert len(seen) == 3
+    assert not (tmp_path / "state").exists()  # jobs ran in synced copies
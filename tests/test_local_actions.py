@@ -0,0 +1,171 @@
+import textwrap
+import pytest
+from pipestep import local_actions
+from pipestep.backends import ACTIONS_DIR, LocalBackend
+from pipestep.engine import PipelineEngine
+from pipestep.local_actions import expand_action, expand_workflow, load_action, mirror_dirs, resolve_action
+from pipestep.models import Job, Step, Workflow
+
+
+def _write_action(directory, body):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "action.yml").write_text(textwrap.dedent(body))
+    return directory
+
+
+def _uses(ref, **inputs):
+    return Step(name="Setup", command="", is_action=True, action_ref=ref, action_with=inputs, env={"JOB": "1"})
+
+
+GREET = """\
+    name: Greet
+    inputs:
+      who:
+        required: true
+      greeting:
+        default: Hello
+    runs:
+      using: composite
+      steps:
+        - name: Say it
+          run: echo "${{ inputs.greeting }}, ${{ inputs.who }}" from ${{ github.sha }}
+          shell: bash
+          env:
+            WHO: ${{ inputs.who }}
+        - run: ${{ github.action_path }}/run.sh
+          shell: bash
+          working-directory: sub
+          if: inputs.greeting != ''
+"""
+
+
+def test_expand_substitutes_inputs_and_defaults(tmp_path):
+    _write_action(tmp_path / ".github/actions/greet", GREET)
+    steps = expand_action(_uses("./.github/actions/greet", who="world"), str(tmp_path), [])
+    assert [s.name for s in steps] == ["Setup / Say it", "Setup / /workspace/.github/actions/greet/run.sh"]
+    first, second = steps
+    # Contexts that aren't known here are left for later
+    assert first.command == 'echo "Hello, world" from ${{ github.sha }}'
+    assert first.env["WHO"] == "world"
+    assert first.env["JOB"] == "1"
+    assert first.env["GITHUB_ACTION_PATH"] == "/workspace/.github/actions/greet"
+    assert second.command == "/workspace/.github/actions/greet/run.sh"
+    assert second.working_directory == "/workspace/sub"
+    assert second.condition == "inputs.greeting != ''"
+    assert not first.is_action and first.action_source == ""
+
+
+def test_nested_composites_expand_recursively(tmp_path):
+    _write_action(tmp_path / "inner", """\
+        inputs: {msg: {default: x}}
+        runs:
+          using: composite
+          steps:
+            - run: echo inner ${{ inputs.msg }}
+    """)
+    _write_action(tmp_path / "outer", """\
+        inputs: {msg: {}}
+        runs:
+          using: composite
+          steps:
+            - uses: ./inner
+              with:
+                msg: ${{ inputs.msg }}!
+            - uses: actions/checkout@v4
+    """)
+    steps = expand_action(_uses("./outer", msg="hi"), str(tmp_path), [])
+    assert [s.command for s in steps] == ["echo inner hi!", ""]
+    assert steps[1].action_ref == "actions/checkout@v4"
+
+
+def test_cycles_are_reported(tmp_path):
+    _write_action(tmp_path / "loop", """\
+        runs:
+          using: composite
+          steps:
+            - uses: ./loop
+    """)
+    with pytest.raises(ValueError, match="nested more than"):
+        expand_action(_uses("./loop"), str(tmp_path), [])
+
+
+def test_unavailable_and_unsupported_actions(tmp_path):
+    _write_action(tmp_path / "odd", "runs: {using: perl}")
+    with pytest.raises(ValueError, match="unsupported runs.using 'perl'"):
+        expand_action(_uses("./odd"), str(tmp_path), [])
+    assert expand_action(_uses("./missing"), str(tmp_path), []) is None
+
+
+def test_builtin_equivalents_win_over_the_mirror(tmp_path):
+    _write_action(tmp_path / "actions/checkout@v4", "runs: {using: node20, main: dist/index.js}")
+    assert expand_action(_uses("actions/checkout@v4"), str(tmp_path), [str(tmp_path)]) is None
+
+
+def test_resolve_from_mirror(tmp_path, monkeypatch):
+    mirror = tmp_path / "mirror"
+    _write_action(mirror / "acme/tools@v2/lint", "runs: {using: composite, steps: []}")
+    _write_action(mirror / "acme/any", "runs: {using: composite, steps: []}")
+    resolved = resolve_action("acme/tools/lint@v2", str(tmp_path), [str(mirror)])
+    assert resolved.source == str(mirror / "acme/tools@v2/lint")
+    assert resolved.path == f"{ACTIONS_DIR}/acme/tools@v2/lint"
+    assert not resolved.in_workspace
+    assert resolve_action("acme/any@main", str(tmp_path), [str(mirror)]).source == str(mirror / "acme/any")
+    assert resolve_action("acme/tools@v3", str(tmp_path), [str(mirror)]) is None
+    assert resolve_action("docker://alpine:3", str(tmp_path), [str(mirror)]) is None
+
+    monkeypatch.setenv("PIPESTEP_ACTION_MIRROR", str(mirror))
+    assert mirror_dirs("/extra") == ["/extra", str(mirror)]
+
+
+def test_definitions_cached_by_content(tmp_path):
+    action = _write_action(tmp_path / "a", "name: one\nruns: {using: composite, steps: []}\n")
+    first = load_action(str(action))
+    assert load_action(str(action)) is first
+    (action / "action.yml").write_text("name: two\nruns: {using: composite, steps: []}\n")
+    assert load_action(str(action)).name == "two"
+    assert str(action / "action.yml") in local_actions._definitions
+
+
+def test_invalid_action_file(tmp_path):
+    _write_action(tmp_path / "bad", "name: no runs\n")
+    with pytest.raises(ValueError, match="no 'runs' section"):
+        load_action(str(tmp_path / "bad"))
+
+
+def test_expand_workflow_warns_and_keeps_unknown_steps(tmp_path, capsys):
+    _write_action(tmp_path / "greet", GREET)
+    job = Job(name="j", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[
+        Step(name="before", command="true"),
+        _uses("./greet"),
+        _uses("./nowhere"),
+    ])
+    workflow = Workflow(name="w", trigger="on: push", jobs=[job])
+    expand_workflow(workflow, str(tmp_path), [])
+    assert [s.name.split(" / ")[0] for s in job.steps] == ["before", "Setup", "Setup", "Setup"]
+    assert job.steps[-1].action_ref == "./nowhere"
+    assert any("missing required inputs: who" in w for w in workflow.warnings)
+    assert any("./nowhere not found" in w for w in workflow.warnings)
+    assert "Warning" in capsys.readouterr().err
+
+
+def test_mirrored_action_files_copied_into_container(tmp_path):
+    mirror = tmp_path / "mirror"
+    action = _write_action(mirror / "acme/hello@v1", """\
+        runs:
+          using: composite
+          steps:
+            - run: bash ${{ github.action_path }}/hello.sh
+    """)
+    (action / "hello.sh").write_text('echo "hello from $GITHUB_ACTION_PATH"\n')
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    steps = expand_action(_uses("acme/hello@v1"), str(workdir), [str(mirror)])
+    assert steps[0].action_source == str(action)
+
+    job = Job(name="j", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=steps)
+    with PipelineEngine(job=job, workdir=str(workdir), backend=LocalBackend()) as engine:
+        engine.setup()
+        result = engine.run_step(steps[0])
+        assert result.exit_code == 0, result.stderr
+        assert "hello from" in result.stdout
+        assert engine.run_step(steps[0]).exit_code == 0  # copied once, reused
@@ -0,0 +1,32 @@
+import os
+import threading
+from pipestep.logs import LogStore
+
+
+def test_handles_read_back_their_slice(tmp_path):
+    store = LogStore(str(tmp_path / "out.log"))
+    first = store.append("hello\n")
+    second = store.append("world\n")
+    assert (first.read(), second.read()) == ("hello\n", "world\n")
+    assert (tmp_path / "out.log").read_text() == "hello\nworld\n"
+    store.close()
+    assert (tmp_path / "out.log").exists()  # a store given a path keeps it
+
+
+def test_concurrent_appends(tmp_path):
+    store = LogStore()
+    handles = []
+
+    def _write(n):
+        handles.extend(store.append(f"{n}-" * 100) for _ in range(20))
+
+    threads = [threading.Thread(target=_write, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted({h.read()[:2] for h in handles}) == ["0-", "1-", "2-", "3-"]
+    assert all(len(set(h.read().split("-")[:-1])) == 1 for h in handles)
+    path = store.path
+    store.close()
+    assert not os.path.exists(path)
@@ -1,4 +1,5 @@
-from pipestep.models import Step, Job, Workflow, StepResult, StepStatus
+import pytest
+from pipestep.models import Step, Job, Workflow, StepResult, StepStatus, layered_env
 
 
 def test_step_defaults():
@@ -40,3 +41,28 @@ def test_step_status_values():
     assert StepStatus.COMPLETED.value == "completed"
     assert StepStatus.FAILED.value == "failed"
     assert StepStatus.SKIPPED.value == "skipped"
+
+
+def test_models_are_slotted():
+    step = Step(name="s", command="true")
+    with pytest.raises(AttributeError):
+        step.not_a_field = 1
+
+
+def test_step_output_is_stored_on_disk():
+    step = Step(name="s", command="true")
+    step.output = "line 1\nüñí\n"
+    assert step.output_log is not None and step.output_log.length == len("line 1\nüñí\n".encode())
+    assert step.output == "line 1\nüñí\n"
+    step.output = ""
+    assert step.output_log is None and step.output == ""
+
+
+def test_layered_env_shares_parent_layers():
+    workflow_env = {"A": "1", "B": "1"}
+    job_env = layered_env(workflow_env, {"B": "2"})
+    step_env = layered_env(job_env, {"C": "3"})
+    assert dict(step_env) == {"A": "1", "B": "2", "C": "3"}
+    assert step_env.maps[1] is job_env.maps[0] and step_env.maps[2] is workflow_env
+    workflow_env["A"] = "changed"
+    assert step_env["A"] == "changed"
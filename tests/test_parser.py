@@ -1,7 +1,8 @@
 import os
 import tempfile
 import pytest
-from pipestep.parser import parse_workflow
+import yaml
+from pipestep.parser import parse_workflow, expand_matrix
 
 FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
 
@@ -17,6 +18,7 @@ def _write_yaml(content: str) -> str:
 def test_parse_workflow_name():
     wf = parse_workflow(os.path.join(FIXTURES, "simple_workflow.yml"))
     assert wf.name == "Test CI"
+    assert wf.path == os.path.join(os.path.abspath(FIXTURES), "simple_workflow.yml")
 
 
 def test_parse_trigger():
@@ -282,3 +284,283 @@ jobs:
     wf = parse_workflow(path)
     assert len(wf.jobs[0].steps) == 1
     os.unlink(path)
+
+
+def test_service_images_parsed():
+    path = _write_yaml("""
+name: Services
+"on": push
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    services:
+      db:
+        image: postgres:16
+      cache: redis:7
+    steps:
+      - run: echo hi
+""")
+    wf = parse_workflow(path)
+    assert wf.jobs[0].services == ["postgres:16", "redis:7"]
+    os.unlink(path)
+
+
+def test_conditions_and_matrix_parsed():
+    path = _write_yaml("""
+name: Matrix
+"on": push
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    if: github.ref == 'refs/heads/main'
+    strategy:
+      matrix:
+        os: [ubuntu-latest]
+        python: ["3.11", "3.12"]
+    steps:
+      - uses: actions/checkout@v4
+        if: ${{ always() }}
+      - run: echo hi
+        if: false
+      - run: echo unconditional
+""")
+    wf = parse_workflow(path)
+    job = wf.jobs[0]
+    assert job.condition == "github.ref == 'refs/heads/main'"
+    assert job.matrix == {"os": ["ubuntu-latest"], "python": ["3.11", "3.12"]}
+    assert [s.condition for s in job.steps] == ["${{ always() }}", "false", ""]
+    os.unlink(path)
+
+
+def test_timeout_minutes_parsed():
+    path = _write_yaml("""
+name: Timeouts
+"on": push
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    timeout-minutes: 30
+    steps:
+      - run: make
+        timeout-minutes: 2.5
+      - uses: actions/checkout@v4
+        timeout-minutes: 1
+      - run: make test
+        timeout-minutes: ${{ matrix.timeout }}
+""")
+    wf = parse_workflow(path)
+    job = wf.jobs[0]
+    assert job.timeout_minutes == 30
+    assert [s.timeout_minutes for s in job.steps] == [2.5, 1, 0]
+    assert any("timeout-minutes" in w for w in wf.warnings)
+    os.unlink(path)
+
+
+def test_container_options_parsed():
+    path = _write_yaml("""
+name: Options
+"on": push
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    container:
+      image: node:20
+      options: --cpus 2 --user 1001
+    steps:
+      - run: make
+  bad:
+    runs-on: ubuntu-latest
+    container:
+      image: node:20
+      options: --memory lots
+    steps:
+      - run: make
+""")
+    wf = parse_workflow(path)
+    assert wf.jobs[0].container_options == "--cpus 2 --user 1001"
+    assert wf.jobs[1].container_options == ""
+    assert any("--user 1001 aren't applied locally" in w for w in wf.warnings)
+    assert any("'--memory lots' are ignored: Invalid size" in w for w in wf.warnings)
+    os.unlink(path)
+
+
+def test_shell_from_step_job_and_workflow_defaults():
+    path = _write_yaml("""
+name: Shells
+"on": push
+defaults:
+  run:
+    shell: sh
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    defaults:
+      run:
+        shell: python
+    steps:
+      - run: print(1)
+      - run: echo $0
+        shell: bash
+      - run: dir
+        shell: cmd
+  test:
+    runs-on: ubuntu-latest
+    steps:
+      - run: echo hi
+      - run: print 1
+        shell: perl {0}
+""")
+    wf = parse_workflow(path)
+    assert [s.shell for s in wf.jobs[0].steps] == ["python", "bash", "cmd"]
+    assert [s.shell for s in wf.jobs[1].steps] == ["sh", "perl {0}"]
+    assert any("'cmd' is only available on Windows runners" in w for w in wf.warnings)
+    os.unlink(path)
+
+
+def test_expand_matrix_include_exclude():
+    matrix = {
+        "os": ["linux", "windows"],
+        "node": [18, 20],
+        "exclude": [{"os": "windows", "node": 18}],
+        "include": [
+            {"os": "linux", "experimental": True},
+            {"os": "macos", "node": 20},
+        ],
+    }
+    assert expand_matrix(matrix) == [
+        {"os": "linux", "node": 18, "experimental": True},
+        {"os": "linux", "node": 20, "experimental": True},
+        {"os": "windows", "node": 20},
+        {"os": "macos", "node": 20},
+    ]
+    assert expand_matrix({}) == [{}]
+    assert expand_matrix({"include": [{"a": 1}, {"a": 2}]}) == [{"a": 1}, {"a": 2}]
+
+
+def _write_workflows(tmp_path, files: dict) -> str:
+    """Write workflow files into tmp_path/.github/workflows and return the first one's path."""
+    directory = tmp_path / ".github" / "workflows"
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, content in files.items():
+        (directory / name).write_text(content)
+    return str(directory / next(iter(files)))
+
+
+def test_reusable_workflow_jobs_are_inlined(tmp_path):
+    path = _write_workflows(tmp_path, {
+        "ci.yml": """
+name: CI
+"on": push
+jobs:
+  lint:
+    runs-on: ubuntu-latest
+    steps:
+      - run: make lint
+  build:
+    if: github.event_name == 'push'
+    uses: ./.github/workflows/build.yml
+    with:
+      target: release
+    secrets:
+      token: ${{ secrets.DEPLOY_TOKEN }}
+  remote:
+    uses: octo/shared/.github/workflows/x.yml@v1
+""",
+        "build.yml": """
+"on":
+  workflow_call:
+    inputs:
+      target:
+        required: true
+      jobs:
+        default: 2
+env:
+  TOKEN: ${{ secrets.token }}
+jobs:
+  compile:
+    runs-on: ubuntu-22.04
+    steps:
+      - run: make -j ${{ inputs.jobs }} ${{ inputs.target }}
+  package:
+    uses: ./.github/workflows/package.yml
+    with:
+      name: app-${{ inputs.target }}
+""",
+        "package.yml": """
+"on": workflow_call
+jobs:
+  tar:
+    runs-on: ubuntu-latest
+    steps:
+      - run: tar czf ${{ inputs.name }}.tgz out
+""",
+    })
+    wf = parse_workflow(path)
+    assert [j.name for j in wf.jobs] == ["lint", "build/compile", "build/package/tar", "remote"]
+    compile_job = wf.jobs[1]
+    assert compile_job.steps[0].command == "make -j 2 release"
+    assert compile_job.env["TOKEN"] == "${{ secrets.DEPLOY_TOKEN }}"
+    assert compile_job.condition == "github.event_name == 'push'"
+    assert compile_job.docker_image == "ubuntu:22.04"
+    assert wf.jobs[2].steps[0].command == "tar czf app-release.tgz out"
+    assert wf.jobs[3].steps == []
+    assert any("'octo/shared/.github/workflows/x.yml@v1' is in another repository" in w for w in wf.warnings)
+
+
+def test_reusable_workflow_cycle(tmp_path):
+    path = _write_workflows(tmp_path, {
+        "a.yml": '"on": push\njobs:\n  call:\n    uses: ./.github/workflows/b.yml\n',
+        "b.yml": '"on": workflow_call\njobs:\n  back:\n    uses: ./.github/workflows/a.yml\n',
+    })
+    with pytest.raises(ValueError, match="cycle: .github/workflows/a.yml → .github/workflows/b.yml → .github/workflows/a.yml"):
+        parse_workflow(path)
+
+
+def test_reusable_workflows_are_cached_by_content(tmp_path, monkeypatch):
+    import pipestep.parser as parser
+
+    callers = "".join(f"  call{i}:\n    uses: ./.github/workflows/shared.yml\n" for i in range(20))
+    path = _write_workflows(tmp_path, {
+        "ci.yml": f'"on": push\njobs:\n{callers}',
+        "shared.yml": '"on": workflow_call\njobs:\n  test:\n    runs-on: ubuntu-latest\n    steps:\n      - run: make test\n',
+    })
+    loads = []
+    real_load = yaml.safe_load
+    monkeypatch.setattr(parser.yaml, "safe_load", lambda content: loads.append(1) or real_load(content))
+    wf = parse_workflow(path)
+    assert len(wf.jobs) == 20 and len(loads) == 2
+    assert wf.jobs[0].steps[0] is not wf.jobs[1].steps[0]
+    shared = tmp_path / ".github" / "workflows" / "shared.yml"
+    shared.write_text(shared.read_text().replace("make test", "make check"))
+    wf = parse_workflow(path)
+    assert len(loads) == 3 and wf.jobs[5].steps[0].command == "make check"
+
+
+def test_parsed_workflows_do_not_share_cached_data(tmp_path):
+    path = _write_workflows(tmp_path, {
+        "main.yml": '"on": push\njobs:\n  call:\n    strategy:\n      matrix:\n        py: ["3.11"]\n'
+                    "    uses: ./.github/workflows/lib.yml\n",
+        "lib.yml": '"on": workflow_call\njobs:\n  test:\n    runs-on: ubuntu-latest\n    steps:\n      - run: make\n',
+    })
+    first = parse_workflow(path)
+    first.jobs[0].matrix["py"].append("X")
+    first.jobs[0].steps[0].env["LEAK"] = "1"
+    second = parse_workflow(path)
+    assert second.jobs[0].matrix == {"py": ["3.11"]}
+    assert "LEAK" not in second.jobs[0].steps[0].env
+
+
+def test_parsed_file_cache_is_bounded_and_shared_across_checkouts(tmp_path, monkeypatch):
+    import pipestep.parser as parser
+
+    monkeypatch.setattr(parser, "MAX_FILES", 3)
+    loads = []
+    real_load = yaml.safe_load
+    monkeypatch.setattr(parser.yaml, "safe_load", lambda content: loads.append(1) or real_load(content))
+    workflow = '"on": push\njobs:\n  build:\n    runs-on: ubuntu-latest\n    steps:\n      - run: echo {}\n'
+    for i in range(10):
+        parse_workflow(_write_workflows(tmp_path / f"checkout{i}", {"ci.yml": workflow.format(i)}))
+        assert len(parser._files) <= 3
+    assert len(loads) == 10
+    parse_workflow(_write_workflows(tmp_path / "again", {"ci.yml": workflow.format(9)}))
+    assert len(loads) == 10
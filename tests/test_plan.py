@@ -0,0 +1,66 @@
+import json
+from pipestep.backends import LocalBackend
+from pipestep.models import Job, Step, Workflow
+from pipestep.plan import decide, format_plan, plan_workflow
+from pipestep.session import historical_durations
+
+
+def _workflow():
+    job = Job(
+        name="test",
+        runs_on="ubuntu-latest",
+        docker_image="ubuntu:22.04",
+        matrix={"python": ["3.11", "3.12"]},
+        steps=[
+            Step(name="Checkout", command="", is_action=True, action_ref="actions/checkout@v4"),
+            Step(name="Custom", command="", is_action=True, action_ref="someone/custom@v1"),
+            Step(name="Test", command="pytest"),
+            Step(name="Only 3.12", command="coverage", condition="matrix.python == '3.12'"),
+            Step(name="Deploy", command="./deploy", condition="secrets.TOKEN != ''"),
+        ],
+    )
+    return Workflow(name="CI", trigger="on: push", jobs=[job])
+
+
+def test_plan_expands_matrix_and_conditions(tmp_path):
+    plan = plan_workflow(_workflow(), LocalBackend(), str(tmp_path))
+    assert [p.label for p in plan.jobs] == ["test [python=3.11]", "test [python=3.12]"]
+    first, second = plan.jobs
+    assert [s.kind for s in first.steps] == ["equivalent", "manual", "run", "run", "run"]
+    assert not first.steps[3].decision.runs
+    assert second.steps[3].decision.runs
+    assert first.steps[4].decision.runtime
+    assert first.pauses == 1
+    assert plan.images[0].status == "host"
+
+
+def test_plan_uses_recorded_durations(tmp_path):
+    session = tmp_path / "pipestep-session-1.jsonl"
+    records = [{"type": "session", "version": 1, "job": "test"}] + [
+        {"type": "step", "index": i, "step": name, "duration": d, "exit_code": 0}
+        for i, name, d in [(0, "Checkout", 0.5), (2, "Test", 10.0), (2, "Test", 12.0), (3, "Deploy", 1.0)]
+    ]
+    session.write_text("\n".join(json.dumps(r) for r in records))
+    durations = historical_durations([str(session), str(tmp_path / "missing.jsonl")])
+    assert durations[("test", 2, "Test")] == [10.0, 12.0]
+
+    workflow = _workflow()
+    workflow.jobs[0].steps = [s for s in workflow.jobs[0].steps if s.name != "Only 3.12"]
+    plan = plan_workflow(workflow, LocalBackend(), str(tmp_path), durations)
+    job_plan = plan.jobs[0]
+    assert job_plan.steps[2].estimate == 11.0
+    assert job_plan.estimate == 12.5
+    assert any("~12.5s" in line for line in format_plan(plan))
+
+
+def test_job_condition_skips_job(tmp_path):
+    workflow = _workflow()
+    workflow.jobs[0].condition = "github.event_name == 'pull_request'"
+    plan = plan_workflow(workflow, LocalBackend(), str(tmp_path))
+    assert not plan.jobs[0].decision.runs
+    assert "skipped" in "\n".join(format_plan(plan))
+
+
+def test_unparseable_condition_is_left_to_runtime():
+    decision = decide("hashFiles('**/lock') != ''", {})
+    assert decision.runs and decision.runtime
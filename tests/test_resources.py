@@ -0,0 +1,99 @@
+import os
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.engine import PipelineEngine
+from pipestep.jobs import run_jobs
+from pipestep.models import Job, Step
+from pipestep.resources import (
+    Resources, format_cpuset, job_resources, parse_cpuset, parse_options, partition_cores, runner_size,
+)
+
+
+def _job(runs_on="ubuntu-latest", options="", steps=None):
+    return Job(name="build", runs_on=runs_on, docker_image="ubuntu:22.04", steps=steps or [], container_options=options)
+
+
+@pytest.mark.parametrize("label, cpus, memory, size", [
+    ("ubuntu-latest", 4, "16g", "public"),
+    ("ubuntu-22.04", 4, "16g", "public"),
+    ("private", 2, "7g", "private"),
+    ("ubuntu-22.04-16core", 16, "64g", "16-core"),
+    ("ubuntu-latest-8-cores", 8, "32g", "8-core"),
+    ("4-core", 4, "16g", "4-core"),
+])
+def test_runner_sizes(label, cpus, memory, size):
+    resources = runner_size(label)
+    assert (resources.cpus, resources.memory, resources.size) == (cpus, memory, size)
+
+
+def test_unknown_runners_are_unlimited():
+    assert not runner_size("self-hosted").limited
+    assert not runner_size("none").limited
+    assert runner_size("none").describe() == "unlimited"
+
+
+def test_parse_container_options():
+    values, ignored = parse_options("--cpus 1.5 --memory=2G -m 3g --privileged --tmpfs /tmp:rw,size=512m --tmpfs /run")
+    assert values == {"cpus": 1.5, "memory": "3g", "tmp_size": "512m"}
+    assert ignored == ["--privileged", "--tmpfs /run"]
+    assert parse_options("--tmpfs /tmp")[0] == {"tmp_size": "50%"}
+    with pytest.raises(ValueError, match="Invalid size"):
+        parse_options("--shm-size lots")
+    with pytest.raises(ValueError, match="needs a value"):
+        parse_options("--cpus")
+
+
+def test_job_resources_layering():
+    resources = job_resources(_job(options="--cpus 2 --pids-limit 512"), overrides={"memory": "4g", "cpuset": "0-1"})
+    assert resources == Resources(
+        cpus=2, cpuset="0-1", memory="4g", pids=512, shm_size="8g", size="public",
+    )
+    assert resources.describe() == "2 CPUs, cores 0-1, 4g memory, 512 pids, 8g shm (public runner)"
+    assert not job_resources(_job(), "none").limited
+    assert job_resources(_job(runs_on="self-hosted"), "private").cpus == 2
+    with pytest.raises(ValueError, match="Unknown runner size"):
+        job_resources(_job(), "huge")
+
+
+def test_docker_options():
+    options = Resources(cpus=1.5, cpuset="2,3", memory="1g", pids=100, shm_size="256m", tmp_size="1g").docker_options()
+    assert options == {
+        "nano_cpus": 1_500_000_000, "cpuset_cpus": "2,3", "mem_limit": "1g", "pids_limit": 100,
+        "shm_size": "256m", "tmpfs": {"/tmp": "rw,exec,nosuid,size=1g"},
+    }
+    assert Resources().docker_options() == {}
+
+
+def test_cpusets():
+    assert parse_cpuset("0-2,5,7-8") == [0, 1, 2, 5, 7, 8]
+    assert format_cpuset([8, 0, 1, 2, 5, 7]) == "0-2,5,7-8"
+    assert partition_cores(3, list(range(8))) == ["0-2", "3-5", "6-7"]
+    assert partition_cores(3, [0, 1]) == ["0", "1", "0"]
+    assert partition_cores(0, [0, 1]) == []
+
+
+def _allowed_cores(output):
+    line = next(l for l in output.splitlines() if l.startswith("Cpus_allowed_list"))
+    return line.split(":", 1)[1].strip()
+
+
+def test_local_backend_pins_steps_to_a_cpuset(tmp_path):
+    core = min(os.sched_getaffinity(0))
+    job = _job(runs_on="self-hosted")
+    engine = PipelineEngine(job=job, workdir=str(tmp_path), backend=LocalBackend(), resources=Resources(cpuset=str(core)))
+    with engine:
+        engine.setup()
+        result = engine.run_step(Step(name="cores", command="cat /proc/self/status"))
+    assert _allowed_cores(result.stdout) == str(core)
+
+
+def test_run_jobs_pins_each_job(tmp_path):
+    jobs = [
+        Job(name=name, runs_on="self-hosted", docker_image="ubuntu:22.04", steps=[
+            Step(name=f"{name} cores", command="cat /proc/self/status"),
+        ])
+        for name in ("a", "b")
+    ]
+    results = run_jobs(jobs, str(tmp_path), LocalBackend(), parallel=2, pin_cores=True)
+    expected = set(partition_cores(2))
+    assert {_allowed_cores(r.runs[0].output) for r in results} <= expected
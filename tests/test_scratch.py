@@ -0,0 +1,116 @@
+import os
+import pytest
+from docker.errors import NotFound
+from pipestep.backends import DockerBackend, LocalBackend
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step
+from pipestep.resources import Resources
+from pipestep.scratch import TOOL_CACHE, ScratchMount, parse_scratch, persist_to_volumes
+from pipestep.teardown import collect_garbage
+
+
+def _job():
+    return Job(name="build", runs_on="self-hosted", docker_image="ubuntu:22.04")
+
+
+def test_parse_scratch():
+    mounts = parse_scratch("temp, tool-cache:2G, build/:4g, ./node_modules, /var/cache/apt", size="1g")
+    assert mounts == [
+        ScratchMount("/tmp", "1g", "RUNNER_TEMP"),
+        ScratchMount(TOOL_CACHE, "2g", "RUNNER_TOOL_CACHE"),
+        ScratchMount("/workspace/build", "4g"),
+        ScratchMount("/workspace/node_modules", "1g"),
+        ScratchMount("/var/cache/apt", "1g"),
+    ]
+    assert [m.in_workspace for m in mounts] == [False, False, True, True, False]
+    assert parse_scratch("") == []
+    assert parse_scratch("build,build:2g") == [ScratchMount("/workspace/build", "2g")]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("../out", "inside the workspace"),
+    (".", "inside the workspace"),
+    ("/", "Can't put"),
+    ("build:huge", "Invalid size"),
+])
+def test_invalid_scratch(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse_scratch(spec)
+
+
+def test_volumes_are_per_job_and_directory():
+    first, second, other = parse_scratch("target"), parse_scratch("target"), parse_scratch("target")
+    persist_to_volumes(first, "test (linux)", "/src/app")
+    persist_to_volumes(second, "test (linux)", "/src/app")
+    persist_to_volumes(other, "test (linux)", "/src/other")
+    assert first[0].volume == second[0].volume != other[0].volume
+    assert first[0].volume.startswith("pipestep-scratch-test--linux--")
+    assert first[0].volume.endswith("-workspace-target")
+    assert first[0].describe() == f"/workspace/target, kept in volume {first[0].volume}"
+
+
+def test_docker_start_mounts_tmpfs_and_volumes():
+    calls = {}
+
+    class FakeVolumes:
+        def get(self, name):
+            raise NotFound(name)
+
+        def create(self, name, labels):
+            calls["volume"] = (name, labels)
+
+    class FakeContainers:
+        def run(self, **kwargs):
+            calls["run"] = kwargs
+
+    class FakeClient:
+        volumes = FakeVolumes()
+        containers = FakeContainers()
+
+    backend = DockerBackend()
+    backend._client = FakeClient()
+    scratch = [ScratchMount("/tmp", "1g", volume="pipestep-scratch-x"), ScratchMount("/workspace/build")]
+    backend.start("ubuntu:22.04", "job", "/src", {}, resources=Resources(tmp_size="512m"), scratch=scratch)
+    run = calls["run"]
+    assert run["tmpfs"] == {"/tmp": "rw,exec,size=1g", "/workspace/build": "rw,exec"}
+    assert run["volumes"]["pipestep-scratch-x"] == {"bind": "/.pipestep-scratch/pipestep-scratch-x", "mode": "rw"}
+    assert calls["volume"] == ("pipestep-scratch-x", {"pipestep": "scratch"})
+
+
+def test_local_scratch_persists_between_sessions(tmp_path):
+    scratch = parse_scratch("temp,tool-cache")
+    persist_to_volumes(scratch, f"build-{os.getpid()}", str(tmp_path))
+    backend = LocalBackend()
+    engine = PipelineEngine(job=_job(), workdir=str(tmp_path), backend=backend, scratch=scratch)
+    try:
+        with engine:
+            engine.setup()
+            result = engine.run_step(Step(name="cache", command="echo cached > $RUNNER_TOOL_CACHE/tool; echo $TMPDIR"))
+            if os.access("/dev/shm", os.W_OK):
+                assert result.stdout.startswith("/dev/shm/")
+
+            image = engine.commit()
+            fork = engine.fork(image, "f")
+            try:
+                assert fork.run_step(Step(name="read", command=f"cat {TOOL_CACHE}/tool")).stdout == "cached\n"
+            finally:
+                fork.cleanup()
+                backend.remove_image(image)
+        assert not os.listdir(tmp_path)  # nothing was written to the workspace
+
+        with PipelineEngine(job=_job(), workdir=str(tmp_path), backend=backend, scratch=scratch) as again:
+            again.setup()
+            assert again.run_step(Step(name="read", command="cat $RUNNER_TOOL_CACHE/tool")).stdout == "cached\n"
+        volumes = [r for r in backend.list_resources() if r.name in {m.volume for m in scratch}]
+        assert [r.kind for r in volumes] == ["volume", "volume"]
+        assert not [r for r in collect_garbage(backend, dry_run=True) if r in volumes]
+    finally:
+        for resource in backend.list_resources():
+            if resource.name in {m.volume for m in scratch}:
+                backend.remove_resource(resource)
+
+
+def test_local_backend_refuses_workspace_scratch(tmp_path):
+    engine = PipelineEngine(job=_job(), workdir=str(tmp_path), backend=LocalBackend(), scratch=parse_scratch("build"))
+    with engine, pytest.raises(RuntimeError, match="can't put workspace directories"):
+        engine.setup()
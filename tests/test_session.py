@@ -0,0 +1,112 @@
+import json
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.models import Job, Step
+from pipestep.runner import output_hash, run_steps, runnable_step
+from pipestep.session import SessionRecorder, load_session, replay_session, replay_sessions
+
+
+@pytest.fixture
+def job():
+    return Job(
+        name="build",
+        runs_on="ubuntu-latest",
+        docker_image="ubuntu:22.04",
+        steps=[
+            Step(name="Greet", command='echo "hello $WHO"', env={"WHO": "world"}),
+            Step(name="Checkout", command="", is_action=True, action_ref="actions/checkout@v4"),
+            Step(name="Fail", command="echo oops; exit 3"),
+        ],
+        env={"CI": "true"},
+    )
+
+
+def _record(job, tmp_path, outputs):
+    recorder = SessionRecorder("CI", job, workdir=str(tmp_path))
+    for index, (step, code, output) in outputs.items():
+        recorder.record_step(index, step, "run", 1000.0, 0.5, code, output)
+    recorder.record_event("skip", job.steps[-1].name)
+    path = tmp_path / "session.jsonl"
+    recorder.save(str(path))
+    return path
+
+
+def test_session_file_is_json_lines(job, tmp_path):
+    path = _record(job, tmp_path, {0: (job.steps[0], 0, "hello world\n")})
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines[0]["type"] == "session"
+    assert lines[0]["image"] == "ubuntu:22.04"
+    assert lines[0]["resources"]["cpus"] == 0
+    step = lines[1]
+    assert step["env"] == {"CI": "true", "WHO": "world"}
+    assert step["cwd"] == "/workspace"
+    assert step["exit_code"] == 0
+    assert step["output_sha256"] == output_hash("hello world\n")
+    assert lines[2]["type"] == "event"
+    assert lines[2]["action"] == "skip"
+
+
+def test_load_rejects_non_session(tmp_path):
+    path = tmp_path / "other.jsonl"
+    path.write_text('{"type": "step"}\n')
+    with pytest.raises(ValueError, match="Not a pipestep session"):
+        load_session(str(path))
+
+
+def test_session_to_job_uses_recorded_steps(job, tmp_path):
+    path = _record(job, tmp_path, {0: (job.steps[0], 0, ""), 2: (job.steps[2], 3, "")})
+    replay_job = load_session(str(path)).to_job()
+    assert [s.name for s in replay_job.steps] == ["Greet", "Fail"]
+    assert replay_job.steps[0].env["CI"] == "true"
+
+
+def test_runnable_step_for_actions(job):
+    assert runnable_step(job.steps[0]) is job.steps[0]
+    assert "actions/checkout" not in runnable_step(job.steps[1]).command
+    assert runnable_step(Step(name="x", command="", is_action=True, action_ref="someone/unknown@v1")) is None
+
+
+def test_run_steps_stops_on_failure(job, tmp_path):
+    from pipestep.engine import PipelineEngine
+    steps = [job.steps[2], job.steps[0]]
+    with PipelineEngine(job=job, workdir=str(tmp_path), backend=LocalBackend()) as engine:
+        engine.setup()
+        runs = run_steps(engine, steps)
+        assert [r.exit_code for r in runs] == [3]
+        runs = run_steps(engine, steps, stop_on_failure=False)
+        assert [r.exit_code for r in runs] == [3, 0]
+
+
+def test_replay_reproduces_recording(job, tmp_path):
+    path = _record(job, tmp_path, {
+        0: (job.steps[0], 0, "hello world\n"),
+        2: (job.steps[2], 3, "oops\n"),
+    })
+    report = replay_session(load_session(str(path)), str(tmp_path), LocalBackend(), repeat=2)
+    assert report.ok, report.error
+    assert all(len(o.runs) == 2 for o in report.outcomes)
+    assert not any(o.nondeterministic for o in report.outcomes)
+
+
+def test_replay_reports_changed_output(job, tmp_path):
+    path = _record(job, tmp_path, {0: (job.steps[0], 0, "hello mars\n")})
+    report = replay_session(load_session(str(path)), str(tmp_path), LocalBackend())
+    assert not report.ok
+    outcome = report.outcomes[0]
+    assert outcome.exit_matches and not outcome.output_matches
+    assert "-hello mars" in outcome.output_diff()
+    assert "+hello world" in outcome.output_diff()
+
+
+def test_replay_flags_nondeterministic_steps(tmp_path):
+    job = Job(name="j", runs_on="ubuntu-latest", docker_image="ubuntu:22.04",
+              steps=[Step(name="Random", command="echo $RANDOM$RANDOM")])
+    path = _record(job, tmp_path, {0: (job.steps[0], 0, "")})
+    report = replay_session(load_session(str(path)), str(tmp_path), LocalBackend(), repeat=3)
+    assert report.outcomes[0].nondeterministic
+
+
+def test_replay_sessions_in_parallel(job, tmp_path):
+    path = _record(job, tmp_path, {0: (job.steps[0], 0, "hello world\n")})
+    reports = replay_sessions([str(path)] * 3, backend_factory=LocalBackend, parallel=3)
+    assert [r.ok for r in reports] == [True, True, True]
@@ -0,0 +1,72 @@
+import shutil
+
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.engine import TIMEOUT_EXIT_CODE, PipelineEngine
+from pipestep.models import Job, Step
+from pipestep.shells import check_shell, program, script_suffix, shell_argv
+
+
+def _engine(tmp_path, **kwargs):
+    job = Job(name="j", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", env={"GREETING": "hello"})
+    return PipelineEngine(job=job, workdir=str(tmp_path), backend=LocalBackend(), **kwargs)
+
+
+def test_templates():
+    assert shell_argv("bash", "/tmp/s.sh") == ["bash", "--noprofile", "--norc", "-eo", "pipefail", "/tmp/s.sh"]
+    assert shell_argv("pwsh", "/tmp/s.ps1") == ["pwsh", "-command", ". '/tmp/s.ps1'"]
+    assert shell_argv("perl -w {0}", "/tmp/s") == ["perl", "-w", "/tmp/s"]
+    assert script_suffix("python") == ".py"
+    assert script_suffix("/usr/bin/python3 -u {0}") == ".py"
+    assert script_suffix("perl {0}") == ""
+    assert program("pwsh") == "pwsh"
+
+
+@pytest.mark.parametrize("shell, message", [
+    ("cmd", "only available on Windows"),
+    ("powershell", "only available on Windows"),
+    ("zsh", "Unknown shell 'zsh'"),
+])
+def test_unsupported_shells(shell, message):
+    with pytest.raises(ValueError, match=message):
+        check_shell(shell)
+
+
+def test_shells_run_the_script_from_a_file(tmp_path):
+    with _engine(tmp_path) as engine:
+        engine.setup()
+        result = engine.run_step(Step(name="sh", command="echo $0\nfalse\necho unreachable", shell="sh"))
+        assert result.exit_code == 1
+        assert result.stdout.endswith(".sh\n")
+        result = engine.run_step(Step(name="custom", command="echo $GREETING", shell="sh -c 'exec sh {0}'"))
+        assert (result.exit_code, result.stdout) == (0, "hello\n")
+        # Without a shell, commands still run with -e and pipefail
+        assert engine.run_step(Step(name="default", command="false | true; echo unreachable")).exit_code == 1
+        assert "Windows" in engine.run_step(Step(name="win", command="dir", shell="cmd")).stderr
+
+
+def test_missing_shell_is_explained(tmp_path):
+    with _engine(tmp_path) as engine:
+        engine.setup()
+        result = engine.run_step(Step(name="ps", command="Write-Host hi", shell="no-such-shell-xyz {0}"))
+        assert result.exit_code == 127
+        assert "needs no-such-shell-xyz, which isn't installed in ubuntu:22.04" in result.stderr
+
+
+@pytest.mark.skipif(shutil.which("python") is None, reason="needs python on PATH")
+@pytest.mark.parametrize("warm", [False, True])
+def test_python_steps(tmp_path, warm):
+    (tmp_path / "sub").mkdir()
+    with _engine(tmp_path, warm_python=warm) as engine:
+        engine.setup()
+        script = "import os, sys\nprint(os.environ['GREETING'], os.environ['STEP'], os.getcwd())\nsys.exit(3)"
+        step = Step(name="py", command=script, shell="python", env={"STEP": "1"}, working_directory="/workspace/sub")
+        result = engine.run_step(step)
+        assert (result.exit_code, result.stdout) == (3, f"hello 1 {tmp_path / 'sub'}\n")
+        result = engine.run_step(Step(name="py", command="raise ValueError('boom')", shell="python"))
+        assert result.exit_code == 1 and "ValueError: boom" in result.stderr
+        result = engine.run_step(Step(name="py", command="import time; time.sleep(30)", shell="python", timeout_minutes=0.01))
+        assert result.exit_code == TIMEOUT_EXIT_CODE
+        result = engine.run_step(Step(name="py", command="print('after')", shell="python"))
+        assert (result.exit_code, result.stdout) == (0, "after\n")
+        assert bool(engine._warm_dir) == warm
@@ -0,0 +1,117 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step, StepStatus
+from pipestep.state import (
+    SessionState, capture_steps, detached_owners, engine_state, find_state, list_states, restore_steps,
+)
+from pipestep.teardown import collect_garbage
+
+
+def _job():
+    return Job(name="build", runs_on="ubuntu-latest", docker_image="ubuntu:22.04", steps=[
+        Step(name="make", command="echo made > out.txt"),
+        Step(name="test", command="cat out.txt"),
+    ])
+
+
+def _dead_owner():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return f"{socket.gethostname()}:{proc.pid}"
+
+
+def test_detach_and_attach_in_a_new_engine(tmp_path):
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+    job = _job()
+    engine = PipelineEngine(job=job, workdir=str(workdir), backend=LocalBackend(), mount_mode="snapshot")
+    engine.setup()
+    try:
+        assert engine.run_step(job.steps[0]).exit_code == 0
+        job.steps[0].status = StepStatus.COMPLETED
+        job.steps[1].breakpoint = True
+        state = engine_state(engine, "/ci.yml", current_step=1, durations={0: 1.5}, session=[{"type": "step"}])
+        state.save(str(tmp_path / "states"))
+        snapshot = engine.workspace.path
+        engine.detach()
+        engine.cleanup()  # a no-op once detached
+        assert os.path.isdir(snapshot)
+
+        loaded = find_state(state.id[:4], str(tmp_path / "states"))
+        assert loaded.current_step == 1 and loaded.session == [{"type": "step"}]
+        fresh = _job()
+        assert restore_steps(fresh, loaded.steps) == {0: 1.5}
+        assert fresh.steps[0].status == StepStatus.COMPLETED and fresh.steps[1].breakpoint
+
+        attached = PipelineEngine(job=fresh, workdir=str(workdir), backend=LocalBackend(), mount_mode="snapshot")
+        attached.attach(loaded.container_id, loaded.workspace, loaded.environment, loaded.owner)
+        result = attached.run_step(fresh.steps[1])
+        assert result.stdout.strip() == "made"
+        attached.cleanup()
+        assert not os.path.exists(snapshot)
+    finally:
+        engine.cleanup()
+
+
+def test_attach_to_a_missing_container(tmp_path):
+    engine = PipelineEngine(job=_job(), workdir=str(tmp_path), backend=LocalBackend())
+    with pytest.raises(RuntimeError, match="no longer exists"):
+        engine.attach("local-000000000000", {}, {}, "")
+
+
+def test_restore_stops_at_renamed_steps():
+    job = _job()
+    job.steps[0].status = StepStatus.SKIPPED
+    job.steps[1].exit_code = 2
+    saved = capture_steps(job, {})
+    renamed = _job()
+    renamed.steps[0].name = "configure"
+    restore_steps(renamed, saved)
+    assert renamed.steps[0].status == StepStatus.PENDING and renamed.steps[1].exit_code is None
+
+
+def test_find_and_list_states(tmp_path):
+    directory = str(tmp_path)
+    first = SessionState("/a.yml", "a", "/w", "local", "c1", "h:1", id="abc111")
+    second = SessionState("/b.yml", "b", "/w", "local", "c2", "h:2", id="abc222")
+    first.save(directory)
+    second.save(directory)
+    (tmp_path / "junk.json").write_text("{not json")
+    assert [s.id for s in list_states(directory)] == ["abc111", "abc222"]
+    with pytest.raises(ValueError, match="ambiguous"):
+        find_state("abc", directory)
+    with pytest.raises(ValueError, match="No detached session"):
+        find_state("zzz", directory)
+    assert detached_owners(directory) == {"h:1", "h:2"}
+    second.remove(directory)
+    assert find_state("abc", directory).id == "abc111"
+    assert list_states(str(tmp_path / "none")) == []
+
+
+def test_in_use():
+    state = SessionState("/a.yml", "a", "/w", "local", "c1", "h:1")
+    assert not state.in_use
+    state.attached = _dead_owner()
+    assert not state.in_use
+    state.attached = f"{socket.gethostname()}:1"  # init is always alive
+    assert state.in_use
+
+
+def test_gc_keeps_detached_sessions(tmp_path):
+    backend = LocalBackend()
+    owner = _dead_owner()
+    container = backend.start("ubuntu:22.04", "pipestep-gc-detached", str(tmp_path), {})
+    with open(os.path.join(container.root, ".pipestep-labels.json"), "w") as f:
+        json.dump({"pipestep": "job", "pipestep.owner": owner}, f)
+    try:
+        kept = collect_garbage(backend, dry_run=True, keep_owners={owner})
+        assert container.root not in [r.id for r in kept]
+        assert container.root in [r.id for r in collect_garbage(backend, dry_run=True)]
+    finally:
+        container.remove(force=True)
@@ -0,0 +1,61 @@
+import os
+import pytest
+from pipestep.backends import LocalBackend
+from pipestep.engine import PipelineEngine
+from pipestep.models import Job, Step
+from pipestep.runner import StepRun
+from pipestep.stress import StressReport, stress_step
+
+
+@pytest.fixture
+def engine(tmp_path):
+    job = Job(name="stress", runs_on="ubuntu-latest", docker_image="ubuntu:22.04")
+    eng = PipelineEngine(job=job, workdir=str(tmp_path), backend=LocalBackend(), mount_mode="snapshot")
+    eng.setup()
+    yield eng
+    eng.cleanup()
+
+
+def test_stress_runs_from_current_state(engine, tmp_path):
+    engine.run_step(Step(name="build", command="mkdir -p out && echo built > out/artifact"))
+    step = Step(name="use", command="cat out/artifact && echo extra >> out/artifact")
+    report = stress_step(engine, step, runs=4, parallel=2)
+    assert report.passed == 4
+    assert not report.flaky
+    # Each fork appended to its own copy; the engine's workspace is unchanged
+    assert all(r.output.strip() == "built" for r in report.runs)
+    assert open(os.path.join(engine.workspace.path, "out", "artifact")).read() == "built\n"
+    assert not (tmp_path / "out").exists()
+    assert engine.backend.images == {}
+
+
+def test_stress_detects_flaky_step(engine):
+    # Fails whenever the fork's random number is odd
+    step = Step(name="coin", command='n=$RANDOM; echo "rolled $n"; if [ $((n % 2)) = 1 ]; then echo odd; exit 1; fi')
+    report = stress_step(engine, step, runs=24)
+    assert 0 < report.passed < 24
+    assert report.flaky
+    assert set(report.exit_codes) == {0, 1}
+    assert ("odd", 24 - report.passed, 24) in report.divergent_lines(limit=50)
+
+
+def _report(*runs):
+    return StressReport(step_name="s", runs=[
+        StepRun(i, "s", "", code, duration=duration, output=output)
+        for i, (code, duration, output) in enumerate(runs)
+    ])
+
+
+def test_report_statistics():
+    report = _report((0, 1.0, "a\nok"), (0, 2.0, "a\nok"), (1, 3.0, "a\nboom"), (0, 4.0, "a\nok"))
+    assert report.pass_rate == 0.75
+    assert report.exit_codes == {0: 3, 1: 1}
+    assert report.durations() == {"min": 1.0, "median": 2.5, "p90": 4.0, "max": 4.0}
+    assert report.divergent_lines() == [("ok", 3, 4), ("boom", 1, 4)]
+    assert report.summary_lines()[0].startswith("3/4 runs passed (75%)")
+
+
+def test_report_divergence_without_failures():
+    report = _report((0, 1.0, "same\nport 1"), (0, 1.0, "same\nport 2"))
+    assert not report.flaky
+    assert [line for line, _, _ in report.divergent_lines()] == ["port 1", "port 2"]
@@ -0,0 +1,56 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pipestep.backends import LocalBackend, is_orphan, owner_labels
+from pipestep.teardown import collect_garbage, run_concurrently
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_run_concurrently_is_parallel_and_bounded():
+    done = []
+    start = time.monotonic()
+    left = run_concurrently([lambda: (time.sleep(0.2), done.append(1)) for _ in range(5)], deadline=2)
+    assert left == 0 and len(done) == 5
+    assert time.monotonic() - start < 0.9
+
+    start = time.monotonic()
+    assert run_concurrently([lambda: time.sleep(5), lambda: 1 / 0], deadline=0.2) == 1
+    assert time.monotonic() - start < 1
+
+
+def test_is_orphan():
+    assert not is_orphan(owner_labels("job"))
+    assert is_orphan({"pipestep.owner": f"{socket.gethostname()}:{_dead_pid()}"})
+    assert not is_orphan({"pipestep.owner": f"some-other-host:{_dead_pid()}"})
+    assert not is_orphan({"pipestep": "runtime"})
+
+
+def test_gc_reaps_only_orphans(tmp_path):
+    backend = LocalBackend()
+    live = backend.start("ubuntu:22.04", "pipestep-gc-live", str(tmp_path), {})
+    crashed = backend.start("ubuntu:22.04", "pipestep-gc-crashed", str(tmp_path), {})
+    image = backend.commit(live)
+    with open(os.path.join(crashed.root, ".pipestep-labels.json"), "w") as f:
+        json.dump({"pipestep": "job", "pipestep.owner": f"{socket.gethostname()}:{_dead_pid()}"}, f)
+    try:
+        listed = {r.id: r.kind for r in backend.list_resources()}
+        assert listed[live.root] == "container"
+        assert listed[backend.images[image]] == "image"
+
+        dry = collect_garbage(backend, dry_run=True)
+        assert crashed.root in [r.id for r in dry] and os.path.isdir(crashed.root)
+        removed = [r.id for r in collect_garbage(backend)]
+        assert crashed.root in removed and live.root not in removed
+        assert not os.path.exists(crashed.root)
+        assert os.path.isdir(live.root)
+    finally:
+        live.remove(force=True)
+        backend.remove_image(image)
@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from textual.app import App
+from pipestep.backends import LocalBackend
+from pipestep.models import Job, Step, StepStatus, Workflow
+from pipestep.tui import PipeStepApp, StepDetailPanel, StepList
+
+
+def _job(count):
+    return Job(
+        name="long",
+        runs_on="ubuntu-latest",
+        docker_image="ubuntu:22.04",
+        steps=[Step(name=f"step {i}", command=f"echo {i}") for i in range(count)],
+    )
+
+
+def _run(test, app, size=(120, 40)):
+    async def _main():
+        async with app.run_test(size=size) as pilot:
+            await pilot.pause()
+            await test(pilot)
+
+    asyncio.run(_main())
+
+
+class _ListApp(App):
+    def __init__(self, count):
+        super().__init__()
+        self.count = count
+        self.highlighted = []
+
+    def compose(self):
+        yield StepList(self.count, lambda i: f"row {i}", id="step-list")
+
+    def on_step_list_highlighted(self, event):
+        self.highlighted.append(event.index)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # session recordings
+    job = _job(3000)
+    app = PipeStepApp(workflow=Workflow(name="CI", trigger="on: push", jobs=[job]), job=job,
+                      workdir=str(tmp_path), backend=LocalBackend())
+    yield app
+    app.engine.cleanup()
+
+
+def _detail(app):
+    return str(app.query_one(StepDetailPanel).renderable)
+
+
+async def _ready(pilot, app):
+    """Wait for the container to be set up and the first step paused."""
+    for _ in range(100):
+        if app.job.steps[0].status == StepStatus.PAUSED:
+            await pilot.pause()
+            return
+        await pilot.pause(0.05)
+    raise AssertionError("setup did not finish")
+
+
+def test_cursor_keys_move_and_clamp():
+    app = _ListApp(100)
+
+    async def test(pilot):
+        step_list = app.query_one(StepList)
+        step_list.focus()
+        await pilot.press("up")
+        assert step_list.index == 0 and app.highlighted == []
+        await pilot.press("down", "down")
+        assert step_list.index == 2
+        await pilot.press("pagedown")
+        page = step_list.scrollable_content_region.height - 1
+        assert step_list.index == 2 + page
+        await pilot.press("pageup", "pageup")
+        assert step_list.index == 0
+        await pilot.press("end")
+        assert step_list.index == 99
+        assert step_list.scroll_offset.y > 0
+        await pilot.press("down")
+        await pilot.pause()
+        assert app.highlighted == [1, 2, 2 + page, 2, 0, 99]
+
+    _run(test, app, size=(40, 20))
+
+
+def test_row_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(StepList, "MAX_CACHED_ROWS", 30)
+    app = _ListApp(1000)
+
+    async def test(pilot):
+        step_list = app.query_one(StepList)
+        step_list.focus()
+        for _ in range(10):
+            await pilot.press("pagedown")
+            await pilot.pause()
+            assert len(step_list._rows) <= 30
+        assert step_list.render_line(0).text.startswith(f"row {step_list.scroll_offset.y}")
+
+    _run(test, app, size=(40, 20))
+
+
+def test_large_job_mounts_and_end_updates_detail(app):
+    async def test(pilot):
+        await _ready(pilot, app)
+        step_list = app.query_one(StepList)
+        assert step_list.count == 3000
+        step_list.focus()
+        await pilot.press("end")
+        await pilot.pause()
+        assert step_list.index == 2999
+        assert "step 2999" in _detail(app)
+        await pilot.press("up")
+        await pilot.pause()
+        assert "step 2998" in _detail(app)
+
+    _run(test, app)
+
+
+def test_status_change_redraws_cached_row(app):
+    async def test(pilot):
+        await _ready(pilot, app)
+        step_list = app.query_one(StepList)
+        assert "✓" not in step_list._rows[3].text
+        app.job.steps[3].status = StepStatus.COMPLETED
+        app._refresh_step(3)
+        await pilot.pause()
+        assert "✓" in step_list._rows[3].text
+
+    _run(test, app)
+
+
+def test_detail_panel_redraws_on_status_change(app):
+    async def test(pilot):
+        await _ready(pilot, app)
+        assert "Status: paused" in _detail(app)
+        app.job.steps[0].status = StepStatus.SKIPPED
+        app._refresh_step(0)
+        await pilot.pause()
+        assert "Status: skipped" in _detail(app)
+
+    _run(test, app)
+
+
+def test_refreshes_are_coalesced_per_frame(app):
+    async def test(pilot):
+        await _ready(pilot, app)
+        flushes = []
+        original = app._flush
+        app._flush = lambda: (flushes.append(set(app._dirty_rows)), original())
+        for index in (1, 2, 3, 2):
+            app._refresh_step(index)
+        await pilot.pause()
+        assert flushes == [{1, 2, 3}]
+        assert app._versions[2] == 2
+
+    _run(test, app)
@@ -0,0 +1,150 @@
+import os
+import subprocess
+import tarfile
+import pytest
+from pipestep import workspace as ws_module
+from pipestep.workspace import prepare_workspace, list_workspace_files, WorkspaceSync
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    _git(src, "init", "-q")
+    (src / ".gitignore").write_text("build/\n*.log\n")
+    (src / "tracked.txt").write_text("tracked")
+    (src / "script.sh").write_text("#!/bin/sh\necho hi\n")
+    (src / "script.sh").chmod(0o755)
+    (src / "pkg").mkdir()
+    (src / "pkg" / "mod.py").write_text("x = 1")
+    (src / "link.txt").symlink_to("tracked.txt")
+    _git(src, "add", ".")
+    _git(src, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-qm", "init")
+    (src / "untracked.txt").write_text("new")
+    (src / "debug.log").write_text("ignored")
+    (src / "build").mkdir()
+    (src / "build" / "out.o").write_text("ignored")
+    return src
+
+
+def test_rw_uses_source(tmp_path):
+    ws = prepare_workspace(str(tmp_path), "rw")
+    assert ws.path == str(tmp_path)
+    ws.release()
+    assert tmp_path.exists()
+
+
+def test_unknown_mode_raises(tmp_path):
+    with pytest.raises(ValueError, match="Unknown mount mode"):
+        prepare_workspace(str(tmp_path), "tmpfs")
+
+
+def test_list_files_respects_gitignore(repo):
+    files = set(list_workspace_files(str(repo)))
+    assert {"tracked.txt", "untracked.txt", "pkg/mod.py", ".gitignore", "link.txt"} <= files
+    assert "debug.log" not in files
+    assert "build/out.o" not in files
+    assert any(f.startswith(".git/") for f in files)
+
+
+def test_list_files_outside_git(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "b.txt").write_text("b")
+    (tmp_path / "c.log").write_text("c")
+    assert set(list_workspace_files(str(tmp_path))) == {"a/b.txt", "c.log"}
+
+
+def test_snapshot_copies_and_isolates(repo):
+    ws = prepare_workspace(str(repo), "snapshot")
+    try:
+        snap = ws.path
+        assert snap != str(repo)
+        assert open(os.path.join(snap, "pkg", "mod.py")).read() == "x = 1"
+        assert os.path.exists(os.path.join(snap, "untracked.txt"))
+        assert not os.path.exists(os.path.join(snap, "debug.log"))
+        assert os.access(os.path.join(snap, "script.sh"), os.X_OK)
+        assert os.readlink(os.path.join(snap, "link.txt")) == "tracked.txt"
+        assert ws.method in ("reflink", "copy")
+        assert ws.files >= 5
+
+        with open(os.path.join(snap, "tracked.txt"), "w") as f:
+            f.write("modified")
+        assert (repo / "tracked.txt").read_text() == "tracked"
+    finally:
+        ws.release()
+    assert not os.path.exists(snap)
+
+
+def test_snapshot_describe_reports_timing(repo):
+    ws = prepare_workspace(str(repo), "snapshot")
+    try:
+        desc = ws.describe()
+        assert desc.startswith("snapshot via")
+        assert desc.endswith("s")
+    finally:
+        ws.release()
+
+
+def test_overlay_without_tools_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(ws_module.shutil, "which", lambda name: None)
+    monkeypatch.setattr(ws_module.os, "geteuid", lambda: 1000)
+    with pytest.raises(RuntimeError, match="fuse-overlayfs"):
+        prepare_workspace(str(tmp_path), "overlay")
+
+
+class _RecordingContainer:
+    """Stands in for a container: extracts archives into a directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.archives = 0
+
+    def put_archive(self, path, data):
+        self.archives += 1
+        with tarfile.open(fileobj=data, mode="r:*") as tar:
+            tar.extractall(self.root)
+        return True
+
+    def exec_run(self, cmd, workdir=None, **kwargs):
+        assert cmd[:3] == ["rm", "-f", "--"]
+        for rel in cmd[3:]:
+            os.unlink(os.path.join(self.root, rel))
+
+
+def test_sync_initial_then_incremental(repo, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    container = _RecordingContainer(str(dest))
+    sync = WorkspaceSync(str(repo))
+
+    first = sync.sync(container)
+    assert first.sent >= 5
+    assert (dest / "untracked.txt").read_text() == "new"
+    assert not (dest / "debug.log").exists()
+
+    second = sync.sync(container)
+    assert (second.sent, second.deleted) == (0, 0)
+    assert container.archives == 1
+
+    (repo / "tracked.txt").write_text("edited!")
+    (repo / "fresh.txt").write_text("fresh")
+    (repo / "untracked.txt").unlink()
+    third = sync.sync(container)
+    assert third.sent == 2
+    assert third.deleted == 1
+    assert (dest / "tracked.txt").read_text() == "edited!"
+    assert (dest / "fresh.txt").exists()
+    assert not (dest / "untracked.txt").exists()
+
+
+def test_sync_after_mark_synced_sends_only_edits(repo, tmp_path):
+    sync = WorkspaceSync(str(repo))
+    sync.mark_synced()
+    (repo / "pkg" / "mod.py").write_text("x = 2")
+    changed, deleted = sync.changes()
+    assert changed == ["pkg/mod.py"]
+    assert deleted == []